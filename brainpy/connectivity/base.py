@@ -1,10 +1,16 @@
 # -*- coding: utf-8 -*-
 
+import hashlib
+import os
+import shutil
+from collections import namedtuple
+
 import numba as nb
 import numpy as np
 
 from .. import profile
 from ..errors import ModelUseError
+from ..tools.caches import _hash_value
 
 __all__ = [
     'Connector',
@@ -16,8 +22,21 @@ __all__ = [
     'post2syn',
     'pre_slice_syn',
     'post_slice_syn',
+    'CSR',
+    'pre2post_csr',
+    'post2pre_csr',
+    'pre2syn_csr',
+    'post2syn_csr',
 ]
 
+CSR = namedtuple('CSR', ['indptr', 'indices'])
+CSR.__doc__ = """Connections in the compressed sparse row (CSR) format.
+
+The connections of the neuron ``k`` are ``indices[indptr[k]: indptr[k + 1]]``.
+Both ``indptr`` and ``indices`` are contiguous int arrays, so that they are
+passed to the JIT step functions without the conversion of the list.
+"""
+
 
 def ij2mat(i, j, num_pre=None, num_post=None):
     """Convert i-j connection to matrix connection.
@@ -42,10 +61,10 @@ def ij2mat(i, j, num_pre=None, num_post=None):
         raise ModelUseError('"i" and "j" must be the equal length.')
     if num_pre is None:
         print('WARNING: "num_pre" is not provided, the result may not be accurate.')
-        num_pre = np.max(i)
+        num_pre = np.max(i) + 1
     if num_post is None:
         print('WARNING: "num_post" is not provided, the result may not be accurate.')
-        num_post = np.max(j)
+        num_post = np.max(j) + 1
 
     i = np.asarray(i, dtype=np.int64)
     j = np.asarray(j, dtype=np.int64)
@@ -77,6 +96,37 @@ def mat2ij(conn_mat):
     return pre_ids, post_ids
 
 
+def _get_csr(ids, num, values=None):
+    # group the "values" (default is the synapse index) by
+    # "ids", the values of each id keep their original order
+    ids = np.asarray(ids, dtype=np.int_)
+    order = np.argsort(ids, kind='stable')
+    indptr = np.zeros(num + 1, dtype=np.int_)
+    indptr[1:] = np.cumsum(np.bincount(ids, minlength=num))
+    if values is None:
+        indices = np.ascontiguousarray(order, dtype=np.int_)
+    else:
+        indices = np.ascontiguousarray(np.asarray(values, dtype=np.int_)[order])
+    return CSR(indptr, indices)
+
+
+@nb.njit
+def _csr_to_typed_list(indptr, indices):
+    conn = nb.typed.List()
+    for k in range(indptr.shape[0] - 1):
+        conn.append(indices[indptr[k]: indptr[k + 1]])
+    return conn
+
+
+def _csr_to_list(indptr, indices):
+    # the list of the connections of each neuron, whose
+    # elements are the views of the contiguous "indices"
+    if profile.is_jit():
+        return _csr_to_typed_list(indptr, indices)
+    else:
+        return np.split(indices, indptr[1:-1])
+
+
 def pre2post(i, j, num_pre=None):
     """Get pre2post connections from `i` and `j` indexes.
 
@@ -98,19 +148,9 @@ def pre2post(i, j, num_pre=None):
         raise ModelUseError('The length of "i" and "j" must be the same.')
     if num_pre is None:
         print('WARNING: "num_pre" is not provided, the result may not be accurate.')
-        num_pre = np.max(i)
+        num_pre = np.max(i) + 1
 
-    pre2post_list = [[] for _ in range(num_pre)]
-    for pre_id, post_id in zip(i, j):
-        pre2post_list[pre_id].append(post_id)
-    pre2post_list = [np.array(l) for l in pre2post_list]
-
-    if profile.is_jit():
-        pre2post_list_nb = nb.typed.List()
-        for pre_id in range(num_pre):
-            pre2post_list_nb.append(np.int64(pre2post_list[pre_id]))
-        pre2post_list = pre2post_list_nb
-    return pre2post_list
+    return _csr_to_list(*_get_csr(i, num_pre, j))
 
 
 def post2pre(i, j, num_post=None):
@@ -135,19 +175,9 @@ def post2pre(i, j, num_post=None):
         raise ModelUseError('The length of "i" and "j" must be the same.')
     if num_post is None:
         print('WARNING: "num_post" is not provided, the result may not be accurate.')
-        num_post = np.max(j)
+        num_post = np.max(j) + 1
 
-    post2pre_list = [[] for _ in range(num_post)]
-    for pre_id, post_id in zip(i, j):
-        post2pre_list[post_id].append(pre_id)
-    post2pre_list = [np.array(l) for l in post2pre_list]
-
-    if profile.is_jit():
-        post2pre_list_nb = nb.typed.List()
-        for post_id in range(num_post):
-            post2pre_list_nb.append(np.int64(post2pre_list[post_id]))
-        post2pre_list = post2pre_list_nb
-    return post2pre_list
+    return _csr_to_list(*_get_csr(j, num_post, i))
 
 
 def pre2syn(i, num_pre=None):
@@ -167,20 +197,9 @@ def pre2syn(i, num_pre=None):
     """
     if num_pre is None:
         print('WARNING: "num_pre" is not provided, the result may not be accurate.')
-        num_pre = np.max(i)
-
-    pre2syn_list = [[] for _ in range(num_pre)]
-    for syn_id, pre_id in enumerate(i):
-        pre2syn_list[pre_id].append(syn_id)
-    pre2syn_list = [np.array(l) for l in pre2syn_list]
-
-    if profile.is_jit():
-        pre2syn_list_nb = nb.typed.List()
-        for pre_ids in pre2syn_list:
-            pre2syn_list_nb.append(np.int64(pre_ids))
-        pre2syn_list = pre2syn_list_nb
+        num_pre = np.max(i) + 1
 
-    return pre2syn_list
+    return _csr_to_list(*_get_csr(i, num_pre))
 
 
 def post2syn(j, num_post=None):
@@ -200,20 +219,9 @@ def post2syn(j, num_post=None):
     """
     if num_post is None:
         print('WARNING: "num_post" is not provided, the result may not be accurate.')
-        num_post = np.max(j)
-
-    post2syn_list = [[] for _ in range(num_post)]
-    for syn_id, post_id in enumerate(j):
-        post2syn_list[post_id].append(syn_id)
-    post2syn_list = [np.array(l) for l in post2syn_list]
-
-    if profile.is_jit():
-        post2syn_list_nb = nb.typed.List()
-        for pre_ids in post2syn_list:
-            post2syn_list_nb.append(np.int64(pre_ids))
-        post2syn_list = post2syn_list_nb
+        num_post = np.max(j) + 1
 
-    return post2syn_list
+    return _csr_to_list(*_get_csr(j, num_post))
 
 
 def pre_slice_syn(i, j, num_pre=None):
@@ -238,25 +246,16 @@ def pre_slice_syn(i, j, num_pre=None):
         raise ModelUseError('The length of "i" and "j" must be the same.')
     if num_pre is None:
         print('WARNING: "num_pre" is not provided, the result may not be accurate.')
-        num_pre = np.max(i)
+        num_pre = np.max(i) + 1
 
-    # pre2post connection
-    pre2post_list = [[] for _ in range(num_pre)]
-    for pre_id, post_id in zip(i, j):
-        pre2post_list[pre_id].append(post_id)
-    post_ids = np.asarray(np.concatenate(pre2post_list), dtype=np.int_)
+    # pre2post connection in the CSR format
+    indptr, post_ids = _get_csr(i, num_pre, j)
 
     # pre2post slicing
-    slicing = []
-    start = 0
-    for posts in pre2post_list:
-        end = start + len(posts)
-        slicing.append([start, end])
-        start = end
-    slicing = np.asarray(slicing, dtype=np.int_)
+    slicing = np.stack([indptr[:-1], indptr[1:]], axis=1)
 
     # pre_ids
-    pre_ids = np.repeat(np.arange(num_pre), slicing[:, 1] - slicing[:, 0])
+    pre_ids = np.repeat(np.arange(num_pre, dtype=np.int_), np.diff(indptr))
 
     return pre_ids, post_ids, slicing
 
@@ -282,29 +281,137 @@ def post_slice_syn(i, j, num_post=None):
         raise ModelUseError('The length of "i" and "j" must be the same.')
     if num_post is None:
         print('WARNING: "num_post" is not provided, the result may not be accurate.')
-        num_post = np.max(j)
+        num_post = np.max(j) + 1
 
-    # post2pre connection
-    post2pre_list = [[] for _ in range(num_post)]
-    for pre_id, post_id in zip(i, j):
-        post2pre_list[post_id].append(pre_id)
-    pre_ids = np.asarray(np.concatenate(post2pre_list), dtype=np.int_)
+    # post2pre connection in the CSR format
+    indptr, pre_ids = _get_csr(j, num_post, i)
 
     # post2pre slicing
-    slicing = []
-    start = 0
-    for pres in post2pre_list:
-        end = start + len(pres)
-        slicing.append([start, end])
-        start = end
-    slicing = np.asarray(slicing, dtype=np.int_)
+    slicing = np.stack([indptr[:-1], indptr[1:]], axis=1)
 
     # post_ids
-    post_ids = np.repeat(np.arange(num_post), slicing[:, 1] - slicing[:, 0])
+    post_ids = np.repeat(np.arange(num_post, dtype=np.int_), np.diff(indptr))
 
     return pre_ids, post_ids, slicing
 
 
+def pre2post_csr(i, j, num_pre=None):
+    """Get pre2post connections in the CSR format from `i` and `j` indexes.
+
+    Parameters
+    ----------
+    i : list, np.ndarray
+        The pre-synaptic neuron indexes.
+    j : list, np.ndarray
+        The post-synaptic neuron indexes.
+    num_pre : int, None
+        The number of the pre-synaptic neurons.
+
+    Returns
+    -------
+    conn : CSR
+        The post-synaptic neuron indexes of each pre-synaptic neuron.
+    """
+    if len(i) != len(j):
+        raise ModelUseError('The length of "i" and "j" must be the same.')
+    if num_pre is None:
+        print('WARNING: "num_pre" is not provided, the result may not be accurate.')
+        num_pre = np.max(i) + 1
+    return _get_csr(i, num_pre, j)
+
+
+def post2pre_csr(i, j, num_post=None):
+    """Get post2pre connections in the CSR format from `i` and `j` indexes.
+
+    Parameters
+    ----------
+    i : list, np.ndarray
+        The pre-synaptic neuron indexes.
+    j : list, np.ndarray
+        The post-synaptic neuron indexes.
+    num_post : int, None
+        The number of the post-synaptic neurons.
+
+    Returns
+    -------
+    conn : CSR
+        The pre-synaptic neuron indexes of each post-synaptic neuron.
+    """
+    if len(i) != len(j):
+        raise ModelUseError('The length of "i" and "j" must be the same.')
+    if num_post is None:
+        print('WARNING: "num_post" is not provided, the result may not be accurate.')
+        num_post = np.max(j) + 1
+    return _get_csr(j, num_post, i)
+
+
+def pre2syn_csr(i, num_pre=None):
+    """Get pre2syn connections in the CSR format from `i` indexes.
+
+    Parameters
+    ----------
+    i : list, np.ndarray
+        The pre-synaptic neuron indexes.
+    num_pre : int, None
+        The number of the pre-synaptic neurons.
+
+    Returns
+    -------
+    conn : CSR
+        The synapse indexes of each pre-synaptic neuron.
+    """
+    if num_pre is None:
+        print('WARNING: "num_pre" is not provided, the result may not be accurate.')
+        num_pre = np.max(i) + 1
+    return _get_csr(i, num_pre)
+
+
+def post2syn_csr(j, num_post=None):
+    """Get post2syn connections in the CSR format from `j` indexes.
+
+    Parameters
+    ----------
+    j : list, np.ndarray
+        The post-synaptic neuron indexes.
+    num_post : int, None
+        The number of the post-synaptic neurons.
+
+    Returns
+    -------
+    conn : CSR
+        The synapse indexes of each post-synaptic neuron.
+    """
+    if num_post is None:
+        print('WARNING: "num_post" is not provided, the result may not be accurate.')
+        num_post = np.max(j) + 1
+    return _get_csr(j, num_post)
+
+
+def _get_requires(syn_requires):
+    requires = set()
+    for n in syn_requires:
+        if n in ['pre_ids', 'post_ids', 'conn_mat',
+                 'pre2post', 'post2pre',
+                 'pre2syn', 'post2syn',
+                 'pre_slice_syn', 'post_slice_syn',
+                 'pre2post_csr', 'post2pre_csr',
+                 'pre2syn_csr', 'post2syn_csr']:
+            requires.add(n)
+    return list(requires)
+
+
+# the synaptic structures which are the lists of the connections,
+# they are cached in the CSR format, and converted back to the list
+_LIST_STRUCTURES = {
+    'pre2post': lambda conn: _get_csr(conn.pre_ids, conn.num_pre, conn.post_ids),
+    'post2pre': lambda conn: _get_csr(conn.post_ids, conn.num_post, conn.pre_ids),
+    'pre2syn': lambda conn: _get_csr(conn.pre_ids, conn.num_pre),
+    'post2syn': lambda conn: _get_csr(conn.post_ids, conn.num_post),
+}
+_CSR_STRUCTURES = ['pre2post_csr', 'post2pre_csr', 'pre2syn_csr', 'post2syn_csr']
+_CACHE_DIR_PREFIX = 'brainpy_conn_cache_'
+
+
 class Connector(object):
     """Abstract connector class."""
 
@@ -323,6 +430,11 @@ class Connector(object):
         self.post2syn = None
         self.pre_slice_syn = None
         self.post_slice_syn = None
+        # synaptic structures in the CSR format
+        self.pre2post_csr = None
+        self.post2pre_csr = None
+        self.pre2syn_csr = None
+        self.post2syn_csr = None
         # synaptic weights
         self.weights = None
         # the required synaptic structures
@@ -344,14 +456,7 @@ class Connector(object):
 
     def set_requires(self, syn_requires):
         # get synaptic requires
-        requires = set()
-        for n in syn_requires:
-            if n in ['pre_ids', 'post_ids', 'conn_mat',
-                     'pre2post', 'post2pre',
-                     'pre2syn', 'post2syn',
-                     'pre_slice_syn', 'post_slice_syn']:
-                requires.add(n)
-        self.requires = list(requires)
+        self.requires = _get_requires(syn_requires)
 
         # synaptic structure to handle
         needs = []
@@ -375,6 +480,145 @@ class Connector(object):
     def __call__(self, pre_indices, post_indices):
         raise NotImplementedError
 
+    def get_cache_key(self, pre_indices, post_indices, syn_requires):
+        """Get the key of the connectivity cache.
+
+        The key is the hash of the connector type, the connector parameters
+        (including the seed), the pre- and post-synaptic neuron indices and
+        sizes, and the required synaptic structures. If the connector is
+        random but not seeded (``seed=None``), the connections are different
+        in each run, and the key is None. The key is also None if one of the
+        connector parameters can not be hashed.
+
+        Parameters
+        ----------
+        pre_indices : np.ndarray
+            The pre-synaptic neuron indices.
+        post_indices : np.ndarray
+            The post-synaptic neuron indices.
+        syn_requires : list, tuple
+            The required synaptic structures.
+
+        Returns
+        -------
+        key : str, None
+            The hex digest of the hash.
+        """
+        if getattr(self, 'seed', 0) is None:
+            return None
+        structures = set(Connector().__dict__.keys())
+        pars = {k: v for k, v in self.__dict__.items() if k not in structures}
+        hasher = hashlib.sha1()
+        hasher.update(f'{type(self).__module__}.{type(self).__qualname__}'.encode())
+        memo = {}
+        try:
+            for val in [pars, np.asarray(pre_indices), np.asarray(post_indices),
+                        self.num_pre, self.num_post, sorted(_get_requires(syn_requires))]:
+                _hash_value(val, hasher, memo)
+        except TypeError:
+            return None
+        return hasher.hexdigest()
+
+    def save_cache(self, cache_dir, pre_indices, post_indices, syn_requires):
+        """Save the connections and the required synaptic structures
+        into the cache directory.
+
+        Each structure is saved as a ``.npy`` file (the lists of the
+        connections are saved in the CSR format) in the sub-directory
+        named by the cache key (see ``get_cache_key()``). The sub-directory
+        is written by renaming a temporary directory, so that the processes
+        sharing the cache directory never see an incomplete cache.
+
+        Parameters
+        ----------
+        cache_dir : str
+            The cache directory.
+        pre_indices : np.ndarray
+            The pre-synaptic neuron indices.
+        post_indices : np.ndarray
+            The post-synaptic neuron indices.
+        syn_requires : list, tuple
+            The required synaptic structures.
+        """
+        key = self.get_cache_key(pre_indices, post_indices, syn_requires)
+        if key is None:
+            print(f'WARNING: The connections of {type(self).__name__} are not cached, '
+                  f'because it is not seeded or its parameters can not be hashed.')
+            return
+        path = os.path.join(cache_dir, f'{_CACHE_DIR_PREFIX}{key}')
+        if os.path.exists(path):
+            return
+
+        # the arrays to save
+        arrays = {'pre_ids': self.pre_ids, 'post_ids': self.post_ids}
+        if self.weights is not None:
+            arrays['weights'] = self.weights
+        for n in self.requires:
+            if n in _LIST_STRUCTURES:
+                arrays[f'{n}.indptr'], arrays[f'{n}.indices'] = _LIST_STRUCTURES[n](self)
+            elif n in _CSR_STRUCTURES:
+                arrays[f'{n}.indptr'], arrays[f'{n}.indices'] = getattr(self, n)
+            else:
+                arrays[n] = getattr(self, n)
+
+        # write the arrays
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        os.makedirs(tmp_path, exist_ok=True)
+        for n, v in arrays.items():
+            np.save(os.path.join(tmp_path, f'{n}.npy'), np.asarray(v))
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # the cache is written by another process
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def load_cache(self, cache_dir, pre_indices, post_indices, syn_requires):
+        """Load the connections and the required synaptic structures
+        from the cache directory (see ``save_cache()``).
+
+        The arrays are loaded by the memory mapping, so that the processes
+        loading the same cache share the pages of the files.
+
+        Parameters
+        ----------
+        cache_dir : str
+            The cache directory.
+        pre_indices : np.ndarray
+            The pre-synaptic neuron indices.
+        post_indices : np.ndarray
+            The post-synaptic neuron indices.
+        syn_requires : list, tuple
+            The required synaptic structures.
+
+        Returns
+        -------
+        loaded : bool
+            Whether the cache is found and loaded.
+        """
+        key = self.get_cache_key(pre_indices, post_indices, syn_requires)
+        if key is None:
+            return False
+        path = os.path.join(cache_dir, f'{_CACHE_DIR_PREFIX}{key}')
+        if not os.path.isdir(path):
+            return False
+
+        def load(name):
+            return np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+
+        self.requires = _get_requires(syn_requires)
+        self.pre_ids = load('pre_ids')
+        self.post_ids = load('post_ids')
+        if os.path.exists(os.path.join(path, 'weights.npy')):
+            self.weights = load('weights')
+        for n in self.requires:
+            if n in _LIST_STRUCTURES:
+                setattr(self, n, _csr_to_list(load(f'{n}.indptr'), load(f'{n}.indices')))
+            elif n in _CSR_STRUCTURES:
+                setattr(self, n, CSR(load(f'{n}.indptr'), load(f'{n}.indices')))
+            else:
+                setattr(self, n, load(n))
+        return True
+
     def make_conn_mat(self):
         if self.conn_mat is None:
             self.conn_mat = ij2mat(self.pre_ids, self.post_ids, self.num_pre, self.num_post)
@@ -402,3 +646,15 @@ class Connector(object):
     def make_post_slice_syn(self):
         self.pre_ids, self.post_ids, self.post_slice_syn = \
             post_slice_syn(self.pre_ids, self.post_ids, self.num_post)
+
+    def make_pre2post_csr(self):
+        self.pre2post_csr = pre2post_csr(self.pre_ids, self.post_ids, self.num_pre)
+
+    def make_post2pre_csr(self):
+        self.post2pre_csr = post2pre_csr(self.pre_ids, self.post_ids, self.num_post)
+
+    def make_pre2syn_csr(self):
+        self.pre2syn_csr = pre2syn_csr(self.pre_ids, self.num_pre)
+
+    def make_post2syn_csr(self):
+        self.post2syn_csr = post2syn_csr(self.post_ids, self.num_post)
@@ -4,7 +4,11 @@ import numba as nb
 import numpy as np
 
 from .base import Connector
+from .base import _get_csr
 from ..errors import ModelUseError
+from ..tools.checkpoints import _get_rng_state_size
+from ..tools.checkpoints import load_rng_state
+from ..tools.checkpoints import save_rng_state
 
 if hasattr(nb.core, 'dispatcher'):
     from numba.core.dispatcher import Dispatcher
@@ -19,6 +23,7 @@ __all__ = ['One2One', 'one2one',
            'GridN',
            'FixedPostNum', 'FixedPreNum', 'FixedProb',
            'GaussianProb', 'GaussianWeight', 'DOG',
+           'PositionProb', 'PositionWeight',
            'SmallWorld', 'ScaleFree']
 
 
@@ -244,9 +249,77 @@ class GridEight(GridN):
 grid_eight = GridEight()
 
 
+# the number of the rows in each block of the random connectors, each block
+# has its own seed, so that the result is not related to the thread number
+_ROW_BLOCK = 256
+
+
+def _get_block_seeds(num_row, seed):
+    # the seeds of the row blocks, which are derived from "seed", or from
+    # the global numpy random state (so that "np.random.seed()" also works)
+    rng = np.random if seed is None else np.random.RandomState(seed)
+    num_block = (num_row + _ROW_BLOCK - 1) // _ROW_BLOCK
+    return rng.randint(0, 2 ** 31 - 1, size=num_block).astype(np.int64)
+
+
+@nb.njit
+def _seed_rng(seed):
+    # Seed the random generator of the current thread, and return its last
+    # state, which is restored by "load_rng_state()" after the random numbers
+    # are drawn, so that the connectors keep the random stream of "np.random"
+    # in the JIT functions (see "tools.set_rng_seed()").
+    saved = np.empty(_get_rng_state_size(), dtype=np.uint8)
+    save_rng_state(saved)
+    np.random.seed(seed)
+    return saved
+
+
+def _fixed_prob(num_pre, num_post, prob, include_self, seeds, counts, post_ids):
+    # Sample the post-synaptic neurons of each pre-synaptic neuron by
+    # the geometric skipping, which costs O(num_post * prob) per row.
+    # When "counts" is empty, only count the connections of each row,
+    # otherwise, write the sorted connections into "post_ids" at the
+    # offsets given by the cumulative "counts". The two passes draw
+    # the same random numbers by reseeding each row block.
+    count_only = counts.shape[0] == 0
+    log_q = np.log(1. - prob) if prob < 1. else 0.
+    for block in nb.prange(seeds.shape[0]):
+        saved = _seed_rng(seeds[block])
+        for pre_i in range(block * _ROW_BLOCK, min((block + 1) * _ROW_BLOCK, num_pre)):
+            exclude = (not include_self) and pre_i < num_post
+            num = num_post - 1 if exclude else num_post
+            offset = 0 if count_only else counts[pre_i]
+            k = 0
+            pos = -1
+            while True:
+                if prob >= 1.:
+                    pos += 1
+                elif prob <= 0.:
+                    break
+                else:
+                    pos += int(np.log(1. - np.random.random()) / log_q) + 1
+                if pos >= num:
+                    break
+                if not count_only:
+                    post_ids[offset + k] = pos + 1 if exclude and pos >= pre_i else pos
+                k += 1
+            if count_only:
+                post_ids[pre_i] = k
+        load_rng_state(saved)
+
+
+_fixed_prob_serial = nb.njit(_fixed_prob)
+_fixed_prob_parallel = nb.njit(parallel=True)(_fixed_prob)
+
+
 class FixedProb(Connector):
     """Connect the post-synaptic neurons with fixed probability.
 
+    The connections of each pre-synaptic neuron are sampled directly (by
+    the geometric skipping over the post-synaptic neurons), so that the
+    time and the memory are proportional to the number of the synapses.
+    The dense connectivity matrix is only made when ``conn_mat`` is required.
+
     Parameters
     ----------
     prob : float
@@ -254,27 +327,40 @@ class FixedProb(Connector):
     include_self : bool
         Whether create (i, i) conn ?
     seed : None, int
-        Seed the random generator.
+        Seed the random generator. If None, the seed is drawn from the
+        global numpy random state.
+    parallel : bool
+        Whether generate the row blocks in parallel. The result is
+        the same with the serial generation.
     """
 
-    def __init__(self, prob, include_self=True, seed=None):
+    def __init__(self, prob, include_self=True, seed=None, parallel=False):
         super(FixedProb, self).__init__()
         self.prob = prob
         self.include_self = include_self
         self.seed = seed
+        self.parallel = parallel
 
     def __call__(self, pre_indices, post_indices):
         pre_indices = pre_indices.flatten()
         post_indices = post_indices.flatten()
 
         num_pre, num_post = len(pre_indices), len(post_indices)
-        prob_mat = np.random.random(size=(num_pre, num_post))
-        if not self.include_self:
-            diag_index = np.arange(min([num_pre, num_post]))
-            prob_mat[diag_index, diag_index] = 1.
-        conn_mat = prob_mat < self.prob
-        pre_ids, post_ids = np.where(conn_mat)
-        self.conn_mat = np.float_(conn_mat)
+        seeds = _get_block_seeds(num_pre, self.seed)
+        prob = float(self.prob)
+        func = _fixed_prob_parallel if self.parallel else _fixed_prob_serial
+
+        # the connection number of each row
+        nums = np.zeros(num_pre, dtype=np.int_)
+        func(num_pre, num_post, prob, self.include_self, seeds, np.zeros(0, dtype=np.int_), nums)
+        counts = np.zeros(num_pre + 1, dtype=np.int_)
+        counts[1:] = np.cumsum(nums)
+
+        # the connections
+        post_ids = np.zeros(counts[-1], dtype=np.int_)
+        func(num_pre, num_post, prob, self.include_self, seeds, counts, post_ids)
+        pre_ids = np.repeat(np.arange(num_pre, dtype=np.int_), nums)
+
         self.pre_ids = pre_indices[pre_ids]
         self.post_ids = post_indices[post_ids]
         if self.num_pre is None:
@@ -283,10 +369,55 @@ class FixedProb(Connector):
             self.num_post = post_indices.max()
 
 
+def _fixed_num(num_row, num_col, num, include_self, seeds, ids):
+    # Sample "num" distinct columns for each row by Floyd's algorithm,
+    # which costs O(num) per row. The sampled columns are marked in a
+    # buffer owned by the row block, and are sorted in each row.
+    for block in nb.prange(seeds.shape[0]):
+        saved = _seed_rng(seeds[block])
+        marks = np.zeros(num_col, dtype=np.bool_)
+        for row in range(block * _ROW_BLOCK, min((block + 1) * _ROW_BLOCK, num_row)):
+            exclude = (not include_self) and row < num_col
+            n = num_col - 1 if exclude else num_col
+            offset = row * num
+            for k, j in enumerate(range(n - num, n)):
+                t = np.random.randint(0, j + 1)
+                if marks[t]:
+                    t = j
+                marks[t] = True
+                ids[offset + k] = t
+            for k in range(offset, offset + num):
+                marks[ids[k]] = False
+                if exclude and ids[k] >= row:
+                    ids[k] += 1
+            ids[offset: offset + num] = np.sort(ids[offset: offset + num])
+        load_rng_state(saved)
+
+
+_fixed_num_serial = nb.njit(_fixed_num)
+_fixed_num_parallel = nb.njit(parallel=True)(_fixed_num)
+
+
+def _get_fixed_num(num_row, num_col, num, include_self, seed, parallel):
+    # get the sampled columns of each row
+    if num > (num_col if include_self else num_col - 1):
+        raise ModelUseError(f'Cannot sample {num} distinct neurons from {num_col} neurons '
+                            f'(include_self={include_self}).')
+    seeds = _get_block_seeds(num_row, seed)
+    ids = np.zeros(num_row * num, dtype=np.int_)
+    func = _fixed_num_parallel if parallel else _fixed_num_serial
+    func(num_row, num_col, num, include_self, seeds, ids)
+    return ids
+
+
 class FixedPreNum(Connector):
     """Connect the pre-synaptic neurons with fixed number for each
     post-synaptic neuron.
 
+    The pre-synaptic neurons of each post-synaptic neuron are sampled
+    directly (by Floyd's algorithm), so that the time and the memory
+    are proportional to the number of the synapses.
+
     Parameters
     ----------
     num : float, int
@@ -295,10 +426,14 @@ class FixedPreNum(Connector):
     include_self : bool
         Whether create (i, i) conn ?
     seed : None, int
-        Seed the random generator.
+        Seed the random generator. If None, the seed is drawn from the
+        global numpy random state.
+    parallel : bool
+        Whether generate the post-synaptic neurons in parallel. The
+        result is the same with the serial generation.
     """
 
-    def __init__(self, num, include_self=True, seed=None):
+    def __init__(self, num, include_self=True, seed=None, parallel=False):
         super(FixedPreNum, self).__init__()
         if isinstance(num, int):
             assert num >= 0, '"num" must be bigger than 0.'
@@ -309,6 +444,7 @@ class FixedPreNum(Connector):
         self.num = num
         self.include_self = include_self
         self.seed = seed
+        self.parallel = parallel
 
     def __call__(self, pre_indices, post_indices):
         pre_indices = pre_indices.flatten()
@@ -316,13 +452,10 @@ class FixedPreNum(Connector):
         num_pre, num_post = len(pre_indices), len(post_indices)
         num = self.num if isinstance(self.num, int) else int(self.num * num_pre)
         assert num <= num_pre, f'"num" must be less than "num_pre", but got {num} > {num_pre}'
-        prob_mat = np.random.random(size=(num_pre, num_post))
-        if not self.include_self:
-            diag_index = np.arange(min([num_pre, num_post]))
-            prob_mat[diag_index, diag_index] = 1.1
-        arg_sort = np.argsort(prob_mat, axis=0)[:num]
-        self.pre_ids = np.asarray(np.concatenate(arg_sort), dtype=np.int64)
-        self.post_ids = np.asarray(np.repeat(np.arange(num_post), num_pre), dtype=np.int64)
+        pre_ids = _get_fixed_num(num_post, num_pre, num, self.include_self, self.seed, self.parallel)
+        post_ids = np.repeat(np.arange(num_post, dtype=np.int_), num)
+        self.pre_ids = pre_indices[pre_ids]
+        self.post_ids = post_indices[post_ids]
         if self.num_pre is None:
             self.num_pre = pre_indices.max()
         if self.num_post is None:
@@ -333,6 +466,10 @@ class FixedPostNum(Connector):
     """Connect the post-synaptic neurons with fixed number for each
     pre-synaptic neuron.
 
+    The post-synaptic neurons of each pre-synaptic neuron are sampled
+    directly (by Floyd's algorithm), so that the time and the memory
+    are proportional to the number of the synapses.
+
     Parameters
     ----------
     num : float, int
@@ -341,10 +478,14 @@ class FixedPostNum(Connector):
     include_self : bool
         Whether create (i, i) conn ?
     seed : None, int
-        Seed the random generator.
+        Seed the random generator. If None, the seed is drawn from the
+        global numpy random state.
+    parallel : bool
+        Whether generate the pre-synaptic neurons in parallel. The
+        result is the same with the serial generation.
     """
 
-    def __init__(self, num, include_self=True, seed=None):
+    def __init__(self, num, include_self=True, seed=None, parallel=False):
         if isinstance(num, int):
             assert num >= 0, '"num" must be bigger than 0.'
         elif isinstance(num, float):
@@ -354,6 +495,7 @@ class FixedPostNum(Connector):
         self.num = num
         self.include_self = include_self
         self.seed = seed
+        self.parallel = parallel
         super(FixedPostNum, self).__init__()
 
     def __call__(self, pre_indices, post_indices):
@@ -363,53 +505,128 @@ class FixedPostNum(Connector):
         num_post = len(post_indices)
         num = self.num if isinstance(self.num, int) else int(self.num * num_post)
         assert num <= num_post, f'"num" must be less than "num_post", but got {num} > {num_post}'
-        prob_mat = np.random.random(size=(num_pre, num_post))
-        if not self.include_self:
-            diag_index = np.arange(min([num_pre, num_post]))
-            prob_mat[diag_index, diag_index] = 1.1
-        arg_sort = np.argsort(prob_mat, axis=1)[:, num]
-        self.post_ids = np.asarray(np.concatenate(arg_sort), dtype=np.int64)
-        self.pre_ids = np.asarray(np.repeat(np.arange(num_pre), num_post), dtype=np.int64)
+        post_ids = _get_fixed_num(num_pre, num_post, num, self.include_self, self.seed, self.parallel)
+        pre_ids = np.repeat(np.arange(num_pre, dtype=np.int_), num)
+        self.pre_ids = pre_indices[pre_ids]
+        self.post_ids = post_indices[post_ids]
         if self.num_pre is None:
             self.num_pre = pre_indices.max()
         if self.num_post is None:
             self.num_post = post_indices.max()
 
 
-@nb.njit
-def _gaussian_weight(pre_i, pre_width, pre_height,
-                     num_post, post_width, post_height,
-                     w_max, w_min, sigma, normalize, include_self):
-    conn_i = []
-    conn_j = []
-    conn_w = []
+# the kinds of the distance-dependent grid connectors
+_GAUSSIAN_WEIGHT = 0
+_GAUSSIAN_PROB = 1
+_DOG = 2
 
-    # get normalized coordination
-    pre_coords = (pre_i // pre_width, pre_i % pre_width)
-    if normalize:
-        pre_coords = (pre_coords[0] / (pre_height - 1) if pre_height > 1 else 1.,
-                      pre_coords[1] / (pre_width - 1) if pre_width > 1 else 1.)
 
-    for post_i in range(num_post):
-        if (pre_i == post_i) and (not include_self):
-            continue
+@nb.njit
+def _grid_coord(idx, size, normalize):
+    # the (normalized) coordination of the index in the grid
+    if normalize:
+        return idx / (size - 1) if size > 1 else 1.
+    return float(idx)
 
-        # get normalized coordination
-        post_coords = (post_i // post_width, post_i % post_width)
-        if normalize:
-            post_coords = (post_coords[0] / (post_height - 1) if post_height > 1 else 1.,
-                           post_coords[1] / (post_width - 1) if post_width > 1 else 1.)
 
-        # Compute Euclidean distance between two coordinates
-        distance = (pre_coords[0] - post_coords[0]) ** 2
-        distance += (pre_coords[1] - post_coords[1]) ** 2
-        # get weight and conn
-        value = w_max * np.exp(-distance / (2.0 * sigma ** 2))
-        if value > w_min:
-            conn_i.append(pre_i)
-            conn_j.append(post_i)
-            conn_w.append(value)
-    return conn_i, conn_j, conn_w
+@nb.njit
+def _grid_range(coord, radius, size, normalize):
+    # the range of the grid indices, whose coordinations
+    # are in the radius of "coord" (negative radius is infinite)
+    if radius < 0. or size == 1:
+        return 0, size
+    # with one more index on each side to tolerate the rounding error
+    scale = size - 1 if normalize else 1.
+    start = max(int(np.floor((coord - radius) * scale)) - 1, 0)
+    end = min(int(np.ceil((coord + radius) * scale)) + 2, size)
+    return start, end
+
+
+def _grid_conn(pre_height, pre_width, post_height, post_width, normalize,
+               include_self, kind, pars, radius, counts, post_ids, values):
+    # Visit the post-synaptic neurons in the cutoff "radius" of each
+    # pre-synaptic neuron. When "counts" is empty, only count the
+    # connections of each pre-synaptic neuron (into "post_ids"),
+    # otherwise, write the connections and their values at the
+    # offsets given by the cumulative "counts".
+    count_only = counts.shape[0] == 0
+    for pre_i in nb.prange(pre_height * pre_width):
+        pre_y = _grid_coord(pre_i // pre_width, pre_height, normalize)
+        pre_x = _grid_coord(pre_i % pre_width, pre_width, normalize)
+        row_start, row_end = _grid_range(pre_y, radius, post_height, normalize)
+        col_start, col_end = _grid_range(pre_x, radius, post_width, normalize)
+        k = 0 if count_only else counts[pre_i]
+        for row in range(row_start, row_end):
+            post_y = _grid_coord(row, post_height, normalize)
+            for col in range(col_start, col_end):
+                post_i = row * post_width + col
+                if (pre_i == post_i) and (not include_self):
+                    continue
+                post_x = _grid_coord(col, post_width, normalize)
+
+                # Compute Euclidean distance between two coordinates
+                distance = (pre_y - post_y) ** 2
+                distance += (pre_x - post_x) ** 2
+                # get weight and conn
+                if kind == _GAUSSIAN_WEIGHT:
+                    value = pars[0] * np.exp(-distance / (2.0 * pars[1] ** 2))
+                    selected = value > pars[2]
+                elif kind == _GAUSSIAN_PROB:
+                    value = np.exp(-distance / (2.0 * pars[1] ** 2))
+                    selected = value > pars[2]
+                else:
+                    value = pars[0] * np.exp(-distance / (2.0 * pars[1] ** 2)) - \
+                            pars[3] * np.exp(-distance / (2.0 * pars[4] ** 2))
+                    selected = np.abs(value) > pars[2]
+                if selected:
+                    if not count_only:
+                        post_ids[k] = post_i
+                        values[k] = value
+                    k += 1
+        if count_only:
+            post_ids[pre_i] = k
+
+
+_grid_conn_serial = nb.njit(_grid_conn)
+_grid_conn_parallel = nb.njit(parallel=True)(_grid_conn)
+
+
+def _gaussian_radius(w_max, w_min, sigma):
+    # the distance beyond which "w_max * exp(-d^2 / (2 * sigma^2))"
+    # is not larger than "w_min" (negative radius is infinite)
+    if w_min <= 0.:
+        return -1.
+    if w_max <= w_min:
+        return 0.
+    return sigma * np.sqrt(2. * np.log(w_max / w_min))
+
+
+def _get_grid_conn(pre_indices, post_indices, normalize, include_self,
+                   kind, pars, radius, parallel):
+    # get the pre-synaptic neuron indices, the post-synaptic
+    # neuron indices and the values of the connections
+    assert np.ndim(pre_indices) == 2
+    assert np.ndim(post_indices) == 2
+    pre_height, pre_width = pre_indices.shape
+    post_height, post_width = post_indices.shape
+    num_pre = pre_height * pre_width
+    pars = np.asarray(pars, dtype=np.float_)
+    func = _grid_conn_parallel if parallel else _grid_conn_serial
+
+    # the connection number of each pre-synaptic neuron
+    nums = np.zeros(num_pre, dtype=np.int_)
+    func(pre_height, pre_width, post_height, post_width, normalize, include_self,
+         kind, pars, radius, np.zeros(0, dtype=np.int_), nums, np.zeros(0, dtype=np.float_))
+    counts = np.zeros(num_pre + 1, dtype=np.int_)
+    counts[1:] = np.cumsum(nums)
+
+    # the connections
+    post_ids = np.zeros(counts[-1], dtype=np.int_)
+    values = np.zeros(counts[-1], dtype=np.float_)
+    func(pre_height, pre_width, post_height, post_width, normalize, include_self,
+         kind, pars, radius, counts, post_ids, values)
+    pre_ids = np.repeat(np.arange(num_pre, dtype=np.int_), nums)
+    return pre_ids, post_ids, values
 
 
 class GaussianWeight(Connector):
@@ -429,6 +646,9 @@ class GaussianWeight(Connector):
     of synapses to the cases where the value of the weight would be superior
     to :math:`w_{min}`. Default is :math:`0.01 w_{max}`.
 
+    Only the post-synaptic neurons within the distance
+    :math:`\\sigma \\sqrt{2 \\ln(w_{max} / w_{min})}` are visited.
+
     Parameters
     ----------
     sigma : float
@@ -441,45 +661,29 @@ class GaussianWeight(Connector):
         Whether normalize the coordination.
     include_self : bool
         Whether create the conn at the same position.
+    parallel : bool
+        Whether visit the pre-synaptic neurons in parallel.
     """
 
-    def __init__(self, sigma, w_max, w_min=None, normalize=True, include_self=True):
+    def __init__(self, sigma, w_max, w_min=None, normalize=True, include_self=True, parallel=False):
         super(GaussianWeight, self).__init__()
         self.sigma = sigma
         self.w_max = w_max
         self.w_min = w_max * 0.01 if w_min is None else w_min
         self.normalize = normalize
         self.include_self = include_self
+        self.parallel = parallel
 
     def __call__(self, pre_indices, post_indices):
-        num_pre = np.size(pre_indices)
-        num_post = np.size(post_indices)
-        assert np.ndim(pre_indices) == 2
-        assert np.ndim(post_indices) == 2
-        pre_height, pre_width = pre_indices.shape
-        post_height, post_width = post_indices.shape
-
         # get the connections and weights
-        i, j, w = [], [], []
-        for pre_i in range(num_pre):
-            a = _gaussian_weight(pre_i=pre_i,
-                                 pre_width=pre_width,
-                                 pre_height=pre_height,
-                                 num_post=num_post,
-                                 post_width=post_width,
-                                 post_height=post_height,
-                                 w_max=self.w_max,
-                                 w_min=self.w_min,
-                                 sigma=self.sigma,
-                                 normalize=self.normalize,
-                                 include_self=self.include_self)
-            i.extend(a[0])
-            j.extend(a[1])
-            w.extend(a[2])
-
-        pre_ids = np.asarray(i, dtype=np.int_)
-        post_ids = np.asarray(j, dtype=np.int_)
-        w = np.asarray(w, dtype=np.float_)
+        radius = _gaussian_radius(self.w_max, self.w_min, self.sigma)
+        pre_ids, post_ids, w = _get_grid_conn(pre_indices, post_indices,
+                                              normalize=self.normalize,
+                                              include_self=self.include_self,
+                                              kind=_GAUSSIAN_WEIGHT,
+                                              pars=(self.w_max, self.sigma, self.w_min),
+                                              radius=radius,
+                                              parallel=self.parallel)
         pre_indices = pre_indices.flatten()
         post_indices = post_indices.flatten()
         self.pre_ids = pre_indices[pre_ids]
@@ -491,42 +695,6 @@ class GaussianWeight(Connector):
             self.num_post = post_indices.max()
 
 
-@nb.njit
-def _gaussian_prob(pre_i, pre_width, pre_height,
-                   num_post, post_width, post_height,
-                   p_min, sigma, normalize, include_self):
-    conn_i = []
-    conn_j = []
-    conn_p = []
-
-    # get normalized coordination
-    pre_coords = (pre_i // pre_width, pre_i % pre_width)
-    if normalize:
-        pre_coords = (pre_coords[0] / (pre_height - 1) if pre_height > 1 else 1.,
-                      pre_coords[1] / (pre_width - 1) if pre_width > 1 else 1.)
-
-    for post_i in range(num_post):
-        if (pre_i == post_i) and (not include_self):
-            continue
-
-        # get normalized coordination
-        post_coords = (post_i // post_width, post_i % post_width)
-        if normalize:
-            post_coords = (post_coords[0] / (post_height - 1) if post_height > 1 else 1.,
-                           post_coords[1] / (post_width - 1) if post_width > 1 else 1.)
-
-        # Compute Euclidean distance between two coordinates
-        distance = (pre_coords[0] - post_coords[0]) ** 2
-        distance += (pre_coords[1] - post_coords[1]) ** 2
-        # get weight and conn
-        value = np.exp(-distance / (2.0 * sigma ** 2))
-        if value > p_min:
-            conn_i.append(pre_i)
-            conn_j.append(post_i)
-            conn_p.append(value)
-    return conn_i, conn_j, conn_p
-
-
 class GaussianProb(Connector):
     """Builds a Gaussian conn pattern between the two populations, where
     the conn probability decay according to the gaussian function.
@@ -539,54 +707,48 @@ class GaussianProb(Connector):
 
     where :math:`(x, y)` is the position of the pre-synaptic neuron
     and :math:`(x_c,y_c)` is the position of the post-synaptic neuron.
+    When :math:`p_{min} > 0`, only the post-synaptic neurons within the
+    distance :math:`\\sigma \\sqrt{-2 \\ln p_{min}}` are visited.
 
     Parameters
     ----------
     sigma : float
         Width of the Gaussian function.
+    p_min : float
+        The minimum probability below which synapses are not created.
     normalize : bool
         Whether normalize the coordination.
     include_self : bool
         Whether create the conn at the same position.
-    seed : bool
-        The random seed.
+    seed : None, int
+        The random seed. If None, the global numpy random state is used.
+    parallel : bool
+        Whether visit the pre-synaptic neurons in parallel.
     """
 
-    def __init__(self, sigma, p_min=0., normalize=True, include_self=True, seed=None):
+    def __init__(self, sigma, p_min=0., normalize=True, include_self=True, seed=None, parallel=False):
         super(GaussianProb, self).__init__()
         self.sigma = sigma
         self.p_min = p_min
         self.normalize = normalize
         self.include_self = include_self
+        self.seed = seed
+        self.parallel = parallel
 
     def __call__(self, pre_indices, post_indices):
-        num_pre = np.size(pre_indices)
-        num_post = np.size(post_indices)
-        assert np.ndim(pre_indices) == 2
-        assert np.ndim(post_indices) == 2
-        pre_height, pre_width = pre_indices.shape
-        post_height, post_width = post_indices.shape
-
         # get the connections
-        i, j, p = [], [], []  # conn_i, conn_j, probabilities
-        for pre_i in range(num_pre):
-            a = _gaussian_prob(pre_i=pre_i,
-                               pre_width=pre_width,
-                               pre_height=pre_height,
-                               num_post=num_post,
-                               post_width=post_width,
-                               post_height=post_height,
-                               p_min=self.p_min,
-                               sigma=self.sigma,
-                               normalize=self.normalize,
-                               include_self=self.include_self)
-            i.extend(a[0])
-            j.extend(a[1])
-            p.extend(a[2])
-        p = np.asarray(p, dtype=np.float_)
-        selected_idxs = np.where(np.random.random(len(p)) < p)[0]
-        i = np.asarray(i, dtype=np.int_)[selected_idxs]
-        j = np.asarray(j, dtype=np.int_)[selected_idxs]
+        radius = _gaussian_radius(1., self.p_min, self.sigma)
+        i, j, p = _get_grid_conn(pre_indices, post_indices,
+                                 normalize=self.normalize,
+                                 include_self=self.include_self,
+                                 kind=_GAUSSIAN_PROB,
+                                 pars=(1., self.sigma, self.p_min),
+                                 radius=radius,
+                                 parallel=self.parallel)
+        rng = np.random if self.seed is None else np.random.RandomState(self.seed)
+        selected_idxs = np.where(rng.random_sample(len(p)) < p)[0]
+        i = i[selected_idxs]
+        j = j[selected_idxs]
         pre_indices = pre_indices.flatten()
         post_indices = post_indices.flatten()
         self.pre_ids = pre_indices[i]
@@ -597,44 +759,6 @@ class GaussianProb(Connector):
             self.num_post = post_indices.max()
 
 
-@nb.njit
-def _dog(pre_i, pre_width, pre_height,
-         num_post, post_width, post_height,
-         w_max_p, w_max_n, w_min, sigma_p, sigma_n,
-         normalize, include_self):
-    conn_i = []
-    conn_j = []
-    conn_w = []
-
-    # get normalized coordination
-    pre_coords = (pre_i // pre_width, pre_i % pre_width)
-    if normalize:
-        pre_coords = (pre_coords[0] / (pre_height - 1) if pre_height > 1 else 1.,
-                      pre_coords[1] / (pre_width - 1) if pre_width > 1 else 1.)
-
-    for post_i in range(num_post):
-        if (pre_i == post_i) and (not include_self):
-            continue
-
-        # get normalized coordination
-        post_coords = (post_i // post_width, post_i % post_width)
-        if normalize:
-            post_coords = (post_coords[0] / (post_height - 1) if post_height > 1 else 1.,
-                           post_coords[1] / (post_width - 1) if post_width > 1 else 1.)
-
-        # Compute Euclidean distance between two coordinates
-        distance = (pre_coords[0] - post_coords[0]) ** 2
-        distance += (pre_coords[1] - post_coords[1]) ** 2
-        # get weight and conn
-        value = w_max_p * np.exp(-distance / (2.0 * sigma_p ** 2)) - \
-                w_max_n * np.exp(-distance / (2.0 * sigma_n ** 2))
-        if np.abs(value) > w_min:
-            conn_i.append(pre_i)
-            conn_j.append(post_i)
-            conn_w.append(value)
-    return conn_i, conn_j, conn_w
-
-
 class DOG(Connector):
     """Builds a Difference-Of-Gaussian (dog) conn pattern between the two populations.
 
@@ -647,6 +771,11 @@ class DOG(Connector):
 
     where weights smaller than :math:`0.01 * abs(w_{max} - w_{min})` are not created and
     self-connections are avoided by default (parameter allow_self_connections).
+    Only the post-synaptic neurons within the cutoff distance of the wider
+    Gaussian function (where its weight is larger than :math:`w_{min}`)
+    are visited. If :math:`w_{max}^+` and :math:`w_{max}^-` have the opposite
+    signs, the cutoff distance is the one of the wider Gaussian function with
+    the amplitude of :math:`|w_{max}^+| + |w_{max}^-|`.
 
     Parameters
     ----------
@@ -661,48 +790,41 @@ class DOG(Connector):
         Whether normalize the coordination.
     include_self : bool
         Whether create the conn at the same position.
+    parallel : bool
+        Whether visit the pre-synaptic neurons in parallel.
     """
 
-    def __init__(self, sigmas, ws_max, w_min=None, normalize=True, include_self=True):
+    def __init__(self, sigmas, ws_max, w_min=None, normalize=True, include_self=True, parallel=False):
         super(DOG, self).__init__()
         self.sigma_p, self.sigma_n = sigmas
         self.w_max_p, self.w_max_n = ws_max
         self.w_min = np.abs(ws_max[0] - ws_max[1]) * 0.01 if w_min is None else w_min
         self.normalize = normalize
         self.include_self = include_self
+        self.parallel = parallel
 
     def __call__(self, pre_indices, post_indices):
-        num_pre = np.size(pre_indices)
-        num_post = np.size(post_indices)
-        assert np.ndim(pre_indices) == 2
-        assert np.ndim(post_indices) == 2
-        pre_height, pre_width = pre_indices.shape
-        post_height, post_width = post_indices.shape
-
-        # get the connections and weights
-        i, j, w = [], [], []  # conn_i, conn_j, weights
-        for pre_i in range(num_pre):
-            a = _dog(pre_i=pre_i,
-                     pre_width=pre_width,
-                     pre_height=pre_height,
-                     num_post=num_post,
-                     post_width=post_width,
-                     post_height=post_height,
-                     w_max_p=self.w_max_p,
-                     w_max_n=self.w_max_n,
-                     w_min=self.w_min,
-                     sigma_p=self.sigma_p,
-                     sigma_n=self.sigma_n,
-                     normalize=self.normalize,
-                     include_self=self.include_self)
-            i.extend(a[0])
-            j.extend(a[1])
-            w.extend(a[2])
+        # get the connections and weights, when "w_p" and "w_n" have the same
+        # sign, "|w_p * g_p - w_n * g_n| <= max(|w_p| * g_p, |w_n| * g_n)", so
+        # the weight is not larger than "w_min" out of both radii, otherwise,
+        # the weight is bounded by "(|w_p| + |w_n|) * g" of the wider Gaussian
+        if self.w_max_p * self.w_max_n >= 0.:
+            radius_p = _gaussian_radius(np.abs(self.w_max_p), self.w_min, self.sigma_p)
+            radius_n = _gaussian_radius(np.abs(self.w_max_n), self.w_min, self.sigma_n)
+            radius = -1. if min(radius_p, radius_n) < 0. else max(radius_p, radius_n)
+        else:
+            radius = _gaussian_radius(np.abs(self.w_max_p) + np.abs(self.w_max_n), self.w_min,
+                                      max(self.sigma_p, self.sigma_n))
+        i, j, w = _get_grid_conn(pre_indices, post_indices,
+                                 normalize=self.normalize,
+                                 include_self=self.include_self,
+                                 kind=_DOG,
+                                 pars=(self.w_max_p, self.sigma_p, self.w_min,
+                                       self.w_max_n, self.sigma_n),
+                                 radius=radius,
+                                 parallel=self.parallel)
 
         # format connections and weights
-        i = np.asarray(i, dtype=np.int_)
-        j = np.asarray(j, dtype=np.int_)
-        w = np.asarray(w, dtype=np.float_)
         pre_indices = pre_indices.flatten()
         post_indices = post_indices.flatten()
         self.pre_ids = pre_indices[i]
@@ -714,11 +836,520 @@ class DOG(Connector):
             self.num_post = post_indices.max()
 
 
+def _position_conn(pre_pos, post_pos, box, periodic, radius, cell_size, cell_num,
+                   occupied, cell_ptr, cell_idx, offsets, include_self, func, scale, is_prob,
+                   seeds, counts, post_ids, values):
+    # Visit the post-synaptic neurons in the neighboring cells of each
+    # pre-synaptic neuron (the cells are looked up in the sorted ids of
+    # the "occupied" cells), and connect them by the distance-dependent
+    # "scale * func" (the probability if "is_prob", otherwise the weight). As
+    # "_fixed_prob()", the first pass (when "counts" is empty) counts the
+    # connections, and the second pass writes them, with the same random
+    # numbers by reseeding each row block.
+    count_only = counts.shape[0] == 0
+    num_pre, dim = pre_pos.shape
+    num_neighbor = offsets.shape[0]
+    for block in nb.prange(seeds.shape[0]):
+        saved = _seed_rng(seeds[block])
+        cell = np.zeros(dim, dtype=np.int_)
+        neighbors = np.zeros(num_neighbor, dtype=np.int_)
+        for pre_i in range(block * _ROW_BLOCK, min((block + 1) * _ROW_BLOCK, num_pre)):
+            # the cell of the pre-synaptic neuron
+            for d in range(dim):
+                x = pre_pos[pre_i, d] % box[d] if periodic[d] else pre_pos[pre_i, d]
+                cell[d] = int(np.floor(x / cell_size[d]))
+            # the neighboring cells (without duplicates)
+            n = 0
+            for o in range(num_neighbor):
+                cell_id = 0
+                for d in range(dim):
+                    c = cell[d] + offsets[o, d]
+                    if periodic[d]:
+                        c = c % cell_num[d]
+                    elif c < 0 or c >= cell_num[d]:
+                        cell_id = -1
+                        break
+                    cell_id = cell_id * cell_num[d] + c
+                if cell_id >= 0:
+                    neighbors[n] = cell_id
+                    n += 1
+            cells = np.unique(neighbors[:n])
+
+            # the post-synaptic neurons in the radius
+            k0 = 0 if count_only else counts[pre_i]
+            k = k0
+            for cell_id in cells:
+                c = np.searchsorted(occupied, cell_id)
+                if c == occupied.shape[0] or occupied[c] != cell_id:
+                    continue
+                for idx in range(cell_ptr[c], cell_ptr[c + 1]):
+                    post_i = cell_idx[idx]
+                    if (pre_i == post_i) and (not include_self):
+                        continue
+                    distance = 0.
+                    for d in range(dim):
+                        diff = np.abs(pre_pos[pre_i, d] - post_pos[post_i, d])
+                        if periodic[d]:
+                            diff = diff % box[d]
+                            diff = min(diff, box[d] - diff)
+                        distance += diff ** 2
+                    distance = np.sqrt(distance)
+                    if distance > radius:
+                        continue
+                    value = scale * func(distance)
+                    if is_prob:
+                        selected = np.random.random() < value
+                    else:
+                        selected = value != 0.
+                    if selected:
+                        if not count_only:
+                            post_ids[k] = post_i
+                            values[k] = value
+                        k += 1
+            if count_only:
+                post_ids[pre_i] = k
+            else:
+                # sort the connections by the post-synaptic neurons
+                order = np.argsort(post_ids[k0: k])
+                post_ids[k0: k] = post_ids[k0: k][order]
+                values[k0: k] = values[k0: k][order]
+        load_rng_state(saved)
+
+
+_position_conn_serial = nb.njit(_position_conn)
+_position_conn_parallel = nb.njit(parallel=True)(_position_conn)
+
+
+def _format_position(pos):
+    pos = np.asarray(pos, dtype=np.float_)
+    if pos.ndim == 1:
+        pos = pos.reshape((-1, 1))
+    if pos.ndim != 2:
+        raise ModelUseError(f'The positions must have the shape of (num, dim), but got {pos.shape}.')
+    return np.ascontiguousarray(pos)
+
+
+def _get_position_conn(pre_pos, post_pos, radius, profile, is_prob, periodic,
+                       include_self, seed, parallel):
+    # get the pre-synaptic neuron indices, the post-synaptic neuron
+    # indices and the values of the connections by the cell list
+    num_pre, dim = pre_pos.shape
+    num_post = post_pos.shape[0]
+    if post_pos.shape[1] != dim:
+        raise ModelUseError(f'The positions of the pre- and post-synaptic neurons must have the '
+                            f'same dimension, but got {dim} != {post_pos.shape[1]}.')
+    if radius <= 0.:
+        raise ModelUseError(f'"radius" must be bigger than 0, but got {radius}.')
+
+    # the periodic boundaries, in which the box size of None
+    # (or "np.inf") means the dimension is not periodic
+    if periodic is None:
+        periodic = [None] * dim
+    elif not isinstance(periodic, (tuple, list, np.ndarray)):
+        periodic = [periodic] * dim
+    if len(periodic) != dim:
+        raise ModelUseError(f'"periodic" must have the box size of each of the {dim} '
+                            f'dimensions, but got {periodic}.')
+    box = np.array([np.inf if b is None else b for b in periodic], dtype=np.float_)
+    is_periodic = np.isfinite(box)
+    if np.any(box[is_periodic] <= 0.):
+        raise ModelUseError(f'The box size of the periodic boundaries must be bigger than 0, '
+                            f'but got {periodic}.')
+    box[~is_periodic] = 1.
+
+    # the cell list of the post-synaptic neurons, the cells have
+    # the size of (at least) "radius", so that the neighbors of a
+    # neuron are in the 3 ** dim cells around it, and only the
+    # cells occupied by the neurons are indexed
+    cell_num = np.zeros(dim, dtype=np.int_)
+    cell_size = np.zeros(dim, dtype=np.float_)
+    post_cells = np.zeros((num_post, dim), dtype=np.int_)
+    for d in range(dim):
+        if is_periodic[d]:
+            cell_num[d] = max(int(box[d] // radius), 1)
+            cell_size[d] = box[d] / cell_num[d]
+            post_cells[:, d] = np.floor((post_pos[:, d] % box[d]) / cell_size[d])
+            post_cells[:, d] = np.minimum(post_cells[:, d], cell_num[d] - 1)
+        else:
+            cell_size[d] = radius
+            post_cells[:, d] = np.floor(post_pos[:, d] / radius)
+    if not np.all(is_periodic):
+        # shift the cells of the non-periodic dimensions to start from zero
+        origin = np.where(is_periodic, 0, post_cells.min(axis=0))
+        post_cells -= origin
+        pre_pos = pre_pos - np.where(is_periodic, 0., origin * cell_size)
+        post_pos = post_pos - np.where(is_periodic, 0., origin * cell_size)
+        cell_num = np.where(is_periodic, cell_num, post_cells.max(axis=0) + 1)
+    if np.prod(cell_num.astype(np.float_)) >= 2. ** 62:
+        raise ModelUseError(f'The positions span too many cells of the size "radius" '
+                            f'({cell_num.tolist()}), please use a bigger radius.')
+    cell_ids = np.zeros(num_post, dtype=np.int_)
+    for d in range(dim):
+        cell_ids = cell_ids * cell_num[d] + post_cells[:, d]
+    occupied, cell_ids = np.unique(cell_ids, return_inverse=True)
+    cell_ptr, cell_idx = _get_csr(cell_ids.ravel(), occupied.shape[0])
+    offsets = np.array(np.meshgrid(*[[-1, 0, 1]] * dim, indexing='ij')).reshape((dim, -1)).T
+    offsets = np.ascontiguousarray(offsets, dtype=np.int_)
+
+    # the connections
+    seeds = _get_block_seeds(num_pre, seed)
+    kernel = _position_conn_parallel if parallel else _position_conn_serial
+    if isinstance(profile, Dispatcher):
+        func, scale = profile, 1.
+    else:
+        func, scale = _uniform_profile, float(profile)
+    args = (pre_pos, post_pos, box, is_periodic, float(radius), cell_size, cell_num,
+            occupied, cell_ptr, cell_idx, offsets, include_self, func, scale, is_prob, seeds)
+    nums = np.zeros(num_pre, dtype=np.int_)
+    kernel(*args, np.zeros(0, dtype=np.int_), nums, np.zeros(0, dtype=np.float_))
+    counts = np.zeros(num_pre + 1, dtype=np.int_)
+    counts[1:] = np.cumsum(nums)
+    post_ids = np.zeros(counts[-1], dtype=np.int_)
+    values = np.zeros(counts[-1], dtype=np.float_)
+    kernel(*args, counts, post_ids, values)
+    pre_ids = np.repeat(np.arange(num_pre, dtype=np.int_), nums)
+    return pre_ids, post_ids, values
+
+
+@nb.njit
+def _uniform_profile(distance):
+    return 1.
+
+
+def _format_profile(profile):
+    # the distance-dependent profile, which is a number or a Numba
+    # function (the number is scaled from the shared uniform profile,
+    # so that the kernel is not compiled again for each connector)
+    if isinstance(profile, (int, float)):
+        return float(profile)
+    if not callable(profile):
+        raise ModelUseError(f'The profile must be a number, or a callable function '
+                            f'of the distance, but got {type(profile)}.')
+    if not isinstance(profile, Dispatcher):
+        profile = nb.njit(profile)
+    return profile
+
+
+class PositionProb(Connector):
+    """Connect the neurons at the arbitrary positions with the
+    distance-dependent probability.
+
+    The pre- and post-synaptic neurons within the distance ``radius``
+    are connected with the probability ``prob(distance)``. The candidate
+    pairs are found by a cell list (with the cell size of ``radius``)
+    of the post-synaptic neurons, so that the cost is proportional to
+    the number of the neuron pairs in the radius. Only the cells occupied
+    by the neurons are indexed, so the memory of the cell list follows the
+    number of the neurons, rather than the extent of the positions.
+
+    Parameters
+    ----------
+    pre_pos : np.ndarray
+        The positions of the pre-synaptic neurons, with the shape of
+        ``(num_pre, dim)``, in the order of the neuron indices.
+    post_pos : np.ndarray
+        The positions of the post-synaptic neurons, with the shape of ``(num_post, dim)``.
+    radius : float
+        The maximum distance of the connections.
+    prob : float, callable
+        The connection probability, or the function ``prob(distance)``
+        which can be compiled by Numba.
+    periodic : None, float, tuple
+        The box size of the periodic boundaries (for all the dimensions,
+        or for each dimension). If None, the boundaries are not periodic.
+        The dimension with the box size of None (or ``np.inf``) in the
+        tuple is not periodic.
+    include_self : bool
+        Whether create (i, i) conn ?
+    seed : None, int
+        Seed the random generator. If None, the seed is drawn from the
+        global numpy random state.
+    parallel : bool
+        Whether generate the connections in parallel. The result is the
+        same with the serial generation.
+    """
+
+    def __init__(self, pre_pos, post_pos, radius, prob=1., periodic=None,
+                 include_self=True, seed=None, parallel=False):
+        super(PositionProb, self).__init__()
+        self.pre_pos = _format_position(pre_pos)
+        self.post_pos = _format_position(post_pos)
+        self.radius = radius
+        self.prob = _format_profile(prob)
+        self.periodic = periodic
+        self.include_self = include_self
+        self.seed = seed
+        self.parallel = parallel
+
+    def __call__(self, pre_indices, post_indices):
+        pre_indices = np.asarray(pre_indices).flatten()
+        post_indices = np.asarray(post_indices).flatten()
+        if len(self.pre_pos) != len(pre_indices) or len(self.post_pos) != len(post_indices):
+            raise ModelUseError(f'The positions must be provided for each neuron, but got '
+                                f'{len(self.pre_pos)} pre-synaptic positions for {len(pre_indices)} '
+                                f'neurons, and {len(self.post_pos)} post-synaptic positions for '
+                                f'{len(post_indices)} neurons.')
+        i, j, _ = _get_position_conn(self.pre_pos, self.post_pos, self.radius, self.prob,
+                                     is_prob=True, periodic=self.periodic,
+                                     include_self=self.include_self,
+                                     seed=self.seed, parallel=self.parallel)
+        self.pre_ids = pre_indices[i]
+        self.post_ids = post_indices[j]
+        if self.num_pre is None:
+            self.num_pre = pre_indices.max()
+        if self.num_post is None:
+            self.num_post = post_indices.max()
+
+
+class PositionWeight(Connector):
+    """Connect the neurons at the arbitrary positions with the
+    distance-dependent weight.
+
+    All the pre- and post-synaptic neurons within the distance ``radius``
+    are connected (except the ones with the zero weight), and the weight
+    is given by ``weight(distance)``. The candidate pairs are found by
+    a cell list of the post-synaptic neurons (see ``PositionProb``).
+
+    Parameters
+    ----------
+    pre_pos : np.ndarray
+        The positions of the pre-synaptic neurons, with the shape of
+        ``(num_pre, dim)``, in the order of the neuron indices.
+    post_pos : np.ndarray
+        The positions of the post-synaptic neurons, with the shape of ``(num_post, dim)``.
+    radius : float
+        The maximum distance of the connections.
+    weight : float, callable
+        The connection weight, or the function ``weight(distance)``
+        which can be compiled by Numba.
+    periodic : None, float, tuple
+        The box size of the periodic boundaries (for all the dimensions,
+        or for each dimension). If None, the boundaries are not periodic.
+        The dimension with the box size of None (or ``np.inf``) in the
+        tuple is not periodic.
+    include_self : bool
+        Whether create (i, i) conn ?
+    parallel : bool
+        Whether generate the connections in parallel.
+    """
+
+    def __init__(self, pre_pos, post_pos, radius, weight=1., periodic=None,
+                 include_self=True, parallel=False):
+        super(PositionWeight, self).__init__()
+        self.pre_pos = _format_position(pre_pos)
+        self.post_pos = _format_position(post_pos)
+        self.radius = radius
+        self.weight = _format_profile(weight)
+        self.periodic = periodic
+        self.include_self = include_self
+        self.parallel = parallel
+
+    def __call__(self, pre_indices, post_indices):
+        pre_indices = np.asarray(pre_indices).flatten()
+        post_indices = np.asarray(post_indices).flatten()
+        if len(self.pre_pos) != len(pre_indices) or len(self.post_pos) != len(post_indices):
+            raise ModelUseError(f'The positions must be provided for each neuron, but got '
+                                f'{len(self.pre_pos)} pre-synaptic positions for {len(pre_indices)} '
+                                f'neurons, and {len(self.post_pos)} post-synaptic positions for '
+                                f'{len(post_indices)} neurons.')
+        i, j, w = _get_position_conn(self.pre_pos, self.post_pos, self.radius, self.weight,
+                                     is_prob=False, periodic=self.periodic,
+                                     include_self=self.include_self,
+                                     seed=0, parallel=self.parallel)
+        self.pre_ids = pre_indices[i]
+        self.post_ids = post_indices[j]
+        self.weights = w
+        if self.num_pre is None:
+            self.num_pre = pre_indices.max()
+        if self.num_post is None:
+            self.num_post = post_indices.max()
+
+
+def _check_graph_size(pre_indices, post_indices):
+    if len(pre_indices) != len(post_indices):
+        raise ModelUseError(f'The graph connectors need the pre- and post-synaptic groups with '
+                            f'the same size, but got {len(pre_indices)} != {len(post_indices)}.')
+    return len(pre_indices)
+
+
+def _get_graph_conn(sources, targets, num, directed):
+    # get the sorted pre- and post-synaptic neuron indices of the
+    # edges (in both directions if the graph is undirected)
+    if not directed:
+        sources, targets = np.concatenate([sources, targets]), np.concatenate([targets, sources])
+    keys = np.unique(sources.astype(np.int64) * num + targets)
+    pre_ids, post_ids = np.divmod(keys, num)
+    return pre_ids.astype(np.int_), post_ids.astype(np.int_)
+
+
+@nb.njit
+def _barabasi_albert(num, m, seed):
+    # Each new node is attached to "m" distinct old nodes, which are
+    # sampled proportionally to their degrees by drawing from the array
+    # of the repeated endpoints of all the edges. The expected cost is O(E).
+    saved = _seed_rng(seed)
+    num_edge = (num - m) * m
+    sources = np.zeros(num_edge, dtype=np.int_)
+    targets = np.zeros(num_edge, dtype=np.int_)
+    repeated = np.zeros(2 * num_edge, dtype=np.int_)
+    chosen = np.arange(m)
+    k = 0
+    for node in range(m, num):
+        if node > m:
+            n = 0
+            while n < m:
+                target = repeated[np.random.randint(0, 2 * k)]
+                is_new = True
+                for i in range(n):
+                    if chosen[i] == target:
+                        is_new = False
+                        break
+                if is_new:
+                    chosen[n] = target
+                    n += 1
+        for i in range(m):
+            sources[k] = node
+            targets[k] = chosen[i]
+            repeated[2 * k] = node
+            repeated[2 * k + 1] = chosen[i]
+            k += 1
+    load_rng_state(saved)
+    return sources, targets
+
+
 class ScaleFree(Connector):
-    def __init__(self):
-        raise NotImplementedError
+    """Build a Barabási–Albert scale-free network by the preferential attachment.
+
+    Starting from ``m`` isolated nodes, each new node is connected to
+    ``m`` existing nodes, which are chosen with the probability proportional
+    to their degrees. The pre- and post-synaptic groups are the same nodes,
+    so they must have the same size.
+
+    Parameters
+    ----------
+    m : int
+        The number of the edges to attach from a new node to the existing nodes.
+    directed : bool
+        If True, only connect the new nodes to the existing nodes. Otherwise,
+        the connections are made in both directions.
+    seed : None, int
+        Seed the random generator. If None, the seed is drawn from the
+        global numpy random state.
+    """
+
+    def __init__(self, m, directed=False, seed=None):
+        super(ScaleFree, self).__init__()
+        self.m = m
+        self.directed = directed
+        self.seed = seed
+
+    def __call__(self, pre_indices, post_indices):
+        pre_indices = np.asarray(pre_indices).flatten()
+        post_indices = np.asarray(post_indices).flatten()
+        num = _check_graph_size(pre_indices, post_indices)
+        if not (1 <= self.m < num):
+            raise ModelUseError(f'"m" must be in [1, {num}), but got {self.m}.')
+
+        rng = np.random if self.seed is None else np.random.RandomState(self.seed)
+        sources, targets = _barabasi_albert(num, int(self.m), rng.randint(0, 2 ** 31 - 1))
+        pre_ids, post_ids = _get_graph_conn(sources, targets, num, self.directed)
+
+        self.pre_ids = pre_indices[pre_ids]
+        self.post_ids = post_indices[post_ids]
+        if self.num_pre is None:
+            self.num_pre = pre_indices.max()
+        if self.num_post is None:
+            self.num_post = post_indices.max()
+
+
+@nb.njit
+def _watts_strogatz(num, half, prob, seed):
+    # Rewire the edges of the ring lattice one by one, in which the
+    # (undirected) edges are kept in a hash set, so that the duplicate
+    # edge is checked in O(1). The expected cost is O(E).
+    saved = _seed_rng(seed)
+    num_edge = num * half
+    sources = np.zeros(num_edge, dtype=np.int_)
+    targets = np.zeros(num_edge, dtype=np.int_)
+    degrees = np.full(num, 2 * half, dtype=np.int_)
+    edges = set()
+    k = 0
+    for u in range(num):
+        for i in range(1, half + 1):
+            v = (u + i) % num
+            sources[k] = u
+            targets[k] = v
+            edges.add(min(u, v) * num + max(u, v))
+            k += 1
+    for k in range(num_edge):
+        if np.random.random() >= prob:
+            continue
+        u = sources[k]
+        if degrees[u] >= num - 1:
+            continue
+        w = np.random.randint(0, num)
+        while w == u or (min(u, w) * num + max(u, w)) in edges:
+            w = np.random.randint(0, num)
+        v = targets[k]
+        edges.discard(min(u, v) * num + max(u, v))
+        edges.add(min(u, w) * num + max(u, w))
+        degrees[v] -= 1
+        degrees[w] += 1
+        targets[k] = w
+    load_rng_state(saved)
+    return sources, targets
 
 
 class SmallWorld(Connector):
-    def __init__(self):
-        raise NotImplementedError
+    """Build a Watts–Strogatz small-world network.
+
+    Each node is first connected to its ``num_neighbor // 2`` nearest
+    neighbors on each side of a ring. Then each edge ``(u, v)`` of the
+    ring lattice is rewired to ``(u, w)`` with the probability ``prob``,
+    where ``w`` is drawn uniformly without creating the self-connections
+    and the duplicate edges (the edge is kept if ``u`` is already connected
+    to all the other nodes). The edges are checked in a hash set, so the
+    expected cost is O(E), and the number of the edges is always
+    ``num * (num_neighbor // 2)``. The pre- and post-synaptic groups are
+    the same nodes, so they must have the same size.
+
+    Parameters
+    ----------
+    num_neighbor : int
+        Each node is connected to ``num_neighbor`` nearest neighbors in
+        the ring lattice (``num_neighbor - 1`` if it is odd).
+    prob : float
+        The probability of rewiring each edge.
+    directed : bool
+        If True, the edges are only connected from ``u`` to ``v``.
+        Otherwise, the connections are made in both directions.
+    seed : None, int
+        Seed the random generator. If None, the seed is drawn from the
+        global numpy random state.
+    """
+
+    def __init__(self, num_neighbor, prob, directed=False, seed=None):
+        super(SmallWorld, self).__init__()
+        self.num_neighbor = num_neighbor
+        self.prob = prob
+        self.directed = directed
+        self.seed = seed
+
+    def __call__(self, pre_indices, post_indices):
+        pre_indices = np.asarray(pre_indices).flatten()
+        post_indices = np.asarray(post_indices).flatten()
+        num = _check_graph_size(pre_indices, post_indices)
+        if not (0 <= self.num_neighbor < num):
+            raise ModelUseError(f'"num_neighbor" must be in [0, {num}), but got {self.num_neighbor}.')
+
+        rng = np.random if self.seed is None else np.random.RandomState(self.seed)
+        sources, targets = _watts_strogatz(num, self.num_neighbor // 2, float(self.prob),
+                                           rng.randint(0, 2 ** 31 - 1))
+        pre_ids, post_ids = _get_graph_conn(sources, targets, num, self.directed)
+
+        self.pre_ids = pre_indices[pre_ids]
+        self.post_ids = post_indices[post_ids]
+        if self.num_pre is None:
+            self.num_pre = pre_indices.max()
+        if self.num_post is None:
+            self.num_post = post_indices.max()
@@ -13,8 +13,12 @@ from .constants import ARG_KEYWORDS
 from .constants import INPUT_OPERATIONS
 from .constants import NEU_GROUP_TYPE
 from .constants import SCALAR_MODE
+from .constants import SPIKE_KEYWORDS
 from .constants import SYN_CONN_TYPE
+from .runner import BatchFunc
 from .runner import Runner
+from .runner import get_build_report
+from .runner import get_loop_func
 from .types import NeuState
 from .types import ObjState
 from .types import SynState
@@ -103,7 +107,7 @@ class ObjType(object):
 
             # function arg
             for arg in inspect.getfullargspec(func).args:
-                if arg in ARG_KEYWORDS:
+                if arg in ARG_KEYWORDS + SPIKE_KEYWORDS:
                     continue
                 self.step_args.add(arg)
 
@@ -177,13 +181,20 @@ class ParsUpdate(dict):
     - updates : parameters to update
     - heters : parameters to update, and they are heterogeneous
     - model : the model which this ParsUpdate belongs to
+    - batch : the batch size of the ensemble
+    - batch_values : parameters which have a value for each batch member
+    - runtime : parameters which are passed to the step functions as the
+      arrays, rather than compiled as the constants, so that they can be
+      updated in place between the runs without the recompilation
 
     """
 
     def __init__(self,
                  all_pars,
                  num,
-                 model):
+                 model,
+                 batch=None,
+                 runtime=()):
         assert isinstance(all_pars, dict)
         assert isinstance(num, int)
 
@@ -191,7 +202,27 @@ class ParsUpdate(dict):
                                          num=num,
                                          heters=dict(),
                                          updates=dict(),
-                                         model=model)
+                                         model=model,
+                                         batch=batch,
+                                         batch_values=dict(),
+                                         runtime=dict())
+        for key in runtime:
+            if key not in all_pars:
+                raise ModelUseError(f'Runtime parameter "{key}" is not defined in '
+                                    f'"{model.name}" variable scope.')
+            if not isinstance(all_pars[key], (int, float, np.ndarray)):
+                raise ModelUseError(f'Runtime parameter "{key}" must be a number or an array, '
+                                    f'but we got {type(all_pars[key])}.')
+            self._set_runtime(key, all_pars[key])
+
+    def _set_runtime(self, key, value):
+        # the array is updated in place, so that the compiled
+        # functions, which get it from the ensemble, use the new value
+        value = np.asarray(value, dtype=profile.get_float_type()).reshape((-1,))
+        if key in self.runtime and self.runtime[key].shape == value.shape:
+            self.runtime[key][:] = value
+        else:
+            self.runtime[key] = value.copy()
 
     def __setitem__(self, key, value):
         # check the existence of "key"
@@ -200,6 +231,20 @@ class ParsUpdate(dict):
                                 f'Or, "{key}" is used to compute an intermediate variable, and is not '
                                 f'directly used by the step functions.')
 
+        # cast the float array into the default float type
+        if isinstance(value, np.ndarray) and value.dtype.kind == 'f':
+            value = np.asarray(value, dtype=profile.get_float_type())
+
+        # the value of each batch member, with the shape of "(batch, num)" or "(batch, 1)"
+        if self.batch is not None and np.ndim(value) == 2 and np.shape(value)[0] == self.batch:
+            if np.shape(value)[1] not in [1, self.num]:
+                raise ModelUseError(f'The batched parameter "{key}" must have the shape of '
+                                    f'({self.batch}, {self.num}) or ({self.batch}, 1), '
+                                    f'but we got {np.shape(value)}.')
+            value = np.ascontiguousarray(np.broadcast_to(value, (self.batch, self.num)))
+            self.batch_values[key] = value
+            self.heters[key] = value = value[0]
+
         # check value size
         val_size = np.size(value)
         if val_size != 1:
@@ -212,6 +257,8 @@ class ParsUpdate(dict):
         # update
         if profile.run_on_cpu():
             self.updates[key] = value
+            if key in self.runtime:
+                self._set_runtime(key, value)
         else:
             if isinstance(value, (int, float)):
                 self.updates[key] = value
@@ -288,6 +335,18 @@ class ParsUpdate(dict):
     def model(self):
         return super(ParsUpdate, self).__getitem__('model')
 
+    @property
+    def batch(self):
+        return super(ParsUpdate, self).__getitem__('batch')
+
+    @property
+    def batch_values(self):
+        return super(ParsUpdate, self).__getitem__('batch_values')
+
+    @property
+    def runtime(self):
+        return super(ParsUpdate, self).__getitem__('runtime')
+
     @property
     def all(self):
         origins = deepcopy(self.origins)
@@ -306,12 +365,36 @@ class Ensemble(object):
         The number of the neurons/synapses.
     model : ObjType
         The (neuron/synapse) model.
-    monitors : list, tuple, None
-        Variables to monitor.
+    monitors : list, tuple, dict, None
+        Variables to monitor. Each item can be ``key``, ``(key, indices)``,
+        ``(key, options)`` or ``(key, indices, options)``, where ``options``
+        is a dict of ``every`` (record every k time steps), ``window``
+        (only record in the time window ``(t0, t1)``) and ``event`` (record
+        the spikes as the sparse events, see ``brainpy.tools.SpikeEvents``,
+        which are also given by ``mon.key_t`` and ``mon.key_i``). The reducer
+        monitor is specified by ``reduce`` (``mean``, ``sum``, ``var``, ``count``
+        or ``hist`` with the bin edges ``bins``), which reduces over the
+        neurons at each time step (``axis='population'``), or accumulates
+        over the time steps for each neuron (``axis='time'``). The dict form is
+        ``{key: indices}`` or ``{key: {'indices': ..., 'every': ..., 'window': ...}}``.
     pars_update : dict, None
         Parameters to update.
     cls_type : str
         Class type.
+    mon_dir : str, None
+        The directory to store the monitors. If provided, the monitors
+        are backed by memory-mapped files in this directory (see
+        ``brainpy.tools.memmap_monitor()``), rather than in-memory arrays.
+    batch : int, None
+        The batch size. Each batch member has its own state, hand-overs,
+        and parameters (set by the value with the shape of ``(batch, num)``),
+        but shares the connectivity and the compiled functions. In the JIT
+        mode, the batch members run in parallel in one batched kernel.
+    runtime_pars : tuple, list, None
+        The parameters which are passed to the step functions as arrays,
+        rather than compiled as constants. Setting them by ``pars[key] = value``
+        takes effect in the next run without rebuilding the functions (a
+        change between the homogeneous and heterogeneous value rebuilds).
     """
 
     def __init__(
@@ -323,6 +406,9 @@ class Ensemble(object):
             pars_update: typing.Dict,
             cls_type: str,
             satisfies: dict = None,
+            mon_dir: str = None,
+            batch: int = None,
+            runtime_pars: typing.Union[typing.Tuple, typing.List] = None,
     ):
         # class type
         # -----------
@@ -345,9 +431,21 @@ class Ensemble(object):
         # ---
         self.num = num
 
+        # batch
+        # -----
+        if batch is not None:
+            if not isinstance(batch, int) or batch < 1:
+                raise ModelUseError(f'"batch" must be a positive int, but got {batch}.')
+            if mon_dir is not None:
+                raise ModelUseError('The batched ensemble does not support "mon_dir".')
+        self.batch = batch
+        self._batch_attrs = {}
+        self._batch_mons = []
+
         # parameters
         # ----------
-        self.pars = ParsUpdate(all_pars=model.step_scopes, num=num, model=model)
+        self.pars = ParsUpdate(all_pars=model.step_scopes, num=num, model=model, batch=batch,
+                               runtime=() if runtime_pars is None else runtime_pars)
         pars_update = dict() if pars_update is None else pars_update
         if not isinstance(pars_update, dict):
             raise ModelUseError('"pars_update" must be a dict.')
@@ -356,23 +454,36 @@ class Ensemble(object):
 
         # monitors
         # ---------
+        if mon_dir is not None and not isinstance(mon_dir, str):
+            raise ModelUseError(f'"mon_dir" must be a str, not {type(mon_dir)}.')
+        self.mon_dir = mon_dir
         self.mon = tools.DictPlus()
         self._mon_vars = []
         if monitors is not None:
             if isinstance(monitors, (list, tuple)):
                 for var in monitors:
                     if isinstance(var, str):
-                        self._mon_vars.append((var, None))
-                        self.mon[var] = np.empty((1, 1), dtype=np.float_)
+                        self._mon_vars.append((var, None, {}))
+                        self.mon[var] = np.empty((1, 1), dtype=profile.get_float_type())
                     elif isinstance(var, (tuple, list)):
-                        self._mon_vars.append((var[0], var[1]))
-                        self.mon[var[0]] = np.empty((1, 1), dtype=np.float_)
+                        if len(var) == 2 and isinstance(var[1], dict):
+                            self._mon_vars.append(_format_mon_var(var[0], None, var[1]))
+                        elif len(var) in [2, 3]:
+                            self._mon_vars.append(_format_mon_var(*var))
+                        else:
+                            raise ModelUseError(f'Unknown monitor item: {str(var)}')
+                        self.mon[var[0]] = np.empty((1, 1), dtype=profile.get_float_type())
                     else:
                         raise ModelUseError(f'Unknown monitor item: {str(var)}')
             elif isinstance(monitors, dict):
                 for k, v in monitors.items():
-                    self._mon_vars.append((k, v))
-                    self.mon[k] = np.empty((1, 1), dtype=np.float_)
+                    if isinstance(v, dict):
+                        options = dict(v)
+                        indices = options.pop('indices', None)
+                        self._mon_vars.append(_format_mon_var(k, indices, options))
+                    else:
+                        self._mon_vars.append((k, v, {}))
+                    self.mon[k] = np.empty((1, 1), dtype=profile.get_float_type())
             else:
                 raise ModelUseError(f'Unknown monitors type: {type(monitors)}')
 
@@ -385,6 +496,9 @@ class Ensemble(object):
         # 1. attributes
         # 2. functions
         for attr_key, attr_val in model.hand_overs.items():
+            if batch is not None and isinstance(attr_val, np.ndarray):
+                # each batch member has its own copy
+                attr_val = np.repeat(attr_val[None], batch, axis=0)
             setattr(self, attr_key, attr_val)
 
         # satisfies
@@ -416,7 +530,7 @@ class Ensemble(object):
         # get function arguments
         for i, func in enumerate(self.model.steps):
             for arg in inspect.getfullargspec(func).args:
-                if not (arg in ARG_KEYWORDS + ['self']) and not hasattr(self, arg):
+                if not (arg in ARG_KEYWORDS + SPIKE_KEYWORDS + ['self']) and not hasattr(self, arg):
                     raise ModelUseError(f'Function "{self.model.step_names[i]}" in "{self.model.name}" '
                                         f'requires "{arg}" as argument, but "{arg}" is not defined in "{self.name}".')
 
@@ -432,25 +546,31 @@ class Ensemble(object):
         else:
             raise ValueError
 
-    def _build(self, inputs=None, mon_length=0):
+    def _build(self, inputs=None, mon_length=0, profile_steps=None, mon_ts=None):
         if profile.run_on_gpu():
             if self.model.mode != SCALAR_MODE:
                 raise ModelUseError('GPU mode only support scalar-based mode.')
 
         # prerequisite
         self.type_checking()
+        t0 = time.time()
+        self.runner.reset_build_profile()
 
         # results
         results = dict()
 
-        # inputs
+        # the runtime parameter arrays used by the built functions
+        self._built_runtime = dict(self.pars.runtime)
+
+        # inputs (clear the inputs of the last build)
+        self.runner._inputs.clear()
         if inputs:
             r = self.runner.get_codes_of_input(inputs)
             results.update(r)
 
         # monitors
         if len(self._mon_vars):
-            mon, r = self.runner.get_codes_of_monitor(self._mon_vars, run_length=mon_length)
+            mon, r = self.runner.get_codes_of_monitor(self._mon_vars, run_length=mon_length, ts=mon_ts)
             results.update(r)
             self.mon.clear()
             self.mon.update(mon)
@@ -460,19 +580,131 @@ class Ensemble(object):
         results.update(r)
 
         # merge
-        calls = self.runner.merge_codes(results)
+        calls = self.runner.merge_codes(results, profile_steps=profile_steps)
 
         if self._cls_type == SYN_CONN_TYPE:
             if self.delay_len > 1:
                 calls.append(f'{self.name}.ST._update_delay_indices()')
 
+        build_profile = self.runner.build_profile
+        build_profile['step_codegen'] = time.time() - t0 - build_profile['integrator_codegen'] - \
+                                        build_profile['exec']
         return calls
 
+    def _is_runtime_changed(self):
+        # whether the runtime parameter arrays are replaced (because
+        # their sizes are changed) after the functions are built
+        built = getattr(self, '_built_runtime', {})
+        return any([built.get(k, None) is not v for k, v in self.pars.runtime.items()])
+
+    def _set_batch_member(self, i):
+        # switch the batched states (including the states of the pre-
+        # and post-synaptic groups), hand-overs, parameters and monitors
+        # to the i-th batch member, so the compiled functions, which get
+        # their arguments from the ensemble, run on the member's data
+        if not self._batch_attrs:
+            for key, val in vars(self).items():
+                if isinstance(val, ObjState) and val._batch is not None:
+                    self._batch_attrs[key] = val
+            for key in self.model.hand_overs.keys():
+                if isinstance(getattr(self, key), np.ndarray):
+                    self._batch_attrs[key] = getattr(self, key)
+        for key, val in self._batch_attrs.items():
+            setattr(self, key, val.get_member(i) if isinstance(val, ObjState) else val[i])
+        for key, val in self.pars.batch_values.items():
+            self.pars.updates[key] = val[i]
+        if self._batch_mons:
+            self.mon = self._batch_mons[i]
+            self.runner.set_batch_member(i)
+
+    def _end_batch(self):
+        # restore the batched data, and merge the monitors of the batch members
+        for key, val in self._batch_attrs.items():
+            setattr(self, key, val)
+        self._batch_attrs = {}
+        for key, val in self.pars.batch_values.items():
+            self.pars.updates[key] = val[0]
+        if self._batch_mons:
+            self.runner.set_batch_member(0)
+            self.runner._batch_buffers = []
+            self.mon = self.runner.merge_batch_monitors(self._batch_mons)
+            self._batch_mons = []
+
+    def _get_checkpoint(self):
+        # the dynamical state: "ST" data (including the delay buffers),
+        # the delay pointers, and the array hand-overs (like the spike
+        # pointer "idx" of "SpikeTimeInput")
+        arrays = {'ST': self.ST['_data']}
+        meta = {}
+        if isinstance(self.ST, SynState):
+            meta['delay_in'] = int(self.ST._delay_in)
+            meta['delay_out'] = int(self.ST._delay_out)
+        for key in self.model.hand_overs.keys():
+            val = getattr(self, key)
+            if isinstance(val, np.ndarray):
+                arrays[f'hand_over.{key}'] = val
+        return arrays, meta
+
+    def _set_checkpoint(self, arrays, meta):
+        # copy the data into the existing arrays, which
+        # are referenced by the compiled functions
+        if arrays['ST'].shape != self.ST['_data'].shape:
+            raise ModelUseError(f'The shape of "{self.name}.ST" in the checkpoint is {arrays["ST"].shape}, '
+                                f'but we got {self.ST["_data"].shape}.')
+        self.ST['_data'][...] = arrays['ST']
+        if isinstance(self.ST, SynState):
+            self.ST._delay_in = meta['delay_in']
+            self.ST._delay_out = meta['delay_out']
+        for key in self.model.hand_overs.keys():
+            if f'hand_over.{key}' in arrays:
+                getattr(self, key)[...] = arrays[f'hand_over.{key}']
+
     @property
     def requires(self):
         return self.model.requires
 
-    def run(self, duration, inputs=(), report=False, report_percent=0.1):
+    def run(self, duration, inputs=(), report=False, report_percent=0.1, loop='python',
+            profile_build=False, profile_steps=False, seed=None):
+        """Run the ensemble for the given duration.
+
+        Parameters
+        ----------
+        duration : int, float, tuple, list
+            The amount of simulation time to run for.
+        inputs : list, tuple
+            The inputs with the format of ``(key, value, [operation])``.
+        report : bool
+            Report the progress of the simulation.
+        report_percent : float
+            The speed to report simulation progress.
+        loop : str
+            The way to run the time loop, ``'python'`` or ``'compiled'``.
+            See ``Network.run()`` for details.
+        profile_build : bool
+            Whether to profile the build phase. If ``True``, the JIT
+            functions are compiled before the time loop, and the build
+            report (see ``Network.build()``) is returned.
+        profile_steps : bool, int
+            Whether to time each schedule entry in the simulation. If it is
+            an integer ``k``, the schedule entries are timed every ``k`` time
+            steps. The result can be obtained by ``get_step_profile()``.
+        seed : int, list, None
+            The random seed. For the batched ensemble, the batch member
+            ``i`` is seeded by ``seed + i`` (or ``seed[i]`` if a list is
+            given), so that each member has its own random stream.
+
+        Returns
+        -------
+        report : dict, None
+            The build report if ``profile_build=True``.
+        """
+        if loop not in ['python', 'compiled']:
+            raise ModelUseError(f'Only support "python" and "compiled" loop, not "{loop}".')
+        profile_steps = _format_profile_steps(profile_steps, loop)
+        seeds = _format_seeds(seed, self.batch)
+        if self.batch is not None and profile.run_on_gpu():
+            raise ModelUseError('The batched ensemble is not supported on GPU.')
+
         # times
         # ------
         if isinstance(duration, (int, float)):
@@ -541,47 +773,221 @@ class Ensemble(object):
 
         # get step function
         # -------------------
+        t_build = time.time()
+        if self.batch is not None:
+            # build the functions with the data of the first batch member
+            self._set_batch_member(0)
         lines_of_call = self._build(inputs=formatted_inputs,
-                                    mon_length=run_length)
-        code_lines = ['def step_func(_t, _i, _dt):']
-        code_lines.extend(lines_of_call)
+                                    mon_length=run_length,
+                                    profile_steps=profile_steps,
+                                    mon_ts=times)
+        if profile_build:
+            self.runner.compile_step_funcs(lines_of_call, dt)
+        t0 = time.time()
         code_scopes = {self.name: self, f"{self.name}_runner": self.runner}
-        if profile.run_on_gpu():
-            code_scopes['cuda'] = cuda
-        func_code = '\n  '.join(code_lines)
-        exec(compile(func_code, '', 'exec'), code_scopes)
-        step_func = code_scopes['step_func']
-        if profile.show_format_code():
-            tools.show_code_str(func_code)
-        if profile.show_code_scope():
-            tools.show_code_scope(code_scopes, ['__builtins__', 'step_func'])
+        batch_func = None
+        if _use_batch_func(self.batch, profile_steps):
+            batch_func = BatchFunc(lines_of_call, code_scopes, [self], self.batch)
+        elif loop == 'compiled':
+            loop_func = get_loop_func(lines_of_call, code_scopes)
+        else:
+            code_lines = ['def step_func(_t, _i, _dt):']
+            code_lines.extend(lines_of_call)
+            if profile.run_on_gpu():
+                code_scopes['cuda'] = cuda
+            if profile_steps is not None:
+                code_scopes['_perf_counter'] = time.perf_counter
+            func_code = '\n  '.join(code_lines)
+            exec(compile(func_code, '', 'exec'), code_scopes)
+            step_func = code_scopes['step_func']
+            if profile.show_format_code():
+                tools.show_code_str(func_code)
+            if profile.show_code_scope():
+                tools.show_code_scope(code_scopes, ['__builtins__', 'step_func'])
+        if profile_build:
+            t_codegen = time.time() - t0
+            t0 = time.time()
+            if loop == 'compiled' and batch_func is None:
+                loop_func(times, dt, 0, 0)
+            build_report = get_build_report([self], {'codegen': t_codegen,
+                                                     'numba_compile': time.time() - t0})
+            build_report['total'] = time.time() - t_build
 
         # run the model
         # -------------
-        if report:
-            t0 = time.time()
-            step_func(_t=times[0], _i=0, _dt=dt)
-            print('Compilation used {:.4f} s.'.format(time.time() - t0))
-
-            print("Start running ...")
-            report_gap = int(run_length * report_percent)
-            t0 = time.time()
-            for run_idx in range(1, run_length):
-                step_func(_t=times[run_idx], _i=run_idx, _dt=dt)
-                if (run_idx + 1) % report_gap == 0:
-                    percent = (run_idx + 1) / run_length * 100
-                    print('Run {:.1f}% used {:.3f} s.'.format(percent, time.time() - t0))
-            print('Simulation is done in {:.3f} s.'.format(time.time() - t0))
+        if batch_func is not None:
+            _run_batch([self], batch_func, loop, times, dt, 0, run_length, seeds, report, report_percent)
         else:
-            for run_idx in range(run_length):
-                step_func(_t=times[run_idx], _i=run_idx, _dt=dt)
+            # (the batch members run one by one in the non-JIT mode,
+            # or when the steps are profiled)
+            if self.batch is not None:
+                self._batch_mons = self.runner.new_batch_monitors(self.batch)
+            for b in range(1 if self.batch is None else self.batch):
+                if self.batch is not None:
+                    self._set_batch_member(b)
+                    self.runner.reset_mon_buffers()
+                if seeds is not None:
+                    tools.set_rng_seed(seeds[b])
+                _run_with_report(loop_func if loop == 'compiled' else step_func, loop,
+                                 times, dt, 0, run_length, report, report_percent)
+
+                if profile.run_on_gpu():
+                    self.runner.gpu_data_to_cpu()
+                self.runner.finalize_monitors(times)
+            if self.batch is not None:
+                self._end_batch()
+        if profile_build:
+            return build_report
+
+    def get_step_profile(self, show=False):
+        """Get the time used by each schedule entry in the last run
+        with ``profile_steps``.
 
-        if profile.run_on_gpu():
-            self.runner.gpu_data_to_cpu()
-        self.mon['ts'] = times
+        Parameters
+        ----------
+        show : bool
+            Whether to print the profile table.
+
+        Returns
+        -------
+        rows : list
+            The profile of each schedule entry. See ``Runner.get_step_profile()``.
+        """
+        rows = self.runner.get_step_profile()
+        if show:
+            tools.show_step_profile(rows)
+        return rows
 
     def get_schedule(self):
         return self.runner.get_schedule()
 
     def set_schedule(self, schedule):
         self.runner.set_schedule(schedule)
+
+
+def _format_profile_steps(profile_steps, loop):
+    if profile_steps is False or profile_steps is None:
+        return None
+    if profile_steps is True:
+        profile_steps = 1
+    if not isinstance(profile_steps, int) or profile_steps < 1:
+        raise ModelUseError(f'"profile_steps" must be a bool or a positive int, not "{profile_steps}".')
+    if loop == 'compiled':
+        raise ModelUseError('"profile_steps" is not supported in the compiled loop.')
+    return profile_steps
+
+
+def _format_seeds(seed, batch):
+    # the random seed of each batch member
+    if seed is None:
+        return None
+    num = 1 if batch is None else batch
+    if isinstance(seed, (int, np.integer)):
+        return [int(seed) + i for i in range(num)]
+    if isinstance(seed, (tuple, list, np.ndarray)) and len(seed) == num:
+        return [int(s) for s in seed]
+    raise ModelUseError(f'"seed" must be an int, or a list of {num} int, not "{seed}".')
+
+
+def _use_batch_func(batch, profile_steps=None):
+    # whether the batch members run in parallel by the batched
+    # kernel (see "BatchFunc"), which needs the JIT mode, and
+    # the function calls of the steps without timing
+    return batch is not None and profile.is_jit() and profile_steps is None
+
+
+def _run_batch(ensembles, batch_func, loop, ts, dt, start, end, seeds=None,
+               report=False, report_percent=0.1):
+    # Run all the batch members in parallel by the batched kernel,
+    # and finalize and merge the monitors of the batch members.
+    batch = batch_func.batch
+    for ens in ensembles:
+        ens._batch_mons = ens.runner.new_batch_monitors(batch)
+    for b in range(batch):
+        for ens in ensembles:
+            ens._set_batch_member(b)
+            ens.runner.reset_mon_buffers()
+    batch_func.prepare(ts, seeds)
+    _run_with_report(batch_func if loop == 'compiled' else batch_func.step, loop,
+                     ts, dt, start, end, report, report_percent)
+    batch_func.finish()
+    for b in range(batch):
+        for ens in ensembles:
+            ens._set_batch_member(b)
+            ens.runner.finalize_monitors(ts)
+    for ens in ensembles:
+        ens._end_batch()
+
+
+def _run_with_report(func, loop, ts, dt, start, end, report=False, report_percent=0.1):
+    # Run the time steps from "start" to "end - 1" by the step function
+    # "func(_t, _i, _dt)" (the python loop), or by the loop function
+    # "func(_ts, _dt, _start, _end)" (the compiled loop). With "report",
+    # the first step is run alone (to measure the compilation), and the
+    # progress is printed after each chunk of "report_percent" of the steps.
+    if start >= end:
+        return
+    if loop == 'compiled':
+        def run_chunk(i0, i1):
+            func(ts, dt, i0, i1)
+    else:
+        def run_chunk(i0, i1):
+            for i in range(i0, i1):
+                func(_t=ts[i], _i=i, _dt=dt)
+    if not report:
+        run_chunk(start, end)
+        return
+
+    t0 = time.time()
+    run_chunk(start, start + 1)
+    print('Compilation used {:.4f} s.'.format(time.time() - t0))
+
+    print("Start running ...")
+    run_length = end - start
+    report_gap = max(int(run_length * report_percent), 1)
+    t0 = time.time()
+    for run_idx in range(start + 1, end, report_gap):
+        end_idx = min(run_idx + report_gap, end)
+        run_chunk(run_idx, end_idx)
+        percent = (end_idx - start) / run_length * 100
+        print('Run {:.1f}% used {:.3f} s.'.format(percent, time.time() - t0))
+    print('Simulation is done in {:.3f} s.'.format(time.time() - t0))
+
+
+def _format_mon_var(key, indices=None, options=None):
+    options = dict() if options is None else options
+    if not isinstance(options, dict):
+        raise ModelUseError(f'The options of monitor "{key}" must be a dict, not {type(options)}.')
+    # the options are normalized below, keep the dict of the user intact
+    options = dict(options)
+    for k in options.keys():
+        if k not in ['every', 'window', 'event', 'reduce', 'axis', 'bins']:
+            raise ModelUseError(f'Unknown option "{k}" for monitor "{key}". Only support '
+                                f'"every", "window", "event", "reduce", "axis" and "bins".')
+    every = options.get('every', 1)
+    if not isinstance(every, int) or every < 1:
+        raise ModelUseError(f'"every" of monitor "{key}" must be a positive int, not "{every}".')
+    window = options.get('window', None)
+    if window is not None:
+        if not (isinstance(window, (tuple, list)) and len(window) == 2):
+            raise ModelUseError(f'"window" of monitor "{key}" must be a tuple of "(t0, t1)".')
+        if window[0] >= window[1]:
+            raise ModelUseError(f'"window" of monitor "{key}" must satisfy t0 < t1, but got {window}.')
+    reduce = options.get('reduce', None)
+    if reduce is not None:
+        if reduce not in ['mean', 'sum', 'var', 'count', 'hist']:
+            raise ModelUseError(f'"reduce" of monitor "{key}" only supports "mean", "sum", '
+                                f'"var", "count" and "hist", not "{reduce}".')
+        if options.get('event', False):
+            raise ModelUseError(f'Monitor "{key}" cannot be both the event-based and the reducer monitor.')
+        if options.get('axis', 'population') not in ['population', 'time']:
+            raise ModelUseError(f'"axis" of monitor "{key}" only supports "population" '
+                                f'and "time", not "{options["axis"]}".')
+        if reduce == 'hist':
+            bins = np.asarray(options.get('bins', []), dtype=np.float_)
+            if bins.ndim != 1 or len(bins) < 2 or np.any(np.diff(bins) <= 0.):
+                raise ModelUseError(f'"bins" of monitor "{key}" must be the increasing bin edges.')
+            options['bins'] = bins
+    elif 'axis' in options or 'bins' in options:
+        raise ModelUseError(f'"axis" and "bins" of monitor "{key}" are only used with "reduce".')
+    return key, indices, options
@@ -7,6 +7,12 @@ KW_I = '_i'
 ARG_KEYWORDS = ['_dt', '_t', '_i',
                 '_obj_i', '_pre_i', '_post_i']
 
+# spike index keywords, which are the indices of the
+# pre- and post-synaptic neurons spiking at the time step
+KW_PRE_SPIKES = 'pre_spikes'
+KW_POST_SPIKES = 'post_spikes'
+SPIKE_KEYWORDS = [KW_PRE_SPIKES, KW_POST_SPIKES]
+
 # name of the neuron group
 NEU_GROUP_TYPE = 'NeuGroup'
 
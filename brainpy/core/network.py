@@ -1,14 +1,29 @@
 # -*- coding: utf-8 -*-
 
+import os
 import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 from numba import cuda
 
 from .base import Ensemble
+from .base import _format_profile_steps
+from .base import _format_seeds
+from .base import _run_batch
+from .base import _run_with_report
+from .base import _use_batch_func
 from .constants import INPUT_OPERATIONS
 from .constants import SCALAR_MODE
 from .neurons import NeuGroup
+from .runner import BatchFunc
+from .runner import _split_stage
+from .runner import _to_float_type
+from .runner import get_build_report
+from .runner import get_concurrent_stages
+from .runner import get_loop_func
+from .runner import run_concurrent
 from .synapses import SynConn
 from .. import profile
 from .. import tools
@@ -28,6 +43,19 @@ class Network(object):
     orders. The objects in the `Network` are accessible via their names, e.g.
     `net.name` would return the `object` (including neurons and synapses).
 
+    Parameters
+    ----------
+    mode : str
+        The running mode. ``'once'`` builds the network at each ``run()``.
+        ``'repeat'`` reuses the built network in the runs with the same
+        duration. ``'continue'`` reuses the built network, and each
+        ``run(duration)`` continues from the end of the last run, with
+        the new samples appended to the monitors.
+
+    The batch size of the network is given by its objects (see the
+    ``batch`` of ``NeuGroup`` and ``SynConn``), which must be the same.
+    In the JIT mode, all the batch members run in parallel in one batched
+    kernel, in which each member has its own data and random state.
     """
 
     def __init__(self, *args, mode='once', **kwargs):
@@ -48,10 +76,23 @@ class Network(object):
         self.add(*args, **kwargs)
 
         # check
-        assert mode in ['once', 'repeat']
+        assert mode in ['once', 'repeat', 'continue']
         self.mode = mode
 
         self._step_func = None
+        self._loop = None
+        self._profile_steps = None
+
+        # the number of the finished steps in the current run,
+        # and the checkpoint to resume in the next run
+        self._run_idx = 0
+        self._resume = None
+        # the number of the monitor rows saved in the checkpoint of the current run
+        self._checkpoint_rows = {}
+        # the number of the time steps of all the runs in "continue" mode
+        self._num_steps = 0
+        # the thread pool to call the independent ensembles concurrently
+        self._thread_pool = None
 
     def _add_obj(self, obj, name=None):
         # check object type
@@ -156,14 +197,97 @@ class Network(object):
 
         return formatted_inputs
 
-    def build(self, run_length, inputs=()):
+    @property
+    def batch(self):
+        """The batch size of the network."""
+        batches = set([obj.batch for obj in self._all_objects])
+        if len(batches) > 1:
+            raise ModelUseError(f'The objects in the network must have the same batch size, '
+                                f'but got {[obj.batch for obj in self._all_objects]}.')
+        return batches.pop() if len(batches) else None
+
+    def _set_thread_pool(self, threads):
+        # Create the thread pool for the concurrent ensembles, which runs
+        # the tasks except the one run in the calling thread. The pool
+        # of the last build is reused if it has the same number of the
+        # threads, otherwise it is shut down. If "threads" is None, the
+        # pool is shut down.
+        num_worker = None if threads is None else max(threads - 1, 1)
+        if self._thread_pool is not None:
+            if self._thread_pool._max_workers == num_worker:
+                return
+            self._thread_pool.shutdown()
+            self._thread_pool = None
+        if num_worker is not None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=num_worker)
+
+    def __del__(self):
+        if getattr(self, '_thread_pool', None) is not None:
+            self._thread_pool.shutdown(wait=False)
+
+    def build(self, run_length, inputs=(), loop='python', profile_build=False, profile_steps=None):
+        """Build the step function (or the loop function) of the network.
+
+        Parameters
+        ----------
+        run_length : int
+            The number of the time steps to run.
+        inputs : list, tuple
+            The receivers, external inputs and durations.
+        loop : str
+            The way to run the time loop. If ``loop='python'``, return the
+            step function ``step_func(_t, _i, _dt)`` which runs one time step.
+            If ``loop='compiled'``, return the loop function
+            ``loop_func(_ts, _dt, _start, _end)`` in which the whole time loop
+            is compiled into one JIT kernel.
+        profile_build : bool
+            Whether to profile the build phase. If ``True``, the JIT functions
+            are compiled at the build phase (rather than at the first time
+            step), and the report of the time used in each build phase of
+            each ensemble is also returned. See ``brainpy.core.runner.get_build_report()``.
+        profile_steps : int, None
+            If not None, each schedule entry of each ensemble is timed
+            every ``profile_steps`` time steps. Only supported in the
+            python loop.
+
+        Returns
+        -------
+        func : callable
+            The step function or the loop function.
+        report : dict
+            The build report. Only returned when ``profile_build=True``.
+        """
         assert isinstance(run_length, int)
+        if loop not in ['python', 'compiled']:
+            raise ModelUseError(f'Only support "python" and "compiled" loop, not "{loop}".')
+        t_build = time.time()
         code_scopes = {}
         code_lines = ['# network step function\n'
                       'def step_func(_t, _i, _dt):']
+        threads = profile.get_ensemble_threads()
+        concurrent = threads is not None
+        if concurrent:
+            ignored = []
+            if not profile.is_jit():
+                ignored.append('the non-JIT mode')
+            if not profile.run_on_cpu():
+                ignored.append(f'the "{profile.get_device()}" device')
+            if loop != 'python':
+                ignored.append(f'the "{loop}" loop')
+            if self.batch is not None:
+                ignored.append('the batched network')
+            if profile_steps is not None:
+                ignored.append('"profile_steps"')
+            if len(ignored):
+                warnings.warn(f'The ensemble threads ({threads}) are ignored in {", ".join(ignored)}, '
+                              f'the ensembles are called sequentially.', UserWarning)
+                concurrent = False
+        self._set_thread_pool(threads if concurrent else None)
+        obj_lines = {}
 
         # inputs
         format_inputs = self._format_inputs(inputs, run_length)
+        ts = np.asarray(self.t_start + np.arange(run_length) * self.dt, dtype=np.float_)
 
         for obj in self._all_objects:
             if profile.run_on_gpu():
@@ -172,22 +296,70 @@ class Network(object):
 
             code_scopes[obj.name] = obj
             code_scopes[f'{obj.name}_runner'] = obj.runner
-            lines_of_call = obj._build(inputs=format_inputs.get(obj.name, None), mon_length=run_length)
-            code_lines.extend(lines_of_call)
-        if profile.run_on_gpu():
-            code_scopes['cuda'] = cuda
-        func_code = '\n  '.join(code_lines)
-        exec(compile(func_code, '', 'exec'), code_scopes)
-        step_func = code_scopes['step_func']
-
-        if profile.show_format_code():
-            tools.show_code_str(func_code.replace('def ', f'def network_'))
-        if profile.show_code_scope():
-            tools.show_code_scope(code_scopes, ['__builtins__', 'step_func'])
-
+            lines_of_call = obj._build(inputs=format_inputs.get(obj.name, None),
+                                       mon_length=run_length,
+                                       profile_steps=profile_steps,
+                                       mon_ts=ts)
+            if profile_build:
+                obj.runner.compile_step_funcs(lines_of_call, self.dt)
+            obj_lines[obj.name] = lines_of_call
+            if not concurrent:
+                code_lines.extend(lines_of_call)
+
+        # call the independent ensembles concurrently
+        stage_lines = []
+        if concurrent:
+            code_scopes['_thread_pool'] = self._thread_pool
+            code_scopes['_run_concurrent'] = run_concurrent
+            for i, stage in enumerate(get_concurrent_stages(self._all_objects)):
+                if len(stage) == 1:
+                    code_lines.extend(obj_lines[stage[0].name])
+                    continue
+                # one task for each thread, which runs its ensembles of the stage
+                tasks = _split_stage(stage, threads)
+                for j, task in enumerate(tasks):
+                    lines = [line for obj in task for line in obj_lines[obj.name]]
+                    stage_lines.append('\n  '.join([f'def _stage{i}_task{j}(_t, _i, _dt):'] + lines))
+                stage_lines.append(f'_stage{i} = ({", ".join([f"_stage{i}_task{j}" for j in range(len(tasks))])},)')
+                code_lines.append(f'_run_concurrent(_thread_pool, _stage{i}, _t, _i, _dt)')
+
+        t0 = time.time()
+        if _use_batch_func(self.batch, profile_steps):
+            # run all the batch members in parallel in one batched kernel
+            all_lines = [line for obj in self._all_objects for line in obj_lines[obj.name]]
+            step_func = BatchFunc(all_lines, code_scopes, self._all_objects, self.batch)
+        elif loop == 'compiled':
+            if profile_steps is not None:
+                raise ModelUseError('"profile_steps" is not supported in the compiled loop.')
+            step_func = get_loop_func(code_lines[1:], code_scopes)
+        else:
+            if profile.run_on_gpu():
+                code_scopes['cuda'] = cuda
+            if profile_steps is not None:
+                code_scopes['_perf_counter'] = time.perf_counter
+            func_code = '\n'.join(stage_lines + ['\n  '.join(code_lines)])
+            exec(compile(func_code, '', 'exec'), code_scopes)
+            step_func = code_scopes['step_func']
+
+            if profile.show_format_code():
+                tools.show_code_str(func_code.replace('def ', f'def network_'))
+            if profile.show_code_scope():
+                tools.show_code_scope(code_scopes, ['__builtins__', 'step_func'])
+
+        if profile_build:
+            t_codegen = time.time() - t0
+            t0 = time.time()
+            if loop == 'compiled' and not isinstance(step_func, BatchFunc):
+                step_func(ts, self.dt, 0, 0)
+            report = get_build_report(self._all_objects, {'codegen': t_codegen,
+                                                          'numba_compile': time.time() - t0})
+            report['total'] = time.time() - t_build
+            return step_func, report
         return step_func
 
-    def run(self, duration, inputs=(), report=False, report_percent=0.1):
+    def run(self, duration, inputs=(), report=False, report_percent=0.1, loop='python',
+            profile_build=False, profile_steps=False, checkpoint_path=None, checkpoint_every=10000,
+            seed=None):
         """Run the simulation for the given duration.
 
         This function provides the most convenient way to run the network.
@@ -196,14 +368,65 @@ class Network(object):
         Parameters
         ----------
         duration : int, float, tuple, list
-            The amount of simulation time to run for.
+            The amount of simulation time to run for. In the ``'continue'``
+            mode, the run after the first run continues from the end of the
+            last run (reusing the compiled functions), and the new samples
+            are appended to the monitors. The continuation run must use the
+            same ``loop`` and ``profile_steps`` as the first run. The ``window``
+            monitor option is not supported in the continuation run.
         inputs : list, tuple
             The receivers, external inputs and durations.
         report : bool
             Report the progress of the simulation.
         report_percent : float
             The speed to report simulation progress.
+        loop : str
+            The way to run the time loop. ``'python'`` calls the step
+            function at each time step in Python. ``'compiled'`` compiles
+            the whole time loop into one JIT kernel, which is called once
+            per run (or once per report chunk). ``'compiled'`` loop is only
+            supported in the JIT mode on the CPU device.
+        profile_build : bool
+            Whether to profile the build phase. See ``Network.build()``.
+        profile_steps : bool, int
+            Whether to time each schedule entry (``input``, the step functions
+            and ``monitor``) of each ensemble in the simulation. If it is an
+            integer ``k``, the schedule entries are timed every ``k`` time
+            steps, which lowers the overhead. The result can be obtained by
+            ``Network.get_step_profile()``. Only supported in the python loop.
+        checkpoint_path : str, None
+            If provided, the checkpoint (see ``Network.save_checkpoint()``)
+            is saved into this directory every ``checkpoint_every`` time steps.
+            Not supported in the ``'continue'`` mode, in which the checkpoint
+            can be saved between the runs.
+        checkpoint_every : int
+            The number of the time steps between two checkpoints.
+        seed : int, list, None
+            The random seed. For the batched network, the batch member
+            ``i`` is seeded by ``seed + i`` (or ``seed[i]`` if a list is
+            given), so that each member has its own random stream.
+
+        Returns
+        -------
+        build_report : dict, None
+            The build report if ``profile_build=True`` and the network is
+            built in this run, otherwise None.
         """
+        build_report = None
+        profile_steps = _format_profile_steps(profile_steps, loop)
+        batch = self.batch
+        seeds = _format_seeds(seed, batch)
+        if batch is not None:
+            if self.mode == 'continue':
+                raise ModelUseError('The batched network does not support the "continue" mode.')
+            if checkpoint_path is not None or self._resume is not None:
+                raise ModelUseError('The batched network does not support the checkpoint.')
+            if profile.run_on_gpu():
+                raise ModelUseError('The batched network is not supported on GPU.')
+            # build the functions with the data of the first batch member
+            for obj in self._all_objects:
+                obj._set_batch_member(0)
+
         # check the duration
         # ------------------
         if isinstance(duration, (int, float)):
@@ -214,15 +437,68 @@ class Network(object):
             start, end = duration
         else:
             raise ValueError(f'Unknown duration type: {type(duration)}')
-        self.t_start, self.t_end = start, end
+        if checkpoint_path is not None:
+            if self.mode == 'continue':
+                raise ModelUseError('The checkpoint during the run is not supported in the "continue" '
+                                    'mode, please save the checkpoint between the runs by '
+                                    '"Network.save_checkpoint()".')
+            if not isinstance(checkpoint_every, int) or checkpoint_every < 1:
+                raise ModelUseError(f'"checkpoint_every" must be a positive int, but got {checkpoint_every}.')
         dt = profile.get_dt()
-        ts = np.asarray(np.arange(start, end, dt), dtype=np.float_)
-        run_length = ts.shape[0]
-
-        if self.mode != 'repeat' or self._step_func is None:
+        continued = self.mode == 'continue' and self._step_func is not None
+        if continued and (self._loop != loop or self._profile_steps != profile_steps):
+            raise ModelUseError(f'The continuation run must use the same "loop" and "profile_steps" '
+                                f'as the last run ({self._loop!r} and {self._profile_steps!r}), '
+                                f'but got {loop!r} and {profile_steps!r}.')
+        runtime_changed = any([obj._is_runtime_changed() for obj in self._all_objects])
+        if continued:
+            if runtime_changed:
+                raise ModelUseError('The size of the runtime parameter cannot be '
+                                    'changed in the continuation run.')
+            if profile.run_on_gpu():
+                raise ModelUseError('The continuation run is not supported on the GPU device.')
+            if isinstance(duration, (tuple, list)) and abs(start - self.t_end) > dt * 1e-6:
+                raise ModelUseError(f'The continuation run must start from the end '
+                                    f'of the last run {self.t_end}, but got {start}.')
+            start, end = self.t_end, self.t_end + (end - start)
+        if self._resume is not None:
+            if (start, end) != (self.t_start, self.t_end):
+                raise ModelUseError(f'The run to resume is from {self.t_start} to {self.t_end}, '
+                                    f'but got the duration from {start} to {end}.')
+        if self.mode == 'continue':
+            run_length = len(np.arange(start, end, dt))
+            step_offset = self._num_steps if continued else 0
+            if not continued:
+                # reject the unsupported monitors before the first run
+                for obj in self._all_objects:
+                    obj.runner.check_continuation_monitors()
+                self.t_start = start
+            ts = np.asarray(self.t_start + np.arange(step_offset, step_offset + run_length) * dt,
+                            dtype=np.float_)
+            self._num_steps = step_offset + run_length
+            self.t_end = self.t_start + self._num_steps * dt
+        else:
+            self.t_start, self.t_end = start, end
+            ts = np.asarray(np.arange(start, end, dt), dtype=np.float_)
+            run_length = ts.shape[0]
+
+        if continued:
+            # reuse the compiled functions, and reset inputs
+            # -----------------------------------------------
+            self._reset_inputs(inputs, run_length)
+        elif self.mode != 'repeat' or self._step_func is None or self._loop != loop or \
+                self._profile_steps != profile_steps or runtime_changed:
             # initialize the function
             # -----------------------
-            self._step_func = self.build(run_length, inputs)
+            if profile_build:
+                self._step_func, build_report = self.build(run_length, inputs, loop=loop,
+                                                           profile_build=True,
+                                                           profile_steps=profile_steps)
+            else:
+                self._step_func = self.build(run_length, inputs, loop=loop,
+                                             profile_steps=profile_steps)
+            self._loop = loop
+            self._profile_steps = profile_steps
             self.t_duration = end - start
         else:
             # check running duration
@@ -234,61 +510,234 @@ class Network(object):
 
             # check and reset inputs
             # ----------------------
-            formatted_inputs = self._format_inputs(inputs, run_length)
-            for obj_name, inps in formatted_inputs.items():
-                obj = getattr(self, obj_name)
-                obj_inputs = obj.runner._inputs
-                all_keys = list(obj_inputs.keys())
-                for key, val, ops, data_type in inps:
-                    if np.shape(obj_inputs[key][0]) != np.shape(val):
-                        raise ModelUseError(f'The input shape for "{key}" should keep the same. '
-                                            f'However, we got the last input shape '
-                                            f'= {np.shape(obj_inputs[key][0])}, '
-                                            f'and the current input shape = {np.shape(val)}')
-                    if obj_inputs[key][1] != ops:
-                        raise ModelUseError(f'The input operation for "{key}" should keep the same. '
-                                            f'However, we got the last operation is '
-                                            f'"{obj_inputs[key][1]}", and the current operation '
-                                            f'is "{ops}"')
-                    obj.runner.set_data(f'{key.replace(".", "_")}_inp', val)
-                    all_keys.remove(key)
-                if len(all_keys):
-                    raise ModelUseError(f'The inputs of {all_keys} are not provided.')
-
-        dt = self.dt
-        if report:
-            # Run the model with progress report
-            # ----------------------------------
-            t0 = time.time()
-            self._step_func(_t=ts[0], _i=0, _dt=dt)
-            print('Compilation used {:.4f} s.'.format(time.time() - t0))
+            self._reset_inputs(inputs, run_length)
 
-            print("Start running ...")
-            report_gap = int(run_length * report_percent)
-            t0 = time.time()
-            for run_idx in range(1, run_length):
-                self._step_func(_t=ts[run_idx], _i=run_idx, _dt=dt)
-                if (run_idx + 1) % report_gap == 0:
-                    percent = (run_idx + 1) / run_length * 100
-                    print('Run {:.1f}% used {:.3f} s.'.format(percent, time.time() - t0))
-            print('Simulation is done in {:.3f} s.'.format(time.time() - t0))
+        for obj in self._all_objects:
+            obj.runner.reset_step_profile()
+            if continued:
+                obj.runner.continue_monitors(run_length, step_offset)
+            else:
+                obj.runner.reset_mon_buffers()
+
+        # resume the run from the loaded checkpoint
+        # ------------------------------------------
+        start_idx = 0
+        if self._resume is not None:
+            for obj in self._all_objects:
+                obj.runner.set_mon_checkpoint(self._resume.get(obj.name, {}))
+            start_idx = self._run_idx
+            self._resume = None
         else:
-            # Run the model
-            # -------------
-            for run_idx in range(run_length):
-                self._step_func(_t=ts[run_idx], _i=run_idx, _dt=dt)
+            self._checkpoint_rows = {}
+
+        # run the model
+        # -------------
+        if isinstance(self._step_func, BatchFunc):
+            _run_batch(self._all_objects, self._step_func, self._loop, ts, self.dt, start_idx,
+                       run_length, seeds, report, report_percent)
+            self._run_idx = run_length
+            return build_report
+
+        # (the batch members run one by one in the non-JIT mode, or
+        # when the steps are profiled)
+        if batch is not None:
+            for obj in self._all_objects:
+                obj._batch_mons = obj.runner.new_batch_monitors(batch)
+        for b in range(1 if batch is None else batch):
+            if batch is not None:
+                for obj in self._all_objects:
+                    obj._set_batch_member(b)
+                    obj.runner.reset_mon_buffers()
+            if seeds is not None:
+                tools.set_rng_seed(seeds[b])
+            if checkpoint_path is None:
+                self._run_steps(ts, start_idx, run_length, report, report_percent)
+            else:
+                for run_idx in range(start_idx, run_length, checkpoint_every):
+                    end_idx = min(run_idx + checkpoint_every, run_length)
+                    self._run_steps(ts, run_idx, end_idx)
+                    self._run_idx = end_idx
+                    self.save_checkpoint(checkpoint_path)
+                    if report:
+                        print('Run {:.1f}%, and saved the checkpoint.'.format(end_idx / run_length * 100))
+            self._run_idx = run_length
+
+            # format monitor
+            # --------------
+            for obj in self._all_objects:
+                if profile.run_on_gpu():
+                    obj.runner.gpu_data_to_cpu()
+                obj.runner.finalize_monitors(self.ts)
+        if batch is not None:
+            for obj in self._all_objects:
+                obj._end_batch()
+
+        return build_report
+
+    def _warm_up(self, duration, inputs=(), loop='python'):
+        # build and compile the functions ahead of the runs in
+        # "repeat" mode, which then reuse the compiled functions
+        if self.mode != 'repeat':
+            raise ModelUseError(f'Only the network in "repeat" mode can be warmed up, not "{self.mode}".')
+        if isinstance(duration, (int, float)):
+            start, end = 0, duration
+        else:
+            start, end = duration
+        self.t_start, self.t_end = start, end
+        run_length = len(np.arange(start, end, self.dt))
+        self._step_func, _ = self.build(run_length, inputs, loop=loop, profile_build=True)
+        self._loop = loop
+        self._profile_steps = None
+        self.t_duration = end - start
+
+    def _reset_inputs(self, inputs, run_length):
+        formatted_inputs = self._format_inputs(inputs, run_length)
+        for obj_name, inps in formatted_inputs.items():
+            obj = getattr(self, obj_name)
+            obj_inputs = obj.runner._inputs
+            all_keys = list(obj_inputs.keys())
+            for key, val, ops, data_type in inps:
+                last_val, last_ops, last_type = obj_inputs[key]
+                if data_type == 'iter' and last_type == 'iter':
+                    # the iterable input follows the run length
+                    last_shape, shape = np.shape(last_val)[1:], np.shape(val)[1:]
+                else:
+                    last_shape, shape = np.shape(last_val), np.shape(val)
+                if last_shape != shape:
+                    raise ModelUseError(f'The input shape for "{key}" should keep the same. '
+                                        f'However, we got the last input shape '
+                                        f'= {np.shape(last_val)}, '
+                                        f'and the current input shape = {np.shape(val)}')
+                if last_ops != ops:
+                    raise ModelUseError(f'The input operation for "{key}" should keep the same. '
+                                        f'However, we got the last operation is '
+                                        f'"{last_ops}", and the current operation '
+                                        f'is "{ops}"')
+                obj.runner.set_data(f'{key.replace(".", "_")}_inp', _to_float_type(val))
+                obj_inputs[key] = (val, ops, data_type)
+                all_keys.remove(key)
+            if len(all_keys):
+                raise ModelUseError(f'The inputs of {all_keys} are not provided.')
+
+    def _run_steps(self, ts, start, end, report=False, report_percent=0.1):
+        _run_with_report(self._step_func, self._loop, ts, self.dt, start, end, report, report_percent)
+
+    def save_checkpoint(self, path):
+        """Save the state of the network into the checkpoint directory.
+
+        The checkpoint includes the ``ST`` data of each ensemble (with the
+        delay buffers), the delay pointers of the synapses, the array
+        hand-overs (like the spike pointer of ``SpikeTimeInput``), the
+        monitors, the states of the random generators, and the time index
+        of the current run. The arrays are saved as ``.npy`` files, which
+        are memory-mapped back by ``Network.load_checkpoint()``. See
+        ``brainpy.tools.save_checkpoint_files()``.
 
-        # format monitor
-        # --------------
+        Parameters
+        ----------
+        path : str
+            The checkpoint directory.
+        """
+        if not profile.run_on_cpu():
+            raise ModelUseError('Checkpoint is only supported on the CPU device.')
+        path = os.path.abspath(path)
+        # the number of the rows of each monitor saved in the last checkpoint
+        saved = self._checkpoint_rows.get(path, {})
+        arrays, rows, ensembles = {}, {}, {}
         for obj in self._all_objects:
-            if profile.run_on_gpu():
-                obj.runner.gpu_data_to_cpu()
-            obj.mon['ts'] = self.ts
+            obj_arrays, obj_meta = obj._get_checkpoint()
+            arrays[obj.name] = obj_arrays
+            ensembles[obj.name] = obj_meta
+            rows[obj.name] = {}
+            if self._step_func is not None:
+                mon_arrays, mon_rows = obj.runner.get_mon_checkpoint(self._run_idx)
+                arrays[obj.name].update(mon_arrays)
+                for key, (val, num_row) in mon_rows.items():
+                    start = min(saved.get(obj.name, {}).get(key, 0), num_row)
+                    rows[obj.name][key] = (val, start, num_row)
+        meta = {'t_start': float(self.t_start),
+                't_end': float(self.t_end),
+                'dt': self.dt,
+                'run_idx': int(self._run_idx),
+                'ensembles': ensembles,
+                'rng': tools.get_rng_state()}
+        tools.save_checkpoint_files(path, arrays, meta, rows)
+        self._checkpoint_rows = {path: {name: {key: end for key, (_, _, end) in obj_rows.items()}
+                                        for name, obj_rows in rows.items()}}
+
+    def load_checkpoint(self, path):
+        """Load the checkpoint saved by ``Network.save_checkpoint()``.
+
+        The state of each ensemble and the random states are restored at
+        once. If the checkpoint is saved in the middle of a run, the next
+        ``run()`` with the same duration resumes from the saved time step,
+        and the monitors are restored after they are built, rather than
+        recorded from scratch.
+
+        Parameters
+        ----------
+        path : str
+            The checkpoint directory.
+        """
+        if not profile.run_on_cpu():
+            raise ModelUseError('Checkpoint is only supported on the CPU device.')
+        arrays, meta = tools.load_checkpoint_files(path)
+        if set(meta['ensembles'].keys()) != set([obj.name for obj in self._all_objects]):
+            raise ModelUseError(f'The ensembles in the checkpoint are {list(meta["ensembles"].keys())}, '
+                                f'but the network has {[obj.name for obj in self._all_objects]}.')
+        if meta['dt'] != self.dt:
+            raise ModelUseError(f'The checkpoint is saved with dt={meta["dt"]}, but we got dt={self.dt}.')
+        for obj in self._all_objects:
+            obj._set_checkpoint(arrays[obj.name], meta['ensembles'][obj.name])
+        tools.set_rng_state(meta['rng'])
+
+        run_length = len(np.arange(meta['t_start'], meta['t_end'], self.dt))
+        if self.mode == 'continue' and meta['run_idx'] < run_length:
+            raise ModelUseError('The checkpoint saved in the middle of a run cannot be '
+                                'resumed by the network in the "continue" mode.')
+        self.t_start, self.t_end = meta['t_start'], meta['t_end']
+        self._run_idx = meta['run_idx']
+        if self._run_idx < run_length:
+            self._resume = {name: {k: v for k, v in obj_arrays.items()
+                                   if not (k == 'ST' or k.startswith('hand_over.'))}
+                            for name, obj_arrays in arrays.items()}
+            # the resumed run appends the monitor rows into this checkpoint
+            row_files = meta['_files']['row_files']
+            self._checkpoint_rows = {os.path.abspath(path): {
+                name: {key: info['shape'][0] for key, info in obj_files.items()}
+                for name, obj_files in row_files.items()}}
+        else:
+            self._resume = None
+
+    def get_step_profile(self, show=False):
+        """Get the time used by each schedule entry of each ensemble
+        in the last run with ``profile_steps``.
+
+        Parameters
+        ----------
+        show : bool
+            Whether to print the profile table.
+
+        Returns
+        -------
+        rows : list
+            The profile of each schedule entry, sorted by the total time.
+            See ``brainpy.core.runner.Runner.get_step_profile()``.
+        """
+        rows = []
+        for obj in self._all_objects:
+            rows.extend(obj.runner.get_step_profile())
+        rows.sort(key=lambda row: row['total'], reverse=True)
+        if show:
+            tools.show_step_profile(rows)
+        return rows
 
     @property
     def ts(self):
         """Get the time points of the network.
         """
+        if self.mode == 'continue':
+            return np.asarray(self.t_start + np.arange(self._num_steps) * self.dt, dtype=np.float_)
         return np.array(np.arange(self.t_start, self.t_end, self.dt), dtype=np.float_)
 
     @property
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+import inspect
 import typing
 
 import numpy as np
@@ -8,6 +9,7 @@ from . import constants
 from .base import Ensemble
 from .base import ObjType
 from .types import NeuState
+from .. import profile
 from ..errors import ModelDefError
 from ..errors import ModelUseError
 
@@ -48,6 +50,12 @@ class NeuType(ObjType):
             heter_params_replace=heter_params_replace,
             hand_overs=hand_overs)
 
+        # the spike indices are only provided to the synapses
+        for func in self.steps:
+            for arg in inspect.getfullargspec(func).args:
+                if arg in constants.SPIKE_KEYWORDS:
+                    raise ModelDefError(f'"{arg}" is only supported in the step functions of SynType.')
+
 
 class NeuGroup(Ensemble):
     """Neuron Group.
@@ -60,10 +68,31 @@ class NeuGroup(Ensemble):
         The neuron group geometry.
     pars_update : dict, None
         Parameters to update.
-    monitors : list, tuple, None
-        Variables to monitor.
+    monitors : list, tuple, dict, None
+        Variables to monitor. Each item can be ``key``, ``(key, indices)``,
+        ``(key, options)`` or ``(key, indices, options)``, where ``options``
+        is a dict of ``every`` (record every k time steps), ``window``
+        (only record in the time window ``(t0, t1)``) and ``event`` (record
+        the spikes as the sparse events, see ``brainpy.tools.SpikeEvents``,
+        which are also given by ``mon.key_t`` and ``mon.key_i``). The reducer
+        monitor is specified by ``reduce`` (``mean``, ``sum``, ``var``, ``count``
+        or ``hist`` with the bin edges ``bins``), which reduces over the
+        neurons at each time step (``axis='population'``), or accumulates
+        over the time steps for each neuron (``axis='time'``). The dict form is
+        ``{key: indices}`` or ``{key: {'indices': ..., 'every': ..., 'window': ...}}``.
     name : str, None
         The name of the neuron group.
+    mon_dir : str, None
+        The directory to store the monitors. If provided, the monitors
+        are backed by memory-mapped files in this directory (see
+        ``brainpy.tools.memmap_monitor()``), rather than in-memory arrays.
+    batch : int, None
+        The batch size. Each batch member has its own state and parameters
+        (set by the value with the shape of ``(batch, num)`` in ``pars_update``).
+        The monitors have the shape of ``(batch, run_length, ...)``.
+    runtime_pars : tuple, list, None
+        The parameters which can be updated between the runs without
+        recompiling the step functions (see ``Ensemble``).
     """
 
     def __init__(
@@ -74,6 +103,9 @@ class NeuGroup(Ensemble):
             name: str = None,
             satisfies: typing.Dict = None,
             pars_update: typing.Dict = None,
+            mon_dir: str = None,
+            batch: int = None,
+            runtime_pars: typing.Union[typing.Tuple, typing.List] = None,
     ):
         # name
         # -----
@@ -88,7 +120,7 @@ class NeuGroup(Ensemble):
         # -----------------
         if isinstance(geometry, (int, float)):
             geometry = num = int(geometry)
-            self.indices = np.asarray(np.arange(int(geometry)), dtype=np.int_)
+            self.indices = np.asarray(np.arange(int(geometry)), dtype=profile.get_int_type())
         elif isinstance(geometry, (tuple, list)):
             if len(geometry) == 1:
                 geometry = num = geometry[0]
@@ -99,7 +131,7 @@ class NeuGroup(Ensemble):
                 indices = np.arange(num).reshape((height, width))
             else:
                 raise ModelUseError('Do not support 3+ dimensional networks.')
-            self.indices = np.asarray(indices, dtype=np.int_)
+            self.indices = np.asarray(indices, dtype=profile.get_int_type())
         else:
             raise ValueError()
         self.geometry = geometry
@@ -122,11 +154,14 @@ class NeuGroup(Ensemble):
                                        num=num,
                                        monitors=monitors,
                                        cls_type=constants.NEU_GROUP_TYPE,
-                                       satisfies=satisfies)
+                                       satisfies=satisfies,
+                                       mon_dir=mon_dir,
+                                       batch=batch,
+                                       runtime_pars=runtime_pars)
 
         # ST
         # --
-        self.ST = self.model.ST.make_copy(num)
+        self.ST = self.model.ST.make_copy(num, batch=batch)
 
     def __getitem__(self, item):
         """Return a subset of neuron group.
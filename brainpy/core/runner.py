@@ -4,16 +4,22 @@ import ast
 import inspect
 import math
 import re
+import time
+from copy import deepcopy
 
 import numba
 import numpy as np
 from numba import cuda
+from numba.core.dispatcher import Dispatcher
+from numba.extending import overload
+from numba.typed import List
 from numba.cuda.random import create_xoroshiro128p_states
 from numba.cuda.random import xoroshiro128p_normal_float64
 from numba.cuda.random import xoroshiro128p_normal_float32
 
 from . import constants
 from .types import ObjState
+from .. import connectivity
 from .. import profile
 from .. import tools
 from ..errors import ModelDefError
@@ -24,6 +30,10 @@ from ..integration.sympy_tools import get_mapping_scope
 __all__ = [
     'Runner',
     'TrajectoryRunner',
+    'get_build_report',
+    'get_concurrent_stages',
+    'run_concurrent',
+    'BatchFunc',
 ]
 
 
@@ -40,7 +50,14 @@ class NoiseHandler(object):
 
     @staticmethod
     def cuda_replace_f(m):
-        return 'xoroshiro128p_normal_float64(rng_states, _obj_i)'
+        return f'{NoiseHandler.cuda_normal_name()}(rng_states, _obj_i)'
+
+    @staticmethod
+    def cuda_normal_name():
+        if profile.get_float_type() is np.float32:
+            return 'xoroshiro128p_normal_float32'
+        else:
+            return 'xoroshiro128p_normal_float64'
 
 
 class Runner(object):
@@ -70,6 +87,102 @@ class Runner(object):
         self._schedule = ['input'] + ensemble.model.step_names + ['monitor']
         self._inputs = {}
         self.gpu_data = {}
+        # the generated step functions of the last build
+        self._code_results = {}
+        # the sampled time steps of each monitor
+        self._mon_samples = {}
+        # the event buffers of the event-based monitors
+        self._mon_events = {}
+        # the running states of the reducer monitors
+        self._mon_reducers = {}
+        # the monitor buffers, the sampled time steps and the start
+        # of the event buffers in the continuation runs
+        self._mon_buffers = {}
+        self._mon_steps = {}
+        self._mon_event_starts = {}
+        # the global time step of the first step in the continuation run,
+        # which keeps the phase of the "every" sampling across the runs
+        self.mon_step_offset = np.zeros(1, dtype=np.int64)
+        # the shapes of the monitors, which are used by the batch members
+        self._mon_shapes = {}
+        # the event buffers, reducer values and spike indices of each batch member
+        self._batch_buffers = []
+        # the time used by each schedule entry
+        self.step_times = {}
+        self.step_calls = {}
+        # the time used in each build phase
+        self.build_profile = {}
+        self.reset_build_profile()
+        # the indices and the number of the spiking neurons
+        # at the time step (see "require_spike_ids()")
+        self.spike_ids = None
+        self.spike_num = None
+        # the partial buffers of the parallel loops which
+        # accumulate into the "pre" or "post" state
+        self._partials = {}
+
+    def require_spike_ids(self):
+        """Maintain the indices of the spiking neurons at each time step.
+
+        After the step function which updates ``ST['spike']``, the indices
+        of the spiking neurons are compacted into the head of ``spike_ids``,
+        and their number is stored in ``spike_num[0]``. They are provided
+        to the synapse step functions by the argument ``pre_spikes`` or
+        ``post_spikes``, so that the spikes are propagated in the cost of
+        the spike number, rather than the neuron number.
+        """
+        if self.ensemble._cls_type != constants.NEU_GROUP_TYPE:
+            raise ModelUseError(f'Only the neuron group can maintain the spike indices, '
+                                f'but "{self._name}" is a {self.ensemble._cls_type}.')
+        if 'spike' not in self.ensemble.ST:
+            raise ModelUseError(f'"{self._name}" must have the "spike" state to maintain the spike indices.')
+        if self.spike_ids is None:
+            self.spike_ids = np.zeros(self.ensemble.num, dtype=np.int_)
+            self.spike_num = np.zeros(1, dtype=np.int_)
+
+    def _get_spike_ids_recorder(self, formatter, code_scope, code_args, code_arg2call):
+        # get the code line to record the spiking neurons, if the
+        # spike indices are required and the function updates "ST['spike']"
+        if self.spike_ids is None:
+            return None
+        if not any([re.match(r'ST\[[\'"]spike[\'"]\]', left.strip()) for left in formatter.lefts]):
+            return None
+        if profile.run_on_gpu():
+            raise ModelUseError('The spike indices are not supported on GPU.')
+        for k in ['spike_ids', 'spike_num']:
+            code_args.add(f'_{k}')
+            code_arg2call[f'_{k}'] = f'{self._name}_runner.{k}'
+        code_scope['record_spike_ids'] = tools.record_spike_ids
+        idx = self.ensemble.ST['_var2idx']['spike']
+        return f'record_spike_ids(ST[{idx}], _spike_ids, _spike_num)'
+
+    def _add_partial_buffers(self, func_name, partials, code_args, code_arg2call):
+        # create the partial buffers of the parallel loops which accumulate
+        # into the "pre" or "post" state, and pass them as the arguments
+        for buffer, (group, row) in partials.items():
+            name = f'{func_name}{buffer}'
+            self._partials[name] = new_partial_buffers(getattr(self.ensemble, group)['_data'][row])
+            for suffix, val in zip(_PARTIAL_SUFFIXES, self._partials[name]):
+                setattr(self, f'{name}{suffix}', val)
+                code_args.add(f'{buffer}{suffix}')
+                code_arg2call[f'{buffer}{suffix}'] = f'{self._name}_runner.{name}{suffix}'
+
+    def _get_spike_ids_codes(self, func_args, code_args, code_arg2call):
+        # get the code lines to fetch the indices of the pre- or
+        # post-synaptic neurons spiking at the time step
+        code_lines = []
+        for kw in constants.SPIKE_KEYWORDS:
+            if kw not in func_args:
+                continue
+            if profile.run_on_gpu():
+                raise ModelUseError(f'"{kw}" is not supported on GPU.')
+            group = kw.split('_')[0]
+            code_args.add(f'_{kw}_ids')
+            code_arg2call[f'_{kw}_ids'] = f'{self._name}.{group}_group.runner.spike_ids'
+            code_args.add(f'_{kw}_num')
+            code_arg2call[f'_{kw}_num'] = f'{self._name}.{group}_group.runner.spike_num'
+            code_lines.append(f'{kw} = _{kw}_ids[:_{kw}_num[0]]')
+        return code_lines
 
     def check_attr(self, attr):
         if not hasattr(self, attr):
@@ -153,7 +266,7 @@ class Runner(object):
                 right = f'{key.replace(".", "_")}_inp'
                 code_args.add(right)
                 code_arg2call[right] = f'{self._name}_runner.{right}'
-                self.set_data(right, val)
+                self.set_data(right, _to_float_type(val))
                 if data_type == 'iter':
                     right = right + '[_i]'
                     if np.ndim(val) > 1:
@@ -175,7 +288,7 @@ class Runner(object):
             # compile function
             code_to_compile = [f'def input_step({tools.func_call(code_args)}):'] + code_lines
             func_code = '\n  '.join(code_to_compile)
-            exec(compile(func_code, '', 'exec'), code_scope)
+            self._exec_code(func_code, code_scope, 'input_step')
             self.input_step = code_scope['input_step']
             if not profile.is_merge_steps():
                 if profile.show_format_code():
@@ -235,7 +348,7 @@ class Runner(object):
 
                 # get the right side #
                 right = f'{key.replace(".", "_")}_inp'
-                self.set_data(right, val)
+                self.set_data(right, _to_float_type(val))
                 code_args.add(right)
                 code_arg2call[right] = f'{self._name}_runner.{right}'
 
@@ -312,14 +425,18 @@ class Runner(object):
 
             return results
 
-    def get_codes_of_monitor(self, mon_vars, run_length):
+    def get_codes_of_monitor(self, mon_vars, run_length, ts=None):
         """Get the code of the monitors.
 
         Parameters
         ----------
         mon_vars : tuple, list
-            The variables to monitor.
-        run_length
+            The variables to monitor, with the format of ``(key, indices, options)``.
+        run_length : int
+            The number of the time steps to run.
+        ts : np.ndarray, None
+            The time points of the run, which are used to determine
+            the sampled time steps of the ``window`` option.
 
         Returns
         -------
@@ -330,7 +447,7 @@ class Runner(object):
             raise ModelUseError(f'{self._name} has no monitor, cannot call this function.')
 
         # check indices #
-        for key, indices in mon_vars:
+        for key, indices, _ in mon_vars:
             if indices is not None:
                 if isinstance(indices, list):
                     if not isinstance(indices[0], int):
@@ -351,10 +468,22 @@ class Runner(object):
             # generate code of monitor function
             # ---------------------------------
             mon_idx = 0
-            for key, indices in mon_vars:
+            self._mon_samples.clear()
+            self._mon_events.clear()
+            self._mon_reducers.clear()
+            self._mon_buffers.clear()
+            self._mon_steps.clear()
+            self._mon_event_starts.clear()
+            self.mon_step_offset[0] = 0
+            for key, indices, options in mon_vars:
                 if indices is not None:
                     indices = np.asarray(indices)
                 attr_item = key.split('.')
+                sampling = self._get_mon_sampling(options, run_length, ts)
+                condition, slot, num_sample = _get_sampling_code(sampling, run_length, '_mon_offset[0]')
+                if '_mon_offset' in condition:
+                    code_args.add('_mon_offset')
+                    code_arg2call['_mon_offset'] = f'{self._name}_runner.mon_step_offset'
 
                 # get the code line #
                 if (len(attr_item) == 1) and (attr_item[0] not in self.ensemble.ST):
@@ -364,16 +493,14 @@ class Runner(object):
                     if not isinstance(data, np.ndarray):
                         assert ModelUseError(f'BrainPy only supports monitor of arrays.')
                     shape = data.shape
-                    mon_name = f'mon_{attr}'
+                    mon_name = f'mon_{key.replace(".", "_")}'
                     target_name = attr
                     if indices is None:
-                        line = f'{mon_name}[_i] = {target_name}'
+                        right = target_name
                     else:
                         idx_name = f'idx{mon_idx}_{attr}'
-                        line = f'{mon_name}[_i] = {target_name}[{idx_name}]'
+                        right = f'{target_name}[{idx_name}]'
                         code_scope[idx_name] = indices
-                    code_args.add(mon_name)
-                    code_arg2call[mon_name] = f'{self._name}.mon["{key}"]'
                     code_args.add(target_name)
                     code_arg2call[target_name] = f'{self._name}.{attr}'
                 else:
@@ -386,29 +513,62 @@ class Runner(object):
                     data = getattr(self.ensemble, attr)
                     shape = data[item].shape
                     idx = data['_var2idx'][item]
-                    mon_name = f'mon_{attr}_{item}'
+                    mon_name = f'mon_{key.replace(".", "_")}'
                     target_name = attr
                     if indices is None:
-                        line = f'{mon_name}[_i] = {target_name}[{idx}]'
+                        right = f'{target_name}[{idx}]'
                     else:
                         idx_name = f'idx{mon_idx}_{attr}_{item}'
-                        line = f'{mon_name}[_i] = {target_name}[{idx}][{idx_name}]'
+                        right = f'{target_name}[{idx}][{idx_name}]'
                         code_scope[idx_name] = indices
-                    code_args.add(mon_name)
-                    code_arg2call[mon_name] = f'{self._name}.mon["{key}"]'
                     code_args.add(target_name)
                     code_arg2call[target_name] = f'{self._name}.{attr}["_data"]'
                 mon_idx += 1
-
-                # initialize monitor array #
-                key = key.replace('.', '_')
-                if indices is None:
-                    mon[key] = np.zeros((run_length,) + shape, dtype=np.float_)
+                mon_key = key.replace('.', '_')
+
+                if options.get('event', False):
+                    # record spike events #
+                    if len(shape) != 1:
+                        raise ModelUseError(f'Event-based monitor only supports 1D variable, '
+                                            f'but "{key}" has the shape of {shape}.')
+                    num_neu = shape[0] if indices is None else len(indices)
+                    buffer, counter = tools.new_event_buffer(num_neu * num_sample // 1000 + 1024)
+                    self._mon_events[mon_key] = (buffer, counter, indices, num_neu)
+                    setattr(self, f'{mon_key}_events', buffer)
+                    setattr(self, f'{mon_key}_count', counter)
+                    code_args.add(f'{mon_name}_events')
+                    code_arg2call[f'{mon_name}_events'] = f'{self._name}_runner.{mon_key}_events'
+                    code_args.add(f'{mon_name}_count')
+                    code_arg2call[f'{mon_name}_count'] = f'{self._name}_runner.{mon_key}_count'
+                    code_scope['record_spike_events'] = tools.record_spike_events
+                    line = f'record_spike_events({mon_name}_events, {mon_name}_count, _i, {right})'
+                elif options.get('reduce', None) is not None:
+                    # reducer monitor #
+                    if len(shape) != 1:
+                        raise ModelUseError(f'Reducer monitor only supports 1D variable, '
+                                            f'but "{key}" has the shape of {shape}.')
+                    num_neu = shape[0] if indices is None else len(indices)
+                    line = self._get_reducer_line(mon, mon_key, mon_name, right, slot, num_sample, num_neu,
+                                                  options, code_scope, code_args, code_arg2call)
                 else:
-                    mon[key] = np.zeros((run_length, len(indices)) + shape[1:], dtype=np.float_)
+                    # initialize monitor array #
+                    code_args.add(mon_name)
+                    code_arg2call[mon_name] = f'{self._name}.mon["{mon_key}"]'
+                    if indices is None:
+                        mon[mon_key] = self._new_mon_array(mon_key, (num_sample,) + shape)
+                    else:
+                        mon[mon_key] = self._new_mon_array(mon_key, (num_sample, len(indices)) + shape[1:])
+                    line = f'{mon_name}[{slot}] = {right}'
+                if not (options.get('event', False) or options.get('axis', 'population') == 'time'):
+                    # monitors with the time axis
+                    self._mon_samples[mon_key] = sampling
 
                 # add line #
-                code_lines.append(line)
+                if condition:
+                    code_lines.append(f'if {condition}:')
+                    code_lines.append(f'  {line}')
+                else:
+                    code_lines.append(line)
 
             # final code
             # ----------
@@ -427,11 +587,12 @@ class Runner(object):
                 if profile.show_code_scope():
                     tools.show_code_scope(code_scope, ('__builtins__', 'monitor_step'))
 
-            exec(compile(func_code, '', 'exec'), code_scope)
+            self._exec_code(func_code, code_scope, 'monitor_step')
             monitor_step = code_scope['monitor_step']
             # if profile.is_jit():
             #     monitor_step = tools.jit(monitor_step)
             self.monitor_step = monitor_step
+            self._mon_shapes = {k: (v.shape, v.dtype) for k, v in mon.items()}
 
             # format function call
             arg2call = [code_arg2call[arg] for arg in sorted(list(code_args))]
@@ -450,14 +611,23 @@ class Runner(object):
             # generate code of monitor function
             # ---------------------------------
             mon_idx = 0
-            for key, indices in mon_vars:
+            self._mon_samples.clear()
+            self._mon_events.clear()
+            for key, indices, options in mon_vars:
+                if options.get('event', False):
+                    raise ModelUseError('Event-based monitor is not supported on the GPU device.')
+                if options.get('reduce', None) is not None:
+                    raise ModelUseError('Reducer monitor is not supported on the GPU device.')
                 if indices is not None:
                     indices = np.asarray(indices)
                 code_scope = {self._name: self.ensemble, f'{self._name}_runner': self}
                 code_args, code_arg2call, code_lines = set(), {}, []
+                sampling = self._get_mon_sampling(options, run_length, ts)
+                condition, slot, num_sample = _get_sampling_code(sampling, run_length)
 
                 attr_item = key.split('.')
                 key = key.replace(".", "_")
+                self._mon_samples[key] = sampling
                 # get the code line #
                 if (len(attr_item) == 1) and (attr_item[0] not in self.ensemble.ST):
                     attr, item = attr_item[0], ''
@@ -470,12 +640,12 @@ class Runner(object):
                     target_name = f'{attr}_cuda'
                     if indices is None:
                         num_data = shape[0]
-                        line = f'{mon_name}[_i, cuda_i] = {target_name}[cuda_i]'
+                        line = f'{mon_name}[{slot}, cuda_i] = {target_name}[cuda_i]'
                     else:
                         num_data = len(indices)
                         idx_name = f'idx{mon_idx}_{attr}'
                         code_lines.append(f'mon_idx = {idx_name}[cuda_i]')
-                        line = f'{mon_name}[_i, cuda_i] = {target_name}[mon_idx]'
+                        line = f'{mon_name}[{slot}, cuda_i] = {target_name}[mon_idx]'
                         code_scope[idx_name] = cuda.to_device(indices)
                     code_args.add(mon_name)
                     code_arg2call[mon_name] = f'{self._name}_runner.mon_{key}_cuda'
@@ -496,12 +666,12 @@ class Runner(object):
                     target_name = attr
                     if indices is None:
                         num_data = shape[0]
-                        line = f'{mon_name}[_i, cuda_i] = {target_name}[{idx}, cuda_i]'
+                        line = f'{mon_name}[{slot}, cuda_i] = {target_name}[{idx}, cuda_i]'
                     else:
                         num_data = len(indices)
                         idx_name = f'idx{mon_idx}_{attr}_{item}'
                         code_lines.append(f'mon_idx = {idx_name}[cuda_i]')
-                        line = f'{mon_name}[_i, cuda_i] = {target_name}[{idx}, mon_idx]'
+                        line = f'{mon_name}[{slot}, cuda_i] = {target_name}[{idx}, mon_idx]'
                         code_scope[idx_name] = cuda.to_device(indices)
                     code_args.add(mon_name)
                     code_arg2call[mon_name] = f'{self._name}_runner.mon_{key}_cuda'
@@ -511,9 +681,9 @@ class Runner(object):
 
                 # initialize monitor array #
                 if indices is None:
-                    mon[key] = np.zeros((run_length,) + shape, dtype=np.float_)
+                    mon[key] = self._new_mon_array(key, (num_sample,) + shape)
                 else:
-                    mon[key] = np.zeros((run_length, num_data) + shape[1:], dtype=np.float_)
+                    mon[key] = self._new_mon_array(key, (num_sample, num_data) + shape[1:])
                 self.set_gpu_data(f'mon_{key}_cuda', mon[key])
 
                 # add line #
@@ -525,7 +695,10 @@ class Runner(object):
                 # ----------
                 code_lines.append(line)
                 code_lines = ['  ' + line for line in code_lines]
-                code_lines.insert(0, f'if cuda_i < {num_data}:')
+                if condition:
+                    code_lines.insert(0, f'if cuda_i < {num_data} and {condition}:')
+                else:
+                    code_lines.insert(0, f'if cuda_i < {num_data}:')
 
                 # compile function
                 func_name = f'monitor_of_{attr}_{item}'
@@ -566,6 +739,404 @@ class Runner(object):
 
             return mon, results
 
+    def _new_mon_array(self, key, shape, dtype=None):
+        dtype = profile.get_float_type() if dtype is None else dtype
+        mon_dir = self.ensemble.mon_dir
+        if mon_dir is None:
+            return np.zeros(shape, dtype=dtype)
+        else:
+            return tools.memmap_monitor(mon_dir, self._name, key, shape, dtype=dtype)
+
+    def _get_reducer_line(self, mon, mon_key, mon_name, right, slot, num_sample, num_neu,
+                          options, code_scope, code_args, code_arg2call):
+        reduce = options['reduce']
+        code_args.add(mon_name)
+        code_arg2call[mon_name] = f'{self._name}.mon["{mon_key}"]'
+        if reduce == 'hist':
+            bins_name = f'{mon_name}_bins'
+            code_scope[bins_name] = options['bins']
+            num_bin = len(options['bins']) - 1
+
+        # reduce over the neurons at each time step
+        if options.get('axis', 'population') == 'population':
+            if reduce == 'hist':
+                mon[mon_key] = self._new_mon_array(mon_key, (num_sample, num_bin))
+                code_scope['population_hist'] = tools.population_hist
+                return f'{mon_name}[{slot}] = population_hist({right}, {bins_name})'
+            mon[mon_key] = self._new_mon_array(mon_key, (num_sample,))
+            code_scope['numpy'] = np
+            if reduce == 'count':
+                return f'{mon_name}[{slot}] = numpy.sum({right} > 0.)'
+            return f'{mon_name}[{slot}] = numpy.{reduce}({right})'
+
+        # accumulate over the time steps for each neuron
+        if reduce == 'hist':
+            mon[mon_key] = self._new_mon_array(mon_key, (num_neu, num_bin))
+            code_scope['accumulate_hist'] = tools.accumulate_hist
+            return f'accumulate_hist({mon_name}, {right}, {bins_name})'
+        mon[mon_key] = self._new_mon_array(mon_key, (num_neu,))
+        if reduce == 'sum':
+            code_scope['accumulate_sum'] = tools.accumulate_sum
+            return f'accumulate_sum({mon_name}, {right})'
+        if reduce == 'count':
+            code_scope['accumulate_count'] = tools.accumulate_count
+            return f'accumulate_count({mon_name}, {right})'
+        # "mean" and "var" with the Welford's algorithm
+        counter = np.zeros(1, dtype=np.int64)
+        mean = np.zeros(num_neu, dtype=profile.get_float_type())
+        m2 = np.zeros(num_neu, dtype=profile.get_float_type())
+        self._mon_reducers[mon_key] = (reduce, counter, mean, m2)
+        for k, v in [('counter', counter), ('mean', mean), ('m2', m2)]:
+            setattr(self, f'{mon_key}_{k}', v)
+            code_args.add(f'{mon_name}_{k}')
+            code_arg2call[f'{mon_name}_{k}'] = f'{self._name}_runner.{mon_key}_{k}'
+        code_scope['welford_update'] = tools.welford_update
+        return f'welford_update({mon_name}_counter, {mon_name}_mean, {mon_name}_m2, {right})'
+
+    def reset_mon_buffers(self):
+        """Reset the event buffers of the event-based monitors, and
+        the accumulated values of the reducer monitors."""
+        for buffer, counter, _, _ in self._mon_events.values():
+            counter[0] = 0
+        for key, (reduce, counter, mean, m2) in self._mon_reducers.items():
+            counter[0] = 0
+            mean[:] = 0.
+            m2[:] = 0.
+        for key, indices, options in self.ensemble._mon_vars:
+            if options.get('axis', 'population') == 'time':
+                mon_key = key.replace('.', '_')
+                if mon_key in self.ensemble.mon:
+                    self.ensemble.mon[mon_key][:] = 0.
+
+    def new_batch_monitors(self, batch):
+        """Create the monitors of the batch members.
+
+        Each monitor of the batch members is a view of the monitor
+        array with the shape of ``(batch, run_length, ...)``. Each batch
+        member also has its own event buffers, reducer values, spike
+        indices and partial buffers, which are switched by ``set_batch_member()``.
+
+        Parameters
+        ----------
+        batch : int
+            The batch size.
+
+        Returns
+        -------
+        mons : list
+            The monitors of each batch member.
+        """
+        if self.ensemble.mon_dir is not None:
+            raise ModelUseError('The batched ensemble does not support "mon_dir".')
+        mons = [tools.DictPlus() for _ in range(batch)]
+        for key, (shape, dtype) in self._mon_shapes.items():
+            data = np.zeros((batch,) + shape, dtype=dtype)
+            for b in range(batch):
+                mons[b][key] = data[b]
+
+        self._batch_buffers = [self._get_member_buffers()]
+        for b in range(1, batch):
+            buffers = {}
+            for key, (buffer, counter, _, _) in self._mon_events.items():
+                buffers[('events', key)] = tools.new_event_buffer(buffer[0].shape[0])
+            for key, (_, counter, mean, m2) in self._mon_reducers.items():
+                buffers[('reducer', key)] = (np.zeros_like(counter), np.zeros_like(mean), np.zeros_like(m2))
+            if self.spike_ids is not None:
+                buffers[('spike_ids',)] = (np.zeros_like(self.spike_ids), np.zeros_like(self.spike_num))
+            for name, partial in self._partials.items():
+                buffers[('partials', name)] = tuple([np.zeros_like(val) for val in partial])
+            self._batch_buffers.append(buffers)
+        return mons
+
+    def _get_member_buffers(self):
+        buffers = {}
+        for key, (buffer, counter, _, _) in self._mon_events.items():
+            buffers[('events', key)] = (buffer, counter)
+        for key, (_, counter, mean, m2) in self._mon_reducers.items():
+            buffers[('reducer', key)] = (counter, mean, m2)
+        if self.spike_ids is not None:
+            buffers[('spike_ids',)] = (self.spike_ids, self.spike_num)
+        for name, partial in self._partials.items():
+            buffers[('partials', name)] = partial
+        return buffers
+
+    def set_batch_member(self, i):
+        """Switch the event buffers, the reducer values, the spike indices
+        and the partial buffers to the ones of the i-th batch member.
+
+        Parameters
+        ----------
+        i : int
+            The index of the batch member.
+        """
+        for item, val in self._batch_buffers[i].items():
+            if item[0] == 'events':
+                key = item[1]
+                _, _, indices, num_neu = self._mon_events[key]
+                self._mon_events[key] = val + (indices, num_neu)
+                setattr(self, f'{key}_events', val[0])
+                setattr(self, f'{key}_count', val[1])
+            elif item[0] == 'reducer':
+                key = item[1]
+                self._mon_reducers[key] = (self._mon_reducers[key][0],) + val
+                for k, v in zip(['counter', 'mean', 'm2'], val):
+                    setattr(self, f'{key}_{k}', v)
+            elif item[0] == 'partials':
+                name = item[1]
+                self._partials[name] = val
+                for suffix, v in zip(_PARTIAL_SUFFIXES, val):
+                    setattr(self, f'{name}{suffix}', v)
+            else:
+                self.spike_ids, self.spike_num = val
+
+    def merge_batch_monitors(self, mons):
+        """Merge the monitors of the batch members.
+
+        The monitor arrays are stacked along the first axis, except the
+        spike events and the time points. The spike events of each batch
+        member are given in a list, and the time points are shared by
+        all the batch members.
+
+        Parameters
+        ----------
+        mons : list
+            The monitors of each batch member, which are given by
+            ``new_batch_monitors()``.
+
+        Returns
+        -------
+        mon : DictPlus
+            The merged monitors.
+        """
+        event_keys = set()
+        for key in self._mon_events.keys():
+            event_keys.update([key, f'{key}_t', f'{key}_i'])
+        mon = tools.DictPlus()
+        for key, val in mons[0].items():
+            if key in event_keys:
+                mon[key] = [m[key] for m in mons]
+            elif key == 'ts' or key.endswith('_ts'):
+                mon[key] = val
+            elif val.base is not None and all([m[key].base is val.base for m in mons]):
+                mon[key] = val.base
+            else:
+                mon[key] = np.stack([m[key] for m in mons])
+        return mon
+
+    def check_continuation_monitors(self):
+        """Check the monitors support the continuation run."""
+        for key, indices, options in self.ensemble._mon_vars:
+            if options.get('window', None) is not None:
+                raise ModelUseError(f'The monitor "{key}" with the "window" option '
+                                    f'does not support the continuation run.')
+
+    def continue_monitors(self, run_length, step_offset):
+        """Prepare the monitors for the continuation run, in which the new
+        samples are appended to the monitors of the last runs.
+
+        The monitors with the time axis are grown (at least doubling the
+        capacity, so the buffer is reused in the subsequent continuation
+        runs), and the compiled monitor function writes into the view of
+        the new samples. The ``every`` sampling is counted by the global
+        time step, so it keeps its phase across the continuation runs.
+
+        Parameters
+        ----------
+        run_length : int
+            The number of the time steps of the continuation run.
+        step_offset : int
+            The number of the time steps of the last runs.
+        """
+        self.check_continuation_monitors()
+        self.mon_step_offset[0] = step_offset
+
+        mon = self.ensemble.mon
+        for key, sampling in self._mon_samples.items():
+            every = 1 if sampling is None else sampling[2]
+            if key not in self._mon_buffers:
+                self._mon_buffers[key] = (mon[key], mon[key].shape[0])
+                self._mon_steps[key] = np.arange(step_offset) if sampling is None else np.arange(*sampling)
+            buffer, length = self._mon_buffers[key]
+            new_steps = np.arange((-step_offset) % every, run_length, every)
+            buffer = self._grow_mon_array(buffer, length + len(new_steps))
+            mon[key] = buffer[length: length + len(new_steps)]
+            self._mon_buffers[key] = (buffer, length + len(new_steps))
+            self._mon_steps[key] = np.concatenate([self._mon_steps[key], new_steps + step_offset])
+
+        for key, (buffer, counter, _, _) in self._mon_events.items():
+            self._mon_event_starts[key] = (counter[0], step_offset)
+
+    def _grow_mon_array(self, buffer, length):
+        if buffer.shape[0] >= length:
+            return buffer
+        if isinstance(buffer, np.memmap):
+            # the file is extended, and the data are kept in place
+            return tools.resize_memmap_monitor(buffer, (length,) + buffer.shape[1:])
+        new_buffer = np.zeros((max(length, 2 * buffer.shape[0]),) + buffer.shape[1:], dtype=buffer.dtype)
+        new_buffer[:buffer.shape[0]] = buffer
+        return new_buffer
+
+    def get_mon_checkpoint(self, num_step):
+        """Get the monitor arrays, the event buffers of the event-based
+        monitors and the accumulated values of the reducer monitors,
+        which are saved in the checkpoint.
+
+        Parameters
+        ----------
+        num_step : int
+            The number of the finished time steps of the current run.
+
+        Returns
+        -------
+        arrays : dict
+            The arrays without the time axis.
+        rows : dict
+            The arrays with the time axis (the monitors and the event
+            buffers), with the format of ``{key: (array, num_row)}``,
+            in which only the first ``num_row`` rows are recorded.
+        """
+        arrays, rows = {}, {}
+        for key, val in self.ensemble.mon.items():
+            if isinstance(val, np.ndarray):
+                if key in self._mon_samples:
+                    sampling = self._mon_samples[key]
+                    if sampling is None:
+                        num_row = num_step
+                    else:
+                        num_row = len(range(sampling[0], min(sampling[1], num_step), sampling[2]))
+                    rows[f'mon.{key}'] = (val, min(num_row, val.shape[0]))
+                else:
+                    arrays[f'mon.{key}'] = val
+        for key, (buffer, counter, _, _) in self._mon_events.items():
+            rows[f'events.{key}'] = (buffer[0], int(counter[0]))
+        for key, (_, counter, mean, m2) in self._mon_reducers.items():
+            arrays[f'reducer.{key}.counter'] = counter
+            arrays[f'reducer.{key}.mean'] = mean
+            arrays[f'reducer.{key}.m2'] = m2
+        return arrays, rows
+
+    def set_mon_checkpoint(self, arrays):
+        """Restore the monitors given by ``get_mon_checkpoint()``.
+
+        The data are copied into the monitors allocated at the build
+        phase, so the compiled functions keep their references. For
+        the monitors with the time axis, the recorded rows are copied.
+
+        Parameters
+        ----------
+        arrays : dict
+            The arrays.
+        """
+        mon = self.ensemble.mon
+        for key, val in arrays.items():
+            kind, _, key = key.partition('.')
+            if kind == 'mon':
+                if isinstance(mon.get(key, None), np.ndarray):
+                    if mon[key].shape == val.shape:
+                        mon[key][...] = val
+                    elif key in self._mon_samples and mon[key].shape[1:] == val.shape[1:] and \
+                            mon[key].shape[0] >= val.shape[0]:
+                        mon[key][:val.shape[0]] = val
+            elif kind == 'events':
+                if key in self._mon_events:
+                    buffer, counter, _, _ = self._mon_events[key]
+                    if buffer[0].shape[0] < val.shape[0]:
+                        buffer[0] = np.zeros((val.shape[0] * 2, 2), dtype=np.int64)
+                    buffer[0][:val.shape[0]] = val
+                    counter[0] = val.shape[0]
+            elif kind == 'reducer':
+                key, _, field = key.rpartition('.')
+                if key in self._mon_reducers:
+                    _, counter, mean, m2 = self._mon_reducers[key]
+                    dict(counter=counter, mean=mean, m2=m2)[field][...] = val
+
+    def _get_mon_sampling(self, options, run_length, ts):
+        every = options.get('every', 1)
+        window = options.get('window', None)
+        if window is None:
+            if every == 1:
+                return None
+            return 0, run_length, every
+        if ts is None:
+            ts = np.arange(run_length) * profile.get_dt()
+        eps = profile.get_dt() * 1e-6
+        in_window = np.where((ts >= window[0] - eps) & (ts < window[1] - eps))[0]
+        if len(in_window) == 0:
+            return 0, 0, every
+        return int(in_window[0]), int(in_window[-1]) + 1, every
+
+    def finalize_monitors(self, ts):
+        """Finalize the monitors after the run, and set their time points.
+
+        If all the monitors are sampled at the same time steps, ``mon.ts``
+        is the sampled time points. Otherwise, ``mon.ts`` is all the time
+        points, and the time points of each sampled monitor ``key`` is
+        given by ``mon.key_ts``.
+
+        If the monitors are backed by the memory-mapped files, the time
+        points are also stored, and the monitors are flushed into the files
+        together with the metadata sidecar.
+
+        Parameters
+        ----------
+        ts : np.ndarray
+            The time points.
+        """
+        mon = self.ensemble.mon
+        mon_dir = self.ensemble.mon_dir
+
+        # reducer monitors
+        for key, (reduce, counter, mean, m2) in self._mon_reducers.items():
+            if reduce == 'mean':
+                mon[key][:] = mean
+            elif counter[0] > 0:
+                mon[key][:] = m2 / counter[0]
+
+        # monitors of the continuation runs
+        for key, (buffer, length) in self._mon_buffers.items():
+            mon[key] = buffer[:length]
+
+        # spike events
+        for key, (buffer, counter, indices, num_neu) in self._mon_events.items():
+            if key in self._mon_event_starts:
+                start, step_offset = self._mon_event_starts.pop(key)
+                buffer[0][start:counter[0], 0] += step_offset
+            events = buffer[0][:counter[0]]
+            steps, neu_idx = events[:, 0], events[:, 1]
+            if indices is not None:
+                neu_idx = indices[neu_idx]
+                num_neu = self.ensemble.num
+            mon[key] = tools.SpikeEvents(i=neu_idx, steps=steps, ts=ts, num=num_neu)
+            mon[f'{key}_t'] = self._new_mon_array(f'{key}_t', (len(steps),), dtype=ts.dtype)
+            mon[f'{key}_t'][:] = ts[steps]
+            mon[f'{key}_i'] = self._new_mon_array(f'{key}_i', (len(steps),), dtype=np.int_)
+            mon[f'{key}_i'][:] = neu_idx
+
+        # time points of the monitors
+        all_ts = {'ts': ts}
+        samples_ts = {}
+        for key, sampling in self._mon_samples.items():
+            if key in self._mon_steps:
+                samples_ts[key] = ts[self._mon_steps[key]]
+            else:
+                samples_ts[key] = ts if sampling is None else ts[slice(*sampling)]
+        samples = list(samples_ts.values())
+        if len(samples) and all([np.array_equal(sample, samples[0]) for sample in samples]):
+            all_ts['ts'] = samples[0]
+        else:
+            for key, sampling in self._mon_samples.items():
+                if sampling is not None:
+                    all_ts[f'{key}_ts'] = samples_ts[key]
+
+        for key, val in all_ts.items():
+            if mon_dir is None or len(self.ensemble._mon_vars) == 0:
+                mon[key] = val
+            else:
+                mon[key] = tools.memmap_monitor(mon_dir, self._name, key, val.shape, dtype=val.dtype)
+                mon[key][:] = val
+        if mon_dir is not None and len(self.ensemble._mon_vars):
+            tools.save_monitor_meta(mon_dir, self._name, mon)
+
     def get_codes_of_steps(self):
         """Get the code of user defined update steps.
 
@@ -673,6 +1244,13 @@ class Runner(object):
                                     f'Heterogeneous parameter "{ks}" is not in step functions, '
                                     f'it will not work. Please set "brainpy.profile.set(merge_integrators=True)" '
                                     f'to try to merge parameter "{ks}" into the step functions.')
+                    for ks in tools.get_func_scope(v.update_func, include_dispatcher=True).keys():
+                        if ks in self._pars.batch_values or ks in self._pars.runtime:
+                            raise ModelUseError(
+                                f'Batched or runtime parameter "{ks}" is not in step functions, '
+                                f'it will not work. '
+                                f'Please set "brainpy.profile.set(merge_integrators=True)" '
+                                f'to try to merge parameter "{ks}" into the step functions.')
                     if profile.is_jit():
                         code_scope[k] = tools.numba_func(v.update_func, params=self._pars.updates)
 
@@ -692,6 +1270,7 @@ class Runner(object):
 
     def step_vector_model(self):
         results = dict()
+        self._partials = {}
 
         # check whether the model include heterogeneous parameters
         delay_keys = self._delay_keys
@@ -706,19 +1285,23 @@ class Runner(object):
 
             # initialize code namespace
             used_args, code_arg2call = set(), {}
+            t0 = time.time()
             func_code, code_scope, formatter = self.merge_integrators(func)
+            self.build_profile['integrator_codegen'] += time.time() - t0
             code_scope[f'{self._name}_runner'] = self
 
             # check function code
             try:
                 states = {k: getattr(self.ensemble, k) for k in func_args
-                          if k not in constants.ARG_KEYWORDS and
+                          if k not in constants.ARG_KEYWORDS + constants.SPIKE_KEYWORDS and
                           isinstance(getattr(self.ensemble, k), ObjState)}
             except AttributeError:
                 raise ModelUseError(f'Model "{self._name}" does not have all the '
                                     f'required attributes: {func_args}.')
             add_args = set()
             for i, arg in enumerate(func_args):
+                if arg in constants.SPIKE_KEYWORDS:
+                    continue
                 used_args.add(arg)
                 if len(states) == 0:
                     continue
@@ -778,25 +1361,56 @@ class Runner(object):
                     arg_substitute[k] = self._model.heter_params_replace[k]
                     if k in all_heter_pars:
                         all_heter_pars.remove(k)
-            # substitute "range" to "numba.prange"
+            # substitute "range" to "numba.prange", except the loop where
+            # the parallel writes are a data race (the loop which accumulates
+            # into the "pre" or "post" state is parallelized by the partial
+            # buffers, see "_get_parallel_loops()")
             if ' range' in func_code:
-                arg_substitute['range'] = 'numba.prange'
+                if profile.get_numba_profile()['parallel']:
+                    func_code, partials = _get_parallel_loops(func_code)
+                    self._add_partial_buffers(stripped_fname, partials, code_args, code_arg2call)
+                    code_scope['touch_partial'] = touch_partial
+                    code_scope['reduce_partial'] = reduce_partial
+                else:
+                    arg_substitute['range'] = 'numba.prange'
                 code_scope['numba'] = numba
             # substitute
             if len(arg_substitute):
                 func_code = tools.word_replace(func_code, arg_substitute)
 
             # update code scope
+            arg_substitute = {}
             for k in list(code_scope.keys()):
-                if k in self._pars.updates:
+                if k in self._pars.batch_values:
+                    # the batched parameter is passed as the function
+                    # argument, so that it is switched with the batch member
+                    code_scope.pop(k)
+                    code_args.add(k)
+                    code_arg2call[k] = f'{self._name}.pars.updates["{k}"]'
+                elif k in self._pars.runtime:
+                    # the runtime parameter is passed as the function
+                    # argument, and the homogeneous one is used as "p[0]"
+                    code_scope.pop(k)
+                    code_args.add(k)
+                    code_arg2call[k] = f'{self._name}.pars.runtime["{k}"]'
+                    if k not in self._pars.heters:
+                        arg_substitute[k] = f'{k}[0]'
+                elif k in self._pars.updates:
                     code_scope[k] = self._pars.updates[k]
+            if len(arg_substitute):
+                func_code = tools.word_replace(func_code, arg_substitute)
 
             # handle the "_normal_like_"
             func_code = NoiseHandler.normal_pattern.sub(NoiseHandler.vector_replace_f, func_code)
             code_scope['numpy'] = np
+            func_code = self._cast_float_code(func_code, code_scope)
 
             # final
-            code_lines = func_code.split('\n')
+            code_lines = self._get_spike_ids_codes(func_args, code_args, code_arg2call)
+            code_lines += func_code.split('\n')
+            recorder = self._get_spike_ids_recorder(formatter, code_scope, code_args, code_arg2call)
+            if recorder is not None:
+                code_lines.append(recorder)
             code_lines.insert(0, f'# "{stripped_fname}" step function of {self._name}')
             code_lines.append('\n')
 
@@ -804,7 +1418,7 @@ class Runner(object):
             code_to_compile = [f'def {stripped_fname}({tools.func_call(code_args)}):']
             code_to_compile += code_lines
             func_code = '\n '.join(code_to_compile)
-            exec(compile(func_code, '', 'exec'), code_scope)
+            self._exec_code(func_code, code_scope, stripped_fname)
             func = code_scope[stripped_fname]
             if profile.is_jit():
                 func = tools.jit(func)
@@ -851,11 +1465,13 @@ class Runner(object):
             # 4. code scope variables
             used_args, code_arg2call = set(), {}
             func_args = inspect.getfullargspec(func).args
+            t0 = time.time()
             func_code, code_scope, formatter = self.merge_integrators(func)
+            self.build_profile['integrator_codegen'] += time.time() - t0
             code_scope[f'{self._name}_runner'] = self
             try:
                 states = {k: getattr(self.ensemble, k) for k in func_args
-                          if k not in constants.ARG_KEYWORDS and
+                          if k not in constants.ARG_KEYWORDS + constants.SPIKE_KEYWORDS and
                           isinstance(getattr(self.ensemble, k), ObjState)}
             except AttributeError:
                 raise ModelUseError(f'Model "{self._name}" does not have all the '
@@ -871,6 +1487,8 @@ class Runner(object):
             add_args = set()
             # substitute STATE item access to index
             for i, arg in enumerate(func_args):
+                if arg in constants.SPIKE_KEYWORDS:
+                    continue
                 used_args.add(arg)
                 if len(states) == 0:
                     continue
@@ -991,9 +1609,55 @@ class Runner(object):
             # add the for loop in the start of the main code
             has_pre = 'pre' in func_args
             has_post = 'post' in func_args
+            indent = '  '
             if profile.run_on_cpu():
-                code_lines = [f'for _obj_i in numba.prange({self.ensemble.num}):']
                 code_scope['numba'] = numba
+                # the neuron groups written by the synapses, in which
+                # the parallel loop over synapses would be a data race
+                written = [g for g in ['pre', 'post'] if g in func_args and
+                           any(left.strip().startswith(f'{g}[') for left in formatter.lefts)]
+                spike_args = [kw for kw in constants.SPIKE_KEYWORDS if kw in func_args]
+                if len(spike_args) > 1:
+                    raise ModelDefError(f'The scalar-based step function "{func_name}" in {self._name} '
+                                        f'cannot use {spike_args} simultaneously.')
+                if len(spike_args) == 1:
+                    # only visit the synapses of the spiking neurons, the parallel
+                    # loop over the spikes is a data race when the other group is written
+                    g = spike_args[0].split('_')[0]
+                    ptr, idx = getattr(connectivity, f'{g}2syn_csr')(getattr(self.ensemble, f'{g}_ids'),
+                                                                   getattr(self.ensemble, f'{g}_group').size)
+                    for k, v in [(f'{g}2syn_ptr', ptr), (f'{g}2syn_idx', idx)]:
+                        code_args.add(k)
+                        code_arg2call[k] = f'{self._name}_runner.{k}'
+                        self.set_data(k, v)
+                    other = 'post' if g == 'pre' else 'pre'
+                    loop = 'range' if other in written else 'numba.prange'
+                    code_lines = self._get_spike_ids_codes(func_args, code_args, code_arg2call)
+                    code_lines += [f'for _spike_k in {loop}({g}_spikes.shape[0]):',
+                                   f'  _{g}_j = {g}_spikes[_spike_k]',
+                                   f'  for _syn_k in range({g}2syn_ptr[_{g}_j], {g}2syn_ptr[_{g}_j + 1]):',
+                                   f'    _obj_i = {g}2syn_idx[_syn_k]']
+                    indent = '    '
+                elif not profile.get_numba_profile()['parallel'] or len(written) == 0:
+                    code_lines = [f'for _obj_i in numba.prange({self.ensemble.num}):']
+                elif len(written) == 1:
+                    # partition the synapses by the written neuron, so that each
+                    # neuron is only updated by one thread, and its synapses are
+                    # accumulated in the same order as the serial loop
+                    g = written[0]
+                    ptr, idx = getattr(connectivity, f'{g}2syn_csr')(getattr(self.ensemble, f'{g}_ids'),
+                                                                   getattr(self.ensemble, f'{g}_group').size)
+                    for k, v in [(f'{g}2syn_ptr', ptr), (f'{g}2syn_idx', idx)]:
+                        code_args.add(k)
+                        code_arg2call[k] = f'{self._name}_runner.{k}'
+                        self.set_data(k, v)
+                    code_lines = [f'for _{g}_j in numba.prange({len(ptr) - 1}):',
+                                  f'  for _syn_k in range({g}2syn_ptr[_{g}_j], {g}2syn_ptr[_{g}_j + 1]):',
+                                  f'    _obj_i = {g}2syn_idx[_syn_k]']
+                    indent = '    '
+                else:
+                    # both "pre" and "post" are written, run the synapses serially
+                    code_lines = [f'for _obj_i in range({self.ensemble.num}):']
             else:
                 code_lines = [f'_obj_i = cuda.grid(1)',
                               f'if _obj_i < {self.ensemble.num}:']
@@ -1002,27 +1666,34 @@ class Runner(object):
             if has_pre:
                 code_args.add(f'pre_ids')
                 code_arg2call[f'pre_ids'] = f'{self._name}_runner.pre_ids'
-                code_lines.append(f'  _pre_i = pre_ids[_obj_i]')
+                code_lines.append(f'{indent}_pre_i = pre_ids[_obj_i]')
                 self.set_data('pre_ids', getattr(self.ensemble, 'pre_ids'))
             if has_post:
                 code_args.add(f'post_ids')
                 code_arg2call[f'post_ids'] = f'{self._name}_runner.post_ids'
-                code_lines.append(f'  _post_i = post_ids[_obj_i]')
+                code_lines.append(f'{indent}_post_i = post_ids[_obj_i]')
                 self.set_data('post_ids', getattr(self.ensemble, 'post_ids'))
 
-            # substitute heterogeneous parameter "p" to "p[_obj_i]"
+            # substitute heterogeneous parameter "p" to "p[_obj_i]",
+            # and homogeneous runtime parameter "p" to "p[0]"
             # ------------------------------------------------------
             arg_substitute = {}
             for p in self._pars.heters.keys():
                 if p in code_scope:
                     arg_substitute[p] = f'{p}[_obj_i]'
+            for p in self._pars.runtime.keys():
+                if p in code_scope and p not in self._pars.heters and profile.run_on_cpu():
+                    arg_substitute[p] = f'{p}[0]'
             if len(arg_substitute):
                 func_code = tools.word_replace(func_code, arg_substitute)
 
             # add the main code (user defined)
             # ------------------
             for l in func_code.split('\n'):
-                code_lines.append('  ' + l)
+                code_lines.append(indent + l)
+            recorder = self._get_spike_ids_recorder(formatter, code_scope, code_args, code_arg2call)
+            if recorder is not None:
+                code_lines.append(recorder)
             code_lines.append('\n')
             stripped_fname = tools.get_func_name(func, replace=True)
             code_lines.insert(0, f'# "{stripped_fname}" step function of {self._name}')
@@ -1030,7 +1701,21 @@ class Runner(object):
             # update code scope
             # ------------------
             for k in list(code_scope.keys()):
-                if k in self._pars.updates:
+                if k in self._pars.batch_values:
+                    # the batched parameter is the function argument
+                    code_scope.pop(k)
+                    code_args.add(k)
+                    code_arg2call[k] = f'{self._name}.pars.updates["{k}"]'
+                    if k in all_heter_pars:
+                        all_heter_pars.remove(k)
+                elif k in self._pars.runtime and profile.run_on_cpu():
+                    # the runtime parameter is the function argument
+                    code_scope.pop(k)
+                    code_args.add(k)
+                    code_arg2call[k] = f'{self._name}.pars.runtime["{k}"]'
+                    if k in all_heter_pars:
+                        all_heter_pars.remove(k)
+                elif k in self._pars.updates:
                     if profile.run_on_cpu():
                         # run on cpu :
                         # 1. update the parameter
@@ -1054,7 +1739,10 @@ class Runner(object):
             if len(NoiseHandler.normal_pattern.findall(func_code)):
                 if profile.run_on_gpu():  # gpu noise
                     func_code = NoiseHandler.normal_pattern.sub(NoiseHandler.cuda_replace_f, func_code)
-                    code_scope['xoroshiro128p_normal_float64'] = xoroshiro128p_normal_float64
+                    if profile.get_float_type() is np.float32:
+                        code_scope['xoroshiro128p_normal_float32'] = xoroshiro128p_normal_float32
+                    else:
+                        code_scope['xoroshiro128p_normal_float64'] = xoroshiro128p_normal_float64
                     num_block, num_thread = tools.get_cuda_size(self.ensemble.num)
                     code_args.add('rng_states')
                     code_arg2call['rng_states'] = f'{self._name}_runner.rng_states'
@@ -1063,7 +1751,8 @@ class Runner(object):
                 else:  # cpu noise
                     func_code = NoiseHandler.normal_pattern.sub(NoiseHandler.scalar_replace_f, func_code)
                     code_scope['numpy'] = np
-                code_lines = func_code.split('\n')
+            func_code = self._cast_float_code(func_code, code_scope)
+            code_lines = func_code.split('\n')
 
             # code to compile
             # -----------------
@@ -1071,7 +1760,7 @@ class Runner(object):
             code_to_compile = [f'def {stripped_fname}({tools.func_call(code_args)}):']
             code_to_compile += code_lines
             func_code = '\n  '.join(code_to_compile)
-            exec(compile(func_code, '', 'exec'), code_scope)
+            self._exec_code(func_code, code_scope, stripped_fname)
             # 2. output the function codes
             if not profile.is_merge_steps():
                 if profile.show_format_code():
@@ -1129,8 +1818,26 @@ Several ways to correct this error is:
 
         return results
 
-    def merge_codes(self, compiled_result):
+    def merge_codes(self, compiled_result, profile_steps=None):
+        """Merge the compiled step functions into the function calls.
+
+        Parameters
+        ----------
+        compiled_result : dict
+            The compiled results of the input, step and monitor functions.
+        profile_steps : int, None
+            If not None, the function call of each schedule entry is timed
+            at every ``profile_steps`` time steps. See ``get_step_profile()``.
+
+        Returns
+        -------
+        calls : list
+            The code lines of the function calls.
+        """
         codes_of_calls = []  # call the compiled functions
+        self._code_results = compiled_result
+        self.step_times.clear()
+        self.step_calls.clear()
 
         if profile.run_on_cpu():
             if profile.is_merge_steps():
@@ -1147,14 +1854,14 @@ Several ways to correct this error is:
                 lines.insert(0, f'\n# {self._name} "merge_func"'
                                 f'\ndef merge_func({tools.func_call(args)}):')
                 func_code = '\n  '.join(lines)
-                exec(compile(func_code, '', 'exec'), code_scopes)
+                self._exec_code(func_code, code_scopes, 'merge_func')
 
                 func = code_scopes['merge_func']
                 if profile.is_jit():
                     func = tools.jit(func)
                 self.merge_func = func
                 func_call = f'{self._name}_runner.merge_func({tools.func_call(arg2calls_list)})'
-                codes_of_calls.append(func_call)
+                codes_of_calls.extend(self._timed_calls('merge_func', [func_call], profile_steps))
 
                 if profile.show_format_code():
                     tools.show_code_str(func_code.replace('def ', f'def {self._name}_'))
@@ -1165,21 +1872,71 @@ Several ways to correct this error is:
                 for item in self.get_schedule():
                     if item in compiled_result:
                         func_call = compiled_result[item]['call']
-                        codes_of_calls.append(func_call)
+                        codes_of_calls.extend(self._timed_calls(item, [func_call], profile_steps))
 
         else:
             if profile.is_merge_steps():
                 print('WARNING: GPU mode do not support to merge steps.')
 
             for item in self.get_schedule():
+                calls = []
                 for compiled_key in compiled_result.keys():
                     if compiled_key.startswith(item):
                         func_call = compiled_result[compiled_key]['call']
-                        codes_of_calls.append(func_call)
-                        codes_of_calls.append('cuda.synchronize()')
+                        calls.append(func_call)
+                        calls.append('cuda.synchronize()')
+                if len(calls):
+                    codes_of_calls.extend(self._timed_calls(item, calls, profile_steps))
 
         return codes_of_calls
 
+    def _timed_calls(self, item, calls, profile_steps):
+        if profile_steps is None:
+            return calls
+
+        # compile the JIT functions ahead,
+        # so that the compilation is not timed
+        self.compile_step_funcs([c for c in calls if c != 'cuda.synchronize()'], profile.get_dt())
+        self.step_times[item] = 0.
+        self.step_calls[item] = 0
+        timed_calls = ['_tp = _perf_counter()'] + calls
+        timed_calls.append(f'{self._name}_runner.step_times["{item}"] += _perf_counter() - _tp')
+        timed_calls.append(f'{self._name}_runner.step_calls["{item}"] += 1')
+        if profile_steps == 1:
+            return timed_calls
+        lines = [f'if _i % {profile_steps} == 0:']
+        lines.extend([f'  {line}' for line in timed_calls])
+        lines.append('else:')
+        lines.extend([f'  {line}' for line in calls])
+        return lines
+
+    def reset_step_profile(self):
+        """Reset the time counters of the schedule entries."""
+        for item in self.step_times.keys():
+            self.step_times[item] = 0.
+            self.step_calls[item] = 0
+
+    def get_step_profile(self):
+        """Get the time used by each schedule entry in the simulation.
+
+        Returns
+        -------
+        rows : list
+            The profile of each schedule entry, including the ensemble
+            name (``ensemble``), the schedule entry (``step``), the number
+            of timed calls (``calls``), the total time (``total``) and the
+            mean time (``mean``) of the timed calls, in seconds.
+        """
+        rows = []
+        for item, total in self.step_times.items():
+            calls = self.step_calls[item]
+            rows.append({'ensemble': self._name,
+                         'step': item,
+                         'calls': calls,
+                         'total': total,
+                         'mean': total / calls if calls > 0 else 0.})
+        return rows
+
     def get_schedule(self):
         return self._schedule
 
@@ -1192,6 +1949,21 @@ Several ways to correct this error is:
                 raise ModelUseError(f'Unknown step function "{s}" for model "{self._name}".')
         self._schedule = schedule
 
+    def _cast_float_code(self, func_code, code_scope):
+        # In JIT mode with the "float32" type, the float literals and the float
+        # variables in the code scope are cast into "float32", so that Numba
+        # does not promote the computation of the step function into "float64".
+        float_type = profile.get_float_type()
+        if not profile.is_jit() or float_type is np.float64:
+            return func_code
+        for k, v in code_scope.items():
+            if isinstance(v, float):
+                code_scope[k] = float_type(v)
+            elif isinstance(v, np.ndarray) and v.dtype.kind == 'f' and v.dtype != float_type:
+                code_scope[k] = v.astype(float_type)
+        code_scope['numpy'] = np
+        return tools.cast_float_literals(func_code, np.dtype(float_type).name)
+
     def set_data(self, key, data):
         if profile.run_on_gpu():
             if np.isscalar(data):
@@ -1206,6 +1978,9 @@ Several ways to correct this error is:
         if key not in self.gpu_data:
             if isinstance(val, np.ndarray):
                 val = cuda.to_device(val)
+            elif isinstance(val, tuple) and all([isinstance(v, np.ndarray) for v in val]):
+                # the connections in the CSR format
+                val = type(val)(*[cuda.to_device(v) for v in val])
             elif isinstance(val, ObjState):
                 val = val.get_cuda_data()
             setattr(self, key, val)
@@ -1215,6 +1990,567 @@ Several ways to correct this error is:
         for val in self.gpu_data.values():
             val.to_host()
 
+    def reset_build_profile(self):
+        """Reset the time used in each build phase and the code sizes."""
+        self.build_profile.clear()
+        self.build_profile.update({'integrator_codegen': 0.,
+                                   'step_codegen': 0.,
+                                   'exec': 0.,
+                                   'numba_compile': 0.,
+                                   'code_size': {}})
+
+    def _exec_code(self, func_code, code_scope, func_name):
+        t0 = time.time()
+        tools.exec_code(func_code, code_scope)
+        self.build_profile['exec'] += time.time() - t0
+        self.build_profile['code_size'][func_name] = len(func_code)
+
+    def compile_step_funcs(self, lines_of_call, dt):
+        """Compile the JIT functions in the calls of the time step.
+
+        Usually, the Numba functions are compiled at the first call of the
+        step function. This function compiles them ahead of the time loop
+        with the types of the current arguments, so that the compilation
+        time of each ensemble can be measured.
+
+        Parameters
+        ----------
+        lines_of_call : list, tuple
+            The code lines of the function calls (generated by ``Ensemble._build()``).
+        dt : float
+            The time precision.
+        """
+        if not (profile.is_jit() and profile.run_on_cpu()):
+            return
+        t0 = time.time()
+        scope = {self._name: self.ensemble, f'{self._name}_runner': self,
+                 '_t': 0., '_i': 0, '_dt': dt}
+        for line in lines_of_call:
+            call = ast.parse(line.strip()).body[0].value
+            func = eval(tools.ast2code(call.func), scope)
+            if not isinstance(func, Dispatcher):
+                continue
+            args = [eval(tools.ast2code(arg), scope) for arg in call.args]
+            func.compile(tuple(numba.typeof(arg) for arg in args))
+        self.build_profile['numba_compile'] += time.time() - t0
+
+    def get_data_accesses(self):
+        """Get the data read and written by the ensemble in a time step.
+
+        The accesses are derived from the generated step functions of the
+        last build: the data of each function is given by its arguments
+        (see ``merge_codes()``), and the written data by the assignment
+        targets (the ``lefts`` of ``tools.CodeLineFormatter``). Each access
+        is a tuple of the data identity and the variable name, where ``"*"``
+        means the whole data. The data used other than by its rows (for
+        example, bound to another name, or indexed by a computed row) is
+        accessed as a whole.
+
+        Returns
+        -------
+        accesses : tuple
+            The sets of the read and the written data.
+        """
+        reads, writes = set(), set()
+        scope = {self._name: self.ensemble, f'{self._name}_runner': self, '_t': 0., '_i': 0, '_dt': 0.}
+        for result in self._code_results.values():
+            # the data of the arguments
+            data = {}
+            for arg in result['args']:
+                call = result['arg2calls'][arg]
+                if call.endswith('["_data"]'):
+                    state = eval(call[:-len('["_data"]')], scope)
+                    data[arg] = (id(state), state['_idx2var'])
+                else:
+                    val = eval(call, scope)
+                    if not isinstance(val, (bool, int, float, np.number)):
+                        data[arg] = (id(val), None)
+            code = '\n'.join(result['codes'])
+            formatter = tools.CodeLineFormatter()
+            formatter.visit(ast.parse(code))
+            r, w = _get_code_accesses(ast.parse(code), formatter, data)
+            reads.update(r)
+            writes.update(w)
+        # the delay indices
+        if len(self._delay_keys):
+            writes.add((id(self.ensemble.ST), '*'))
+        return reads, writes
+
+
+def _get_code_accesses(tree, formatter, data):
+    # Get the data read and written by the code. "data" is the dict of
+    # "{name: (data_id, idx2var)}" of the names bound to the data, where
+    # "idx2var" maps the first index of the data to the variable.
+    def get_item(subscript, idx2var):
+        index = subscript.slice
+        if isinstance(index, ast.Tuple):
+            index = index.elts[0]
+        if isinstance(index, ast.Constant):
+            if isinstance(index.value, str):
+                return index.value
+            if idx2var is not None and isinstance(index.value, int):
+                return idx2var.get(index.value, '*')
+        return '*'
+
+    def get_root(node):
+        # the root name, and the subscript on it
+        subscript = None
+        while isinstance(node, ast.Subscript):
+            node, subscript = node.value, node
+        return (node.id, subscript) if isinstance(node, ast.Name) else (None, None)
+
+    # the local names bound to the data (e.g. "p = post", or "v = ST[0]")
+    aliases = {}
+    changed = True
+    while changed:
+        changed = False
+        for left, right in zip(formatter.lefts, formatter.rights):
+            left = ast.parse(left).body[0].value
+            if not isinstance(left, ast.Name) or left.id in data:
+                continue
+            names = set([n.id for n in ast.walk(ast.parse(right)) if isinstance(n, ast.Name)])
+            sources = set([data[n][0] for n in names if n in data])
+            for n in names & set(aliases.keys()):
+                sources |= aliases[n]
+            if not sources <= aliases.get(left.id, set()):
+                aliases[left.id] = aliases.get(left.id, set()) | sources
+                changed = True
+
+    reads, writes = set(), set()
+    parents = {}
+    for node in ast.walk(tree):
+        for child in ast.iter_child_nodes(node):
+            parents[child] = node
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Name) or node.id not in data:
+            continue
+        data_id, idx2var = data[node.id]
+        parent = parents.get(node, None)
+        if isinstance(parent, ast.Subscript) and parent.value is node:
+            # (the assigned data is not read, unless by the augmented assignment)
+            if not isinstance(parent.ctx, ast.Store) or isinstance(parents[parent], ast.AugAssign):
+                reads.add((data_id, get_item(parent, idx2var)))
+        else:
+            reads.add((data_id, '*'))
+            # the data passed to a function may be changed in it
+            if isinstance(parent, (ast.Call, ast.keyword)):
+                writes.add((data_id, '*'))
+    for left in formatter.lefts:
+        name, subscript = get_root(ast.parse(left).body[0].value)
+        if subscript is None:
+            continue
+        if name in data:
+            data_id, idx2var = data[name]
+            writes.add((data_id, get_item(subscript, idx2var)))
+        for data_id in aliases.get(name, ()):
+            reads.add((data_id, '*'))
+            writes.add((data_id, '*'))
+    # the outputs of the functions, like "np.add(a, b, out=ST[0])"
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            for keyword in node.keywords:
+                if keyword.arg == 'out':
+                    name, subscript = get_root(keyword.value)
+                    if name in data:
+                        data_id, idx2var = data[name]
+                        writes.add((data_id, '*' if subscript is None else get_item(subscript, idx2var)))
+                    for data_id in aliases.get(name, ()):
+                        writes.add((data_id, '*'))
+    return reads, writes
+
+
+# the number of the chunks of the parallel loop which accumulates
+# into the "pre" or "post" state, each chunk has its own partial
+# buffers, which are reduced in order, so that the result does
+# not depend on the number of the threads
+_ACCUMULATE_CHUNKS = 16
+# the argument suffixes of the partial buffers
+_PARTIAL_SUFFIXES = ('', '_marks', '_touched', '_num')
+
+
+def new_partial_buffers(row):
+    """Create the partial buffers of the parallel loop which accumulates
+    into the state row (see ``_get_parallel_loops()``).
+
+    Parameters
+    ----------
+    row : np.ndarray
+        The accumulated row of the ``pre`` or ``post`` state.
+
+    Returns
+    -------
+    buffers : tuple
+        The partial values of each chunk, the marks of the touched
+        elements, the indices of the touched elements, and the number
+        of the touched elements of each chunk.
+    """
+    return (np.zeros((_ACCUMULATE_CHUNKS, row.shape[0]), dtype=row.dtype),
+            np.zeros((_ACCUMULATE_CHUNKS, row.shape[0]), dtype=np.bool_),
+            np.zeros((_ACCUMULATE_CHUNKS, row.shape[0]), dtype=np.int64),
+            np.zeros(_ACCUMULATE_CHUNKS, dtype=np.int64))
+
+
+def touch_partial(marks, touched, num, chunk, index):
+    """Record the elements of the partial buffer of the chunk which
+    are accumulated, so that only these elements are reduced."""
+    raise NotImplementedError('"touch_partial" is only called in the JIT functions.')
+
+
+@overload(touch_partial)
+def _touch_partial_impl(marks, touched, num, chunk, index):
+    if isinstance(index, numba.types.Integer):
+        def touch(marks, touched, num, chunk, index):
+            j = index if index >= 0 else index + marks.shape[1]
+            if not marks[chunk, j]:
+                marks[chunk, j] = True
+                touched[chunk, num[chunk]] = j
+                num[chunk] += 1
+
+        return touch
+
+    if isinstance(index, numba.types.Array) and index.ndim == 1:
+        if isinstance(index.dtype, numba.types.Boolean):
+            def touch(marks, touched, num, chunk, index):
+                for j in range(index.shape[0]):
+                    if index[j] and not marks[chunk, j]:
+                        marks[chunk, j] = True
+                        touched[chunk, num[chunk]] = j
+                        num[chunk] += 1
+
+            return touch
+
+        if isinstance(index.dtype, numba.types.Integer):
+            def touch(marks, touched, num, chunk, index):
+                for k in range(index.shape[0]):
+                    j = index[k] if index[k] >= 0 else index[k] + marks.shape[1]
+                    if not marks[chunk, j]:
+                        marks[chunk, j] = True
+                        touched[chunk, num[chunk]] = j
+                        num[chunk] += 1
+
+            return touch
+
+
+@numba.njit
+def reduce_partial(row, partial, marks, touched, num, chunk):
+    """Add the touched elements of the partial buffer of the chunk
+    into the state row, and clear them for the next time step."""
+    for k in range(num[chunk]):
+        j = touched[chunk, k]
+        row[j] += partial[chunk, j]
+        partial[chunk, j] = 0
+        marks[chunk, j] = False
+    num[chunk] = 0
+
+
+def _get_state_aliases(tree):
+    # the local names bound to the "pre" or "post" state (e.g. "p = post[3]")
+    aliases = set()
+    changed = True
+    while changed:
+        changed = False
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.Assign):
+                continue
+            names = set([n.id for n in ast.walk(node.value) if isinstance(n, ast.Name)])
+            if not names & ({'pre', 'post'} | aliases):
+                continue
+            for target in node.targets:
+                for n in ast.walk(target):
+                    if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store) and n.id not in aliases:
+                        aliases.add(n.id)
+                        changed = True
+    return aliases
+
+
+def _get_accumulations(loop, aliases=()):
+    # Get the rows of the "pre" and "post" states, which are accumulated
+    # by "+=" (or "-=") in the loop, with the format of "{(group, row): statements}".
+    # Return None if the loop can not run in parallel, that is, it writes
+    # the states otherwise, or reads the accumulated rows, or writes the
+    # names bound to the states, or writes the other arrays at the index
+    # which is not the loop target.
+    parents = {}
+    for node in ast.walk(loop):
+        for child in ast.iter_child_nodes(node):
+            parents[child] = node
+        if isinstance(node, (ast.Break, ast.Return)):
+            return None
+    if len(loop.orelse) or not isinstance(loop.target, ast.Name):
+        return None
+
+    def get_row(subscript):
+        index = subscript.slice
+        if isinstance(index, ast.Tuple):
+            index = index.elts[0]
+        if isinstance(index, ast.Constant) and isinstance(index.value, int):
+            return index.value
+        return None
+
+    def get_element(target):
+        # "post[3][e]" or "post[3, e]" to "(3, e)"
+        if isinstance(target.value, ast.Subscript) and isinstance(target.value.value, ast.Name):
+            row, index = get_row(target.value), target.slice
+        elif isinstance(target.slice, ast.Tuple) and len(target.slice.elts) == 2:
+            row, index = get_row(target), target.slice.elts[1]
+        else:
+            return None
+        if row is None or isinstance(index, (ast.Slice, ast.Tuple)):
+            return None
+        return row, index
+
+    def is_loop_index(target):
+        index = target.slice
+        if isinstance(index, ast.Tuple):
+            index = index.elts[-1]
+        return isinstance(index, ast.Name) and index.id == loop.target.id
+
+    accumulations = {}
+    targets = []
+    for node in ast.walk(loop):
+        if isinstance(node, ast.Assign):
+            node_targets = node.targets
+        elif isinstance(node, (ast.AugAssign, ast.AnnAssign)):
+            node_targets = [node.target]
+        else:
+            continue
+        for target in node_targets:
+            for sub_target in ast.walk(target):
+                if not isinstance(sub_target, ast.Subscript) or not isinstance(sub_target.ctx, ast.Store):
+                    continue
+                root = sub_target
+                while isinstance(root, ast.Subscript):
+                    root = root.value
+                if not isinstance(root, ast.Name) or root.id in aliases:
+                    return None
+                if root.id not in ['pre', 'post']:
+                    if not is_loop_index(sub_target):
+                        return None
+                    continue
+                if not (isinstance(node, ast.AugAssign) and isinstance(node.op, (ast.Add, ast.Sub))
+                        and sub_target is node.target):
+                    return None
+                element = get_element(sub_target)
+                if element is None:
+                    return None
+                accumulations.setdefault((root.id, element[0]), []).append(node)
+                targets.append(sub_target)
+    # the accumulated rows are not read in the loop,
+    # and the states are not passed to the functions
+    for node in ast.walk(loop):
+        if isinstance(node, ast.Name) and node.id in ['pre', 'post']:
+            parent = parents[node]
+            if not isinstance(parent, ast.Subscript) or get_row(parent) is None:
+                return None
+            if isinstance(parents[parent], (ast.Call, ast.keyword)):
+                return None
+            if (node.id, get_row(parent)) in accumulations and \
+                    parent not in targets and parents[parent] not in targets:
+                return None
+    return accumulations
+
+
+class _AccumulationReplacer(ast.NodeTransformer):
+    # Replace "post[3][e] += v" by the accumulation into the partial
+    # buffer of the chunk, which records the touched elements.
+    def __init__(self, statements):
+        self.statements = statements
+        self.num = 0
+
+    def visit_AugAssign(self, node):
+        if node not in self.statements:
+            return node
+        buffer = self.statements[node]
+        target = node.target
+        if isinstance(target.slice, ast.Tuple):
+            index = target.slice.elts[1]
+        else:
+            index = target.slice
+        j = f'{buffer}_j{self.num}'
+        self.num += 1
+        lines = [f'{j} = {tools.ast2code(index).strip()}',
+                 f'touch_partial({buffer}_marks, {buffer}_touched, {buffer}_num, _chunk, {j})',
+                 f'{buffer}[_chunk][{j}] += 0']
+        nodes = ast.parse('\n'.join(lines)).body
+        nodes[-1].op = node.op
+        nodes[-1].value = node.value
+        return nodes
+
+
+def _get_accumulation_loop(loop, accumulations, num_loop):
+    # Run the loop in the chunks of its iterations in parallel. Each chunk
+    # accumulates into its own partial buffer of each accumulated row,
+    # which records the touched elements, and the touched elements are
+    # added to the rows in the order of the chunks.
+    buffers, statements = {}, {}
+    for i, key in enumerate(sorted(accumulations.keys())):
+        buffers[key] = f'_acc{num_loop}_{i}'
+        for node in accumulations[key]:
+            statements[node] = buffers[key]
+    body = [_AccumulationReplacer(statements).visit(node) for node in loop.body]
+    loop.body = [n for node in body for n in (node if isinstance(node, list) else [node])]
+    args = [tools.ast2code(arg).strip() for arg in loop.iter.args]
+    n = f'_n{num_loop}'
+    if len(args) == 1:
+        start = ''
+        lines = [f'{n} = max({args[0]}, 0)']
+    else:
+        start = f'{args[0]} + '
+        lines = [f'{n} = max(({args[1]}) - ({args[0]}), 0)']
+    lines.extend([f'for _chunk in numba.prange({_ACCUMULATE_CHUNKS}):',
+                  f'    for {loop.target.id} in range({start}_chunk * {n} // {_ACCUMULATE_CHUNKS}, '
+                  f'{start}(_chunk + 1) * {n} // {_ACCUMULATE_CHUNKS}):',
+                  f'        pass',
+                  f'for _chunk in range({_ACCUMULATE_CHUNKS}):'])
+    for (group, row), buffer in buffers.items():
+        lines.append(f'    reduce_partial({group}[{row}], {buffer}, {buffer}_marks, '
+                     f'{buffer}_touched, {buffer}_num, _chunk)')
+    nodes = ast.parse('\n'.join(lines)).body
+    nodes[1].body[0].body = loop.body
+    return nodes, {buffer: key for key, buffer in buffers.items()}
+
+
+def _get_parallel_loops(func_code):
+    """Parallelize the loops over ``range`` in the vector-based step function.
+
+    The parallel loop, in which an element is written by many iterations,
+    is a data race. The loop which only accumulates into the rows of the
+    ``pre`` or ``post`` state (like ``post['ge'][post_ids[i]] += w``), and
+    does not read these rows, runs in the fixed number of the chunks in
+    parallel. Each chunk accumulates into its own partial buffers (which
+    are created once by ``new_partial_buffers()``), and only the touched
+    elements are reduced in order. So the result is deterministic, no matter
+    how many threads are used, and the cost follows the number of the
+    accumulations. The loop which writes the other arrays only at its own
+    index (like ``ST['g'][i] = ...``) is substituted by ``numba.prange``.
+    The other loops run serially, including the ones which write the names
+    bound to the ``pre`` or ``post`` state (like ``p = post[3]``).
+
+    Parameters
+    ----------
+    func_code : str
+        The code of the step function, whose state keys are substituted by the indices.
+
+    Returns
+    -------
+    result : tuple
+        The code with the parallel loops, and the dict of the partial
+        buffers, with the format of ``{buffer: (group, row)}``.
+    """
+    num_loop = [0]
+    partials = {}
+    tree = ast.parse(func_code)
+    aliases = _get_state_aliases(tree)
+
+    def parallelize(body):
+        new_body = []
+        for node in body:
+            if isinstance(node, ast.For) and isinstance(node.iter, ast.Call) and \
+                    isinstance(node.iter.func, ast.Name) and node.iter.func.id == 'range':
+                accumulations = _get_accumulations(node, aliases)
+                if accumulations is None:
+                    new_body.append(node)
+                elif len(accumulations) == 0:
+                    node.iter.func = ast.parse('numba.prange').body[0].value
+                    new_body.append(node)
+                elif len(node.iter.args) in [1, 2] and len(node.iter.keywords) == 0:
+                    nodes, buffers = _get_accumulation_loop(node, accumulations, num_loop[0])
+                    new_body.extend(nodes)
+                    partials.update(buffers)
+                    num_loop[0] += 1
+                else:
+                    new_body.append(node)
+                continue
+            if isinstance(node, (ast.If, ast.For, ast.While)):
+                node.body = parallelize(node.body)
+                node.orelse = parallelize(node.orelse)
+            new_body.append(node)
+        return new_body
+
+    func_code = '\n'.join([tools.ast2code(node).rstrip() for node in parallelize(tree.body)])
+    return func_code, partials
+
+
+def _is_access_conflict(accesses1, accesses2):
+    def overlap(a, b):
+        for id1, item1 in a:
+            for id2, item2 in b:
+                if id1 == id2 and (item1 == item2 or '*' in (item1, item2)):
+                    return True
+        return False
+
+    reads1, writes1 = accesses1
+    reads2, writes2 = accesses2
+    return overlap(writes1, reads2 | writes2) or overlap(writes2, reads1)
+
+
+def get_concurrent_stages(ensembles):
+    """Group the ensembles into the stages, in which the ensembles can
+    be called concurrently.
+
+    Each ensemble is put into the stage after the last stage which has
+    an ensemble that is added before it and conflicts with it (one
+    writes the data which the other reads or writes). Therefore, the
+    conflicting ensembles are called in the order they are added.
+
+    Parameters
+    ----------
+    ensembles : list, tuple
+        The built ensembles, in the order they are called.
+
+    Returns
+    -------
+    stages : list
+        The lists of the ensembles in each stage.
+    """
+    accesses = [obj.runner.get_data_accesses() for obj in ensembles]
+    levels = []
+    for i in range(len(ensembles)):
+        level = 0
+        for j in range(i):
+            if _is_access_conflict(accesses[j], accesses[i]):
+                level = max(level, levels[j] + 1)
+        levels.append(level)
+    stages = [[] for _ in range(max(levels) + 1)] if len(levels) else []
+    for obj, level in zip(ensembles, levels):
+        stages[level].append(obj)
+    return stages
+
+
+def _split_stage(stage, num_task):
+    # Split the ensembles of the stage into "num_task" tasks, each of
+    # which runs its ensembles in turn, so that the stage is run by at
+    # most "num_task" threads. The larger ensembles are put first into
+    # the task with the fewest neurons (or synapses).
+    tasks = [[] for _ in range(min(num_task, len(stage)))]
+    loads = [0] * len(tasks)
+    for obj in sorted(stage, key=lambda obj: -obj.num):
+        i = int(np.argmin(loads))
+        tasks[i].append(obj)
+        loads[i] += obj.num
+    # keep the order of the ensembles in each task
+    return [sorted(task, key=stage.index) for task in tasks]
+
+
+def run_concurrent(pool, funcs, _t, _i, _dt):
+    """Call the step functions concurrently on the thread pool.
+
+    The first function is called in the current thread. Each function
+    runs one task of a stage (see ``Network.build()``), so at most one
+    task is submitted to each thread in a time step.
+
+    Parameters
+    ----------
+    pool : concurrent.futures.ThreadPoolExecutor
+        The thread pool.
+    funcs : list, tuple
+        The step functions ``func(_t, _i, _dt)``.
+    """
+    futures = [pool.submit(func, _t, _i, _dt) for func in funcs[1:]]
+    funcs[0](_t, _i, _dt)
+    for future in futures:
+        future.result()
+
 
 class TrajectoryRunner(Runner):
     """Runner class for trajectory.
@@ -1284,3 +2620,365 @@ class TrajectoryRunner(Runner):
         formatter = tools.LineFormatterForTrajectory(self.fixed_vars)
         formatter.visit(tree)
         return formatter
+
+
+def get_build_report(ensembles, network_profile):
+    """Get the structured report of the build phase.
+
+    Parameters
+    ----------
+    ensembles : list, tuple
+        The built ensembles.
+    network_profile : dict
+        The time used to generate and compile the step (or loop)
+        function of the network.
+
+    Returns
+    -------
+    report : dict
+        The report with the following items:
+
+        - ``ensembles``: the time (in seconds) used in each build phase
+          (``integrator_codegen``, ``step_codegen``, ``exec`` and
+          ``numba_compile``), and the size of each generated code
+          (``code_size``) of each ensemble.
+        - ``network``: the time used to generate (``codegen``) and
+          compile (``numba_compile``) the network function.
+        - ``phases``: the total time of each build phase.
+        - ``total``: the total time of the build phase.
+    """
+    report = {'ensembles': {}, 'network': dict(network_profile), 'phases': {}}
+    phases = ['integrator_codegen', 'step_codegen', 'exec', 'numba_compile']
+    for phase in phases:
+        report['phases'][phase] = 0.
+    for ensemble in ensembles:
+        build_profile = deepcopy(ensemble.runner.build_profile)
+        report['ensembles'][ensemble.name] = build_profile
+        for phase in phases:
+            report['phases'][phase] += build_profile[phase]
+    report['phases']['step_codegen'] += network_profile.get('codegen', 0.)
+    report['phases']['numba_compile'] += network_profile.get('numba_compile', 0.)
+    report['total'] = sum(report['phases'].values())
+    return report
+
+
+def _to_float_type(val):
+    # cast the float input into the default float type
+    float_type = profile.get_float_type()
+    if isinstance(val, np.ndarray):
+        if val.dtype.kind == 'f' and val.dtype != float_type:
+            val = val.astype(float_type)
+    elif isinstance(val, (float, np.floating)):
+        val = float_type(val)
+    return val
+
+
+def _get_sampling_code(sampling, run_length, offset=None):
+    # get the condition to record the monitor,
+    # the index of the sample, and the number of samples.
+    # "offset" is the code of the global time step of "_i == 0"
+    # in the continuation runs, so that the "every" sampling
+    # keeps its phase across the runs
+    if sampling is None:
+        return '', '_i', run_length
+    start, end, every = sampling
+    num_sample = len(range(start, end, every))
+    if start == 0 and end == run_length:
+        if every == 1:
+            return '', '_i', run_length
+        if offset is None:
+            return f'_i % {every} == 0', f'_i // {every}', num_sample
+        return f'(_i + {offset}) % {every} == 0', \
+               f'(_i + {offset}) // {every} - ({offset} + {every - 1}) // {every}', num_sample
+    if every == 1:
+        return f'{start} <= _i < {end}', f'_i - {start}', num_sample
+    return f'{start} <= _i < {end} and (_i - {start}) % {every} == 0', \
+           f'(_i - {start}) // {every}', num_sample
+
+
+def _code_to_identifier(code):
+    return re.sub(r'\W+', '_', code).strip('_')
+
+
+def _serial_jit(func):
+    # JIT the function without the parallel loops, as it is
+    # called inside the parallel loop over the batch members
+    if isinstance(func, Dispatcher):
+        if not func.targetoptions.get('parallel', False):
+            return func
+        func = func.py_func
+    return numba.jit(func, **dict(profile.get_numba_profile(), parallel=False))
+
+
+def _get_loop_kernel(lines_of_call, code_scope, serial=False):
+    # Merge the function calls of each time step into the kernel
+    # "loop_kernel(_ts, _dt, _start, _end, *args)", in which the
+    # arguments are evaluated by the codes "calls". The kernel returns
+    # the rotated delay indices of the states in "delays", which are
+    # given by the state code and the indices of the arguments of its
+    # "_delay_in", "_delay_out" and "_delay_len".
+    jit = _serial_jit if serial else tools.jit
+    loop_scope = {}
+    kernel_args, arg2call = [], {}
+    delays, delay_lines = [], []
+    call_lines = []
+
+    def add_arg(code):
+        if code not in arg2call:
+            name = _code_to_identifier(code)
+            while name in kernel_args:
+                name += '_'
+            kernel_args.append(name)
+            arg2call[code] = name
+        return arg2call[code]
+
+    for line in lines_of_call:
+        call = ast.parse(line.strip()).body[0].value
+        if not isinstance(call, ast.Call) or not isinstance(call.func, ast.Attribute):
+            raise ModelUseError(f'Cannot compile the function call "{line}" into the loop.')
+
+        # rotation of the delay indices
+        if call.func.attr == '_update_delay_indices':
+            st = tools.ast2code(call.func.value)
+            din = add_arg(f'{st}._delay_in')
+            dout = add_arg(f'{st}._delay_out')
+            dlen = add_arg(f'{st}._delay_len')
+            delay_lines.append(f'{din} = ({din} + 1) % {dlen}')
+            delay_lines.append(f'{dout} = ({dout} + 1) % {dlen}')
+            delays.append((st, din, dout, dlen))
+            continue
+
+        # the step function
+        func_code = tools.ast2code(call.func)
+        func_name = _code_to_identifier(func_code)
+        loop_scope[func_name] = jit(eval(func_code, code_scope))
+        args = []
+        for arg in call.args:
+            arg_code = tools.ast2code(arg)
+            if arg_code in constants.ARG_KEYWORDS:
+                args.append(arg_code)
+            else:
+                args.append(add_arg(arg_code))
+        call_lines.append(f'{func_name}({", ".join(args)})')
+
+    # the compiled kernel
+    code_lines = [f'def loop_kernel(_ts, _dt, _start, _end, {tools.func_call(kernel_args)}):',
+                  f'  for _i in range(_start, _end):',
+                  f'    _t = _ts[_i]']
+    code_lines.extend([f'    {line}' for line in call_lines + delay_lines])
+    returns = []
+    for _, din, dout, _ in delays:
+        returns.extend([din, dout])
+    code_lines.append(f'  return ({"".join([r + ", " for r in returns])})')
+    kernel_code = '\n'.join(code_lines)
+    tools.exec_code(kernel_code, loop_scope)
+    loop_kernel = jit(loop_scope['loop_kernel'])
+
+    if profile.show_format_code():
+        tools.show_code_str(kernel_code)
+    if profile.show_code_scope():
+        tools.show_code_scope(loop_scope, ['__builtins__', 'loop_kernel'])
+
+    calls = [k for k, _ in sorted(arg2call.items(), key=lambda a: kernel_args.index(a[1]))]
+    delays = [(st, kernel_args.index(din), kernel_args.index(dout), kernel_args.index(dlen))
+              for st, din, dout, dlen in delays]
+    return loop_kernel, calls, delays
+
+
+def get_loop_func(lines_of_call, code_scope):
+    """Get the function which owns the whole time loop.
+
+    The function calls of each time step (generated by ``Ensemble._build()``)
+    are merged into one Numba function, so that the input, update and monitor
+    functions, and the rotation of the delay indices are all done in the
+    compiled code. All the arguments of the function calls are evaluated
+    only once at each call of the loop function.
+
+    Parameters
+    ----------
+    lines_of_call : list, tuple
+        The code lines of the function calls in each time step.
+    code_scope : dict
+        The code scope of the function calls, including the ensembles and their runners.
+
+    Returns
+    -------
+    loop_func : callable
+        The loop function ``loop_func(_ts, _dt, _start, _end)``, which runs
+        the model from the time step ``_start`` to the time step ``_end - 1``.
+    """
+    if not profile.is_jit():
+        raise ModelUseError('The compiled loop is only supported in JIT mode. Please '
+                            'set "brainpy.profile.set(jit=True)".')
+    if not profile.run_on_cpu():
+        raise ModelUseError('The compiled loop is only supported on the CPU device.')
+    loop_kernel, calls, delays = _get_loop_kernel(lines_of_call, code_scope)
+
+    # the python function to call the kernel
+    code_lines = [f'def loop_func(_ts, _dt, _start, _end):',
+                  f'  _res = loop_kernel(_ts, _dt, _start, _end, {tools.func_call(calls)})']
+    for i, (st, _, _, _) in enumerate(delays):
+        code_lines.append(f'  {st}._delay_in = _res[{2 * i}]')
+        code_lines.append(f'  {st}._delay_out = _res[{2 * i + 1}]')
+    func_code = '\n'.join(code_lines)
+    func_scope = dict(code_scope)
+    func_scope['loop_kernel'] = loop_kernel
+    exec(compile(func_code, '', 'exec'), func_scope)
+
+    if profile.show_format_code():
+        tools.show_code_str(func_code)
+
+    return func_scope['loop_func']
+
+
+def _get_root_array(val):
+    while isinstance(val.base, np.ndarray):
+        val = val.base
+    return val
+
+
+def _get_batch_arg(values):
+    # Get the argument of the batched kernel from the values of each batch
+    # member. The value shared by all the members is passed as it is (and
+    # "False" is returned). Otherwise, the members' arrays which are the
+    # views of the same data are passed as one strided view with the leading
+    # batch axis, so that the kernel writes into the data of each member;
+    # the scalars are stacked into an array, and the other values (like the
+    # event buffers) are passed in a typed list.
+    first = values[0]
+    if all([v is first for v in values]):
+        return first, False
+    if isinstance(first, np.ndarray):
+        root = _get_root_array(first)
+        address = [v.__array_interface__['data'][0] for v in values]
+        if all([isinstance(v, np.ndarray) and v.shape == first.shape and v.dtype == first.dtype and
+                v.strides == first.strides and _get_root_array(v) is root for v in values]):
+            step = address[1] - address[0] if len(values) > 1 else 0
+            if step == 0 and all([a == address[0] for a in address]):
+                return first, False
+            if all([address[i] - address[0] == i * step for i in range(len(values))]):
+                return np.lib.stride_tricks.as_strided(first, shape=(len(values),) + first.shape,
+                                                       strides=(step,) + first.strides), True
+    elif np.isscalar(first):
+        if all([v == first for v in values]):
+            return first, False
+        return np.asarray(values), True
+    return List(values), True
+
+
+class BatchFunc(object):
+    """The function to run all the batch members in parallel.
+
+    The function calls of each time step are merged into the loop kernel
+    of one batch member (see ``get_loop_func()``), in which the functions
+    are compiled without the parallel loops. The batched kernel runs the
+    loop kernels of the batch members by the outer ``numba.prange`` over
+    the batch axis. The arguments of each member (its states, parameters,
+    monitors and monitor buffers) are evaluated after switching the
+    ensembles to the member, and passed with the leading batch axis. Each
+    member has its own random state (see ``brainpy.tools.new_rng_states()``),
+    so the random stream of each member is the same as the one in the run
+    of the member alone, no matter which thread runs it.
+
+    Parameters
+    ----------
+    lines_of_call : list, tuple
+        The code lines of the function calls in each time step.
+    code_scope : dict
+        The code scope of the function calls, including the ensembles and their runners.
+    ensembles : list, tuple
+        The batched ensembles.
+    batch : int
+        The batch size.
+    """
+
+    def __init__(self, lines_of_call, code_scope, ensembles, batch):
+        if not profile.is_jit():
+            raise ModelUseError('The batched kernel is only supported in JIT mode.')
+        self.batch = batch
+        self._code_scope = code_scope
+        self._ensembles = ensembles
+        self._loop_kernel, self._calls, self._delays = _get_loop_kernel(lines_of_call, code_scope,
+                                                                        serial=True)
+        self._kernels = {}
+        self._kernel = None
+        self._args = None
+        self._rng_states = None
+        self._ts = None
+
+    def _get_kernel(self, batched):
+        if batched not in self._kernels:
+            args = [f'_a{i}' for i in range(len(batched))]
+            # (the typed list is indexed by a signed index)
+            member_args = [f'{a}[_m]' if b else a for a, b in zip(args, batched)]
+            code_lines = [f'def batch_kernel(_ts, _dt, _start, _end, _rng_states, {tools.func_call(args)}):',
+                          f'  for _b in numba.prange(_rng_states.shape[0]):',
+                          f'    _m = numpy.int64(_b)',
+                          f'    _saved = numpy.empty(_rng_states.shape[1], dtype=numpy.uint8)',
+                          f'    save_rng_state(_saved)',
+                          f'    load_rng_state(_rng_states[_m])',
+                          f'    loop_kernel(_ts, _dt, _start, _end, {tools.func_call(member_args)})',
+                          f'    save_rng_state(_rng_states[_m])',
+                          f'    load_rng_state(_saved)']
+            code = '\n'.join(code_lines)
+            scope = {'numba': numba, 'numpy': np, 'loop_kernel': self._loop_kernel,
+                     'load_rng_state': tools.load_rng_state, 'save_rng_state': tools.save_rng_state}
+            tools.exec_code(code, scope)
+            self._kernels[batched] = numba.jit(scope['batch_kernel'],
+                                               **dict(profile.get_numba_profile(), parallel=True))
+            if profile.show_format_code():
+                tools.show_code_str(code)
+        return self._kernels[batched]
+
+    def prepare(self, ts, seeds=None):
+        """Prepare the run of the batch members.
+
+        Parameters
+        ----------
+        ts : np.ndarray
+            The time points of the run.
+        seeds : list, None
+            The random seed of each batch member. If None, the seeds
+            are drawn from the NumPy random generator.
+        """
+        values = [[] for _ in self._calls]
+        for b in range(self.batch):
+            for ens in self._ensembles:
+                ens._set_batch_member(b)
+            for i, code in enumerate(self._calls):
+                values[i].append(eval(code, self._code_scope))
+        args, batched = [], []
+        for vals in values:
+            arg, is_batched = _get_batch_arg(vals)
+            args.append(arg)
+            batched.append(is_batched)
+        self._kernel = self._get_kernel(tuple(batched))
+        self._args = args
+        if seeds is None:
+            seeds = np.random.randint(0, 2 ** 31 - 1, size=self.batch)
+        self._rng_states = tools.new_rng_states(seeds)
+        self._ts = ts
+
+    def __call__(self, _ts, _dt, _start, _end):
+        if _start >= _end:
+            return
+        self._kernel(_ts, _dt, _start, _end, self._rng_states, *self._args)
+        # rotate the delay indices, which are rotated in the kernel of each member
+        for _, i_in, i_out, i_len in self._delays:
+            self._args[i_in] = (self._args[i_in] + (_end - _start)) % self._args[i_len]
+            self._args[i_out] = (self._args[i_out] + (_end - _start)) % self._args[i_len]
+
+    def step(self, _t, _i, _dt):
+        """Run one time step of the batch members."""
+        self(self._ts, _dt, _i, _i + 1)
+
+    def finish(self):
+        """Set the rotated delay indices to the states of the batch members."""
+        for b in range(self.batch):
+            for ens in self._ensembles:
+                ens._set_batch_member(b)
+            for st, i_in, i_out, _ in self._delays:
+                state = eval(st, self._code_scope)
+                din, dout = self._args[i_in], self._args[i_out]
+                state._delay_in = int(din[b] if isinstance(din, np.ndarray) else din)
+                state._delay_out = int(dout[b] if isinstance(dout, np.ndarray) else dout)
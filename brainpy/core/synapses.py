@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+import inspect
 import re
 import typing
 
@@ -96,10 +97,36 @@ class SynConn(Ensemble):
         The number of the synapses.
     delay : float
         The time of the synaptic delay.
-    monitors : list, tuple, None
-        Variables to monitor.
+    monitors : list, tuple, dict, None
+        Variables to monitor. Each item can be ``key``, ``(key, indices)``,
+        ``(key, options)`` or ``(key, indices, options)``, where ``options``
+        is a dict of ``every`` (record every k time steps), ``window``
+        (only record in the time window ``(t0, t1)``) and ``event`` (record
+        the spikes as the sparse events, see ``brainpy.tools.SpikeEvents``,
+        which are also given by ``mon.key_t`` and ``mon.key_i``). The reducer
+        monitor is specified by ``reduce`` (``mean``, ``sum``, ``var``, ``count``
+        or ``hist`` with the bin edges ``bins``), which reduces over the
+        neurons at each time step (``axis='population'``), or accumulates
+        over the time steps for each neuron (``axis='time'``). The dict form is
+        ``{key: indices}`` or ``{key: {'indices': ..., 'every': ..., 'window': ...}}``.
     name : str, None
         The name of the neuron group.
+    mon_dir : str, None
+        The directory to store the monitors. If provided, the monitors
+        are backed by memory-mapped files in this directory (see
+        ``brainpy.tools.memmap_monitor()``), rather than in-memory arrays.
+    batch : int, None
+        The batch size. Default is the batch size of the pre-synaptic group.
+        All the batch members share the synaptic connections.
+    runtime_pars : tuple, list, None
+        The parameters which can be updated between the runs without
+        recompiling the step functions (see ``Ensemble``).
+    conn_cache : str, None
+        The directory to cache the connectivity. If provided, the connections
+        made by the ``Connector`` and the required synaptic structures are
+        saved in this directory (keyed by the connector type, parameters,
+        seed and the neuron groups), and are loaded by the memory mapping
+        in the subsequent runs (see ``brainpy.connect.Connector.save_cache()``).
     """
 
     def __init__(
@@ -113,6 +140,10 @@ class SynConn(Ensemble):
             monitors: typing.Union[typing.Tuple, typing.List] = None,
             satisfies: typing.Dict = None,
             pars_update: typing.Dict = None,
+            mon_dir: str = None,
+            batch: int = None,
+            runtime_pars: typing.Union[typing.Tuple, typing.List] = None,
+            conn_cache: str = None,
     ):
         # name
         # ----
@@ -153,11 +184,30 @@ class SynConn(Ensemble):
             self.pre = pre_group.ST
             self.post = post_group.ST
 
+            # batch
+            if batch is None:
+                batch = pre_group.batch
+            if not (pre_group.batch == post_group.batch == batch):
+                raise ModelUseError(f'The batch size of "{name}" ({batch}) is not consistent with '
+                                    f'its pre-synaptic group ({pre_group.batch}) and '
+                                    f'post-synaptic group ({post_group.batch}).')
+
             # connections
             # ------------
+            if model.mode == constants.SCALAR_MODE:
+                syn_requires = model.step_args + ['post2syn', 'pre2syn']
+            else:
+                syn_requires = model.step_args
             if isinstance(conn, Connector):
                 self.conn = conn
-                self.conn(pre_group.indices, post_group.indices)
+                self.conn.set_size(num_post=post_group.size, num_pre=pre_group.size)
+                if conn_cache is None or not self.conn.load_cache(
+                        conn_cache, pre_group.indices, post_group.indices, syn_requires):
+                    self.conn(pre_group.indices, post_group.indices)
+                    self.conn.set_requires(syn_requires)
+                    if conn_cache is not None:
+                        self.conn.save_cache(conn_cache, pre_group.indices,
+                                             post_group.indices, syn_requires)
             else:
                 if isinstance(conn, np.ndarray):
                     # check matrix dimension
@@ -183,20 +233,32 @@ class SynConn(Ensemble):
                 self.conn = Connector()
                 self.conn.pre_ids = pre_group.indices.flatten()[pre_ids]
                 self.conn.post_ids = post_group.indices.flatten()[post_ids]
+                self.conn.set_size(num_post=post_group.size, num_pre=pre_group.size)
+                self.conn.set_requires(syn_requires)
 
             # get synaptic structures
-            self.conn.set_size(num_post=post_group.size, num_pre=pre_group.size)
-            if model.mode == constants.SCALAR_MODE:
-                self.conn.set_requires(model.step_args + ['post2syn', 'pre2syn'])
-            else:
-                self.conn.set_requires(model.step_args)
             for k in self.conn.requires:
                 setattr(self, k, getattr(self.conn, k))
             self.pre_ids = self.conn.pre_ids
             self.post_ids = self.conn.post_ids
             num = len(self.pre_ids)
 
+            # the neuron groups maintain the indices of their
+            # spiking neurons for the event-driven synapse steps
+            step_args = set()
+            for func in model.steps:
+                step_args.update(inspect.getfullargspec(func).args)
+            if constants.KW_PRE_SPIKES in step_args:
+                pre_group.runner.require_spike_ids()
+            if constants.KW_POST_SPIKES in step_args:
+                post_group.runner.require_spike_ids()
+
         else:
+            for func in model.steps:
+                for arg in inspect.getfullargspec(func).args:
+                    if arg in constants.SPIKE_KEYWORDS:
+                        raise ModelUseError(f'Using "{arg}" in the synapse model must '
+                                            f'provide "pre_group" and "post_group".')
             if 'num' not in satisfies:
                 raise ModelUseError('"num" must be provided in "satisfies" when '
                                     '"pre_group" and "post_group" are none.')
@@ -215,7 +277,10 @@ class SynConn(Ensemble):
                                       num=num,
                                       monitors=monitors,
                                       cls_type=constants.SYN_CONN_TYPE,
-                                      satisfies=satisfies)
+                                      satisfies=satisfies,
+                                      mon_dir=mon_dir,
+                                      batch=batch,
+                                      runtime_pars=runtime_pars)
 
         # delay
         # -------
@@ -251,7 +316,8 @@ class SynConn(Ensemble):
             size = (self.num,)
         self.ST = self.model.ST.make_copy(size=size,
                                           delay=delay_len,
-                                          delay_vars=self.model._delay_keys)
+                                          delay_vars=self.model._delay_keys,
+                                          batch=batch)
 
 
 def delayed(func):
@@ -18,6 +18,7 @@ __all__ = [
     'gpu_set_vector_val',
     'ListConn',
     'MatConn',
+    'CSRConn',
     'Array',
     'Int',
     'Float',
@@ -51,8 +52,10 @@ def gpu_set_vector_val(data, val, idx):
 
 
 if cuda.is_available():
-    gpu_set_scalar_val = cuda.jit('(float64[:, :], float64, int64)')(gpu_set_scalar_val)
-    gpu_set_vector_val = cuda.jit('(float64[:, :], float64[:], int64)')(gpu_set_vector_val)
+    # lazily compiled, so that they are specialized
+    # for the float type of the state data
+    gpu_set_scalar_val = cuda.jit(gpu_set_scalar_val)
+    gpu_set_vector_val = cuda.jit(gpu_set_vector_val)
 
 
 class ObjState(dict, TypeChecker):
@@ -84,6 +87,9 @@ class ObjState(dict, TypeChecker):
         self._keys = list(variables.keys())
         self._values = list(variables.values())
         self._vars = variables
+        # 4. batch size, and the states of the batch members
+        self._batch = None
+        self._members = {}
 
     def check(self, cls):
         if not isinstance(cls, type(self)):
@@ -123,14 +129,53 @@ class ObjState(dict, TypeChecker):
                     gpu_set_vector_val[num_block, num_thread](gpu_data, val, idx)
                 cuda.synchronize()
             # cpu setattr
-            else:
+            elif self._batch is None:
                 data[idx] = val
+            else:
+                data[:, idx] = val
         elif key in ['_data', '_var2idx', '_idx2var']:
             raise KeyError(f'"{key}" cannot be modified.')
         else:
             raise KeyError(f'"{key}" is not defined in {type(self).__name__}, '
                            f'only finds "{str(self._keys)}".')
 
+    def get_member(self, i):
+        """Get the state of the i-th batch member.
+
+        The data of the member state is the view of the batched data,
+        so it has the same layout as the state without batch.
+
+        Parameters
+        ----------
+        i : int
+            The index of the batch member.
+
+        Returns
+        -------
+        state : ObjState
+            The state of the batch member.
+        """
+        if self._batch is None:
+            raise ValueError(f'{type(self).__name__} is not batched.')
+        if i not in self._members:
+            obj = type(self).__new__(type(self))
+            obj.__dict__.update(self.__dict__)
+            obj._batch = None
+            obj._members = {}
+            data = self.__getitem__('_data')[i]
+            state = {k: data[v] for k, v in self.__getitem__('_var2idx').items() if k in self._vars}
+            state.update(self._get_member_delays(data))
+            state['_data'] = data
+            state['_data_cuda'] = None
+            state['_var2idx'] = self.__getitem__('_var2idx')
+            state['_idx2var'] = self.__getitem__('_idx2var')
+            dict.__init__(obj, state)
+            self._members[i] = obj
+        return self._members[i]
+
+    def _get_member_delays(self, data):
+        return {}
+
     def __str__(self):
         return f'{self.__class__.__name__} ({str(self._keys)})'
 
@@ -141,7 +186,7 @@ class ObjState(dict, TypeChecker):
 class NeuState(ObjState):
     """Neuron State Management. """
 
-    def __call__(self, size):
+    def __call__(self, size, batch=None):
         if isinstance(size, int):
             size = (size,)
         elif isinstance(size, (tuple, list)):
@@ -149,13 +194,17 @@ class NeuState(ObjState):
         else:
             raise ValueError(f'Unknown size type: {type(size)}.')
 
-        data = np.zeros((len(self._vars),) + size, dtype=np.float_)
+        # the batched data has the shape of "(batch, num_var, *size)"
+        self._batch = batch
+        batch_shape = () if batch is None else (batch,)
+        data = np.zeros(batch_shape + (len(self._vars),) + size, dtype=profile.get_float_type())
+        batch_data = data if batch is None else np.moveaxis(data, 1, 0)
         var2idx = dict()
         idx2var = dict()
         state = dict()
         for i, (k, v) in enumerate(self._vars.items()):
-            state[k] = data[i]
-            data[i] = v
+            state[k] = batch_data[i]
+            batch_data[i] = v
             var2idx[k] = i
             idx2var[i] = k
         state['_data'] = data
@@ -167,9 +216,9 @@ class NeuState(ObjState):
 
         return self
 
-    def make_copy(self, size):
+    def make_copy(self, size, batch=None):
         obj = NeuState(self._vars)
-        return obj(size=size)
+        return obj(size=size, batch=batch)
 
 
 @nb.njit([nb.types.UniTuple(nb.int64[:], 2)(nb.int64[:], nb.int64[:], nb.int64[:]),
@@ -189,7 +238,7 @@ class SynState(ObjState):
         self._delay_in = 0
         self._delay_out = 0
 
-    def __call__(self, size, delay=None, delay_vars=()):
+    def __call__(self, size, delay=None, delay_vars=(), batch=None):
         # check size
         if isinstance(size, int):
             size = (size,)
@@ -212,21 +261,25 @@ class SynState(ObjState):
         else:
             raise ValueError(f'Unknown delay_vars type: {type(delay_vars)}.')
 
-        # initialize data
+        # initialize data, the batched data has
+        # the shape of "(batch, length, *size)"
+        self._batch = batch
+        batch_shape = () if batch is None else (batch,)
         length = len(self._vars) + delay * len(delay_vars)
-        data = np.zeros((length,) + size, dtype=np.float_)
+        data = np.zeros(batch_shape + (length,) + size, dtype=profile.get_float_type())
+        batch_data = data if batch is None else np.moveaxis(data, 1, 0)
         var2idx = dict()
         idx2var = dict()
         state = dict()
         for i, (k, v) in enumerate(self._vars.items()):
-            data[i] = v
-            state[k] = data[i]
+            batch_data[i] = v
+            state[k] = batch_data[i]
             var2idx[k] = i
             idx2var[i] = k
         index_offset = len(self._vars)
         for i, v in enumerate(delay_vars):
             var2idx[f'_{v}_offset'] = i * delay + index_offset
-            state[f'_{v}_delay'] = data[i * delay + index_offset: (i + 1) * delay + index_offset]
+            state[f'_{v}_delay'] = batch_data[i * delay + index_offset: (i + 1) * delay + index_offset]
         state['_data'] = data
         state['_data_cuda'] = None
         state['_var2idx'] = var2idx
@@ -236,9 +289,16 @@ class SynState(ObjState):
 
         return self
 
-    def make_copy(self, size, delay=None, delay_vars=()):
+    def make_copy(self, size, delay=None, delay_vars=(), batch=None):
         obj = SynState(self._vars)
-        return obj(size=size, delay=delay, delay_vars=delay_vars)
+        return obj(size=size, delay=delay, delay_vars=delay_vars, batch=batch)
+
+    def _get_member_delays(self, data):
+        delays = {}
+        for k, offset in self.__getitem__('_var2idx').items():
+            if k.startswith('_') and k.endswith('_offset'):
+                delays[f'{k[:-len("_offset")]}_delay'] = data[offset: offset + self._delay_len]
+        return delays
 
     def delay_push(self, g, var):
         if self._delay_len > 0:
@@ -314,6 +374,26 @@ class MatConn(TypeChecker):
         return 'MatConn'
 
 
+class CSRConn(TypeChecker):
+    """Synaptic connection with the CSR type, i.e., the ``(indptr, indices)``
+    arrays (see ``brainpy.connect.CSR``)."""
+
+    def __init__(self, help=''):
+        super(CSRConn, self).__init__(help=help)
+
+    def check(self, cls):
+        if not (isinstance(cls, tuple) and len(cls) == 2):
+            raise TypeMismatchError(f'CSRConn requires a tuple of "(indptr, indices)", but got {type(cls)}.')
+        for arr in cls:
+            if not (isinstance(arr, np.ndarray) and np.ndim(arr) == 1 and
+                    np.issubdtype(arr.dtype, np.integer)):
+                raise TypeMismatchError(f'CSRConn requires "indptr" and "indices" '
+                                        f'to be one-dimensional int arrays.')
+
+    def __str__(self):
+        return 'CSRConn'
+
+
 class SliceConn(TypeChecker):
     def __init__(self, help=''):
         super(SliceConn, self).__init__(help=help)
@@ -339,7 +419,7 @@ class Array(TypeChecker):
             assert self.dim == 1
         else:
             assert len(size) == self.dim
-        return np.zeros(size, dtype=np.float_)
+        return np.zeros(size, dtype=profile.get_float_type())
 
     def check(self, cls):
         if not (isinstance(cls, np.ndarray) and np.ndim(cls) == self.dim):
@@ -4,6 +4,7 @@ import numpy as np
 from numba import njit
 
 from . import profile
+from .tools.monitors import SpikeEvents
 
 __all__ = [
     'cross_correlation',
@@ -47,9 +48,10 @@ def cross_correlation(spikes, bin_size):
 
     Parameters
     ----------
-    spikes : bnp.ndarray
+    spikes : bnp.ndarray, SpikeEvents
         The history of spike states of the neuron group.
         It can be easily get via `StateMonitor(neu, ['spike'])`.
+        It can also be the sparse spike events.
     bin_size : int
         The bin size to normalize spike states.
 
@@ -67,10 +69,14 @@ def cross_correlation(spikes, bin_size):
 
     num_hist, num_neu = spikes.shape
     num_bin = int(np.ceil(num_hist / bin_size))
-    if num_bin * bin_size != num_hist:
-        spikes = np.append(spikes, np.zeros((num_bin * bin_size - num_hist, num_neu)), axis=0)
-    states = spikes.T.reshape((num_neu, num_bin, bin_size))
-    states = (np.sum(states, axis=2) > 0.).astype(np.float_)
+    if isinstance(spikes, SpikeEvents):
+        states = np.zeros((num_neu, num_bin), dtype=np.float_)
+        states[spikes.i, spikes.steps // bin_size] = 1.
+    else:
+        if num_bin * bin_size != num_hist:
+            spikes = np.append(spikes, np.zeros((num_bin * bin_size - num_hist, num_neu)), axis=0)
+        states = spikes.T.reshape((num_neu, num_bin, bin_size))
+        states = (np.sum(states, axis=2) > 0.).astype(np.float_)
     all_k = []
     for i in range(num_neu):
         for j in range(i + 1, num_neu):
@@ -151,8 +157,9 @@ def raster_plot(sp_matrix, times):
 
     Parameters
     ----------
-    sp_matrix : bnp.ndarray
-        The matrix which record spiking activities.
+    sp_matrix : bnp.ndarray, SpikeEvents
+        The matrix which record spiking activities,
+        or the sparse spike events.
     times : bnp.ndarray
         The time steps.
 
@@ -161,6 +168,8 @@ def raster_plot(sp_matrix, times):
     raster_plot : tuple
         Include (neuron index, spike time).
     """
+    if isinstance(sp_matrix, SpikeEvents):
+        return sp_matrix.i, sp_matrix.t
     elements = np.where(sp_matrix > 0.)
     index = elements[1]
     time = times[elements[0]]
@@ -181,8 +190,9 @@ def firing_rate(sp_matrix, width, window='gaussian'):
 
     Parameters
     ----------
-    sp_matrix : bnp.ndarray
-        The spike matrix which record spiking activities.
+    sp_matrix : bnp.ndarray, SpikeEvents
+        The spike matrix which record spiking activities,
+        or the sparse spike events.
     width : int, float
         The width of the ``window`` in millisecond.
     window : str
@@ -204,7 +214,10 @@ def firing_rate(sp_matrix, width, window='gaussian'):
         The population rate in Hz, smoothed with the given window.
     """
     # rate
-    rate = np.sum(sp_matrix, axis=1)
+    if isinstance(sp_matrix, SpikeEvents):
+        rate = np.bincount(sp_matrix.steps, minlength=sp_matrix.shape[0]).astype(np.float_)
+    else:
+        rate = np.sum(sp_matrix, axis=1)
 
     # window
     dt = profile.get_dt()
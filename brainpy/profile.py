@@ -4,6 +4,9 @@
 The setting of the overall framework by ``profile.py`` API.
 """
 
+import os
+
+import numpy as np
 from numba import cuda
 
 __all__ = [
@@ -29,6 +32,17 @@ __all__ = [
 
     'get_num_thread_gpu',
 
+    'set_cache_dir',
+    'get_cache_dir',
+
+    'set_ensemble_threads',
+    'get_ensemble_threads',
+
+    'set_float_type',
+    'get_float_type',
+    'set_int_type',
+    'get_int_type',
+
     'is_jit',
     'is_merge_integrators',
     'is_merge_steps',
@@ -54,6 +68,10 @@ _substitute_equation = False
 _merge_integrators = True
 _merge_steps = False
 _num_thread_gpu = None
+_cache_dir = None
+_ensemble_threads = None
+_float_type = np.float64
+_int_type = np.int64
 
 
 def set(
@@ -67,7 +85,9 @@ def set(
         merge_steps=None,
         substitute=None,
         show_code=None,
-        show_code_scope=None
+        show_code_scope=None,
+        cache_dir=None,
+        ensemble_threads=None,
 ):
     # JIT and device
     if device is not None and jit is None:
@@ -91,13 +111,11 @@ def set(
 
     # default float type
     if float_type is not None:
-        from .backend import _set_default_float
-        _set_default_float(float_type)
+        set_float_type(float_type)
 
     # default int type
     if int_type is not None:
-        from .backend import _set_default_int
-        _set_default_int(int_type)
+        set_int_type(int_type)
 
     # option to merge integral functions
     if merge_integrators is not None:
@@ -131,6 +149,14 @@ def set(
         global _show_code_scope
         _show_code_scope = show_code_scope
 
+    # directory of the code cache
+    if cache_dir is not None:
+        set_cache_dir(cache_dir)
+
+    # number of the threads to run the ensembles concurrently
+    if ensemble_threads is not None:
+        set_ensemble_threads(ensemble_threads)
+
 
 def set_device(jit, device=None):
     """Set the backend and the device to deploy the models.
@@ -375,3 +401,147 @@ def show_format_code():
 
 def get_num_thread_gpu():
     return _num_thread_gpu
+
+
+def set_cache_dir(cache_dir):
+    """Set the directory of the code cache.
+
+    When the code cache is enabled, the generated codes in JIT mode are
+    written into the cache directory (keyed by the code hash), so that
+    Numba can cache the compiled functions in the disk and reload them
+    in the subsequent runs.
+
+    Parameters
+    ----------
+    cache_dir : str, bool
+        The cache directory. If ``False``, disable the code cache.
+    """
+    global _cache_dir
+    if cache_dir is False:
+        _cache_dir = None
+    else:
+        if not isinstance(cache_dir, str):
+            raise ValueError(f'"cache_dir" must be a string, not {type(cache_dir)}.')
+        _cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+
+
+def get_cache_dir():
+    """Get the directory of the code cache.
+
+    Returns
+    -------
+    cache_dir : str, None
+        The cache directory. None means the code cache is disabled.
+    """
+    return _cache_dir
+
+
+def set_ensemble_threads(num):
+    """Set the number of the threads to run the independent ensembles
+    of the network concurrently in each time step.
+
+    The ensembles which do not read or write the same state variables
+    are called on a thread pool (the JIT functions release the GIL by
+    ``nogil=True``). The ensembles of each concurrent stage are split
+    into one task for each thread.
+
+    It is only supported in the python loop of the JIT mode on the CPU
+    device. It is ignored (with a warning) in the compiled loop, in the
+    batched network, on the GPU device, and when the steps are profiled
+    by ``profile_steps``.
+
+    Each concurrent stage submits its tasks to the thread pool in every
+    time step, which costs tens of microseconds. So it is only faster than
+    the sequential calls when each task takes much longer than that in a
+    time step (like the ensembles with ``1e5`` neurons or synapses), and
+    there are enough CPU cores. Measure it on the target machine by
+    ``develop/benchmark/ensemble_threads.py``.
+
+    Parameters
+    ----------
+    num : int, bool
+        The number of the threads. If ``False`` or ``1``, the ensembles
+        are called sequentially.
+    """
+    global _ensemble_threads
+    if num is False or num == 1:
+        _ensemble_threads = None
+    else:
+        if not isinstance(num, int) or isinstance(num, bool) or num < 1:
+            raise ValueError(f'"num" must be a positive int, not {num}.')
+        _ensemble_threads = num
+
+
+def get_ensemble_threads():
+    """Get the number of the threads to run the ensembles concurrently.
+
+    Returns
+    -------
+    num : int, None
+        The number of the threads. None means the ensembles are called sequentially.
+    """
+    return _ensemble_threads
+
+
+def set_float_type(float_type):
+    """Set the default float type.
+
+    The data of the neuron/synapse states (including the delay buffers),
+    the heterogeneous parameters, the input arrays and the monitors are
+    allocated in this type. When it is ``float32``, the float literals in
+    the generated step functions are also cast into ``float32`` in JIT mode,
+    so that Numba does not promote the computation to ``float64``. The
+    integer literals are only cast when they are the operands of the true
+    division (see ``brainpy.tools.cast_float_literals()``). The other integer
+    literals and the integer variables (such as the index ``_i``) mixed with
+    the ``float32`` values are still promoted to ``float64`` by Numba, so
+    write them as float literals (``2. * V`` rather than ``2 * V``) in the
+    ``float32`` models.
+
+    Parameters
+    ----------
+    float_type : str, np.dtype
+        The float type, ``"float32"`` or ``"float64"``.
+    """
+    dtype = np.dtype(float_type)
+    if dtype not in (np.dtype(np.float32), np.dtype(np.float64)):
+        raise ValueError(f'Only support "float32" or "float64" float type, not "{float_type}".')
+    global _float_type
+    _float_type = dtype.type
+
+
+def get_float_type():
+    """Get the default float type.
+
+    Returns
+    -------
+    float_type : type
+        ``np.float32`` or ``np.float64``.
+    """
+    return _float_type
+
+
+def set_int_type(int_type):
+    """Set the default int type, which is used by the neuron indices.
+
+    Parameters
+    ----------
+    int_type : str, np.dtype
+        The int type, ``"int32"`` or ``"int64"``.
+    """
+    dtype = np.dtype(int_type)
+    if dtype not in (np.dtype(np.int32), np.dtype(np.int64)):
+        raise ValueError(f'Only support "int32" or "int64" int type, not "{int_type}".')
+    global _int_type
+    _int_type = dtype.type
+
+
+def get_int_type():
+    """Get the default int type.
+
+    Returns
+    -------
+    int_type : type
+        ``np.int32`` or ``np.int64``.
+    """
+    return _int_type
@@ -1,10 +1,23 @@
 # -*- coding: utf-8 -*-
 
 import multiprocessing
+import secrets
+from copy import deepcopy
+from multiprocessing import resource_tracker
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from . import profile
+from . import tools
+from .core.network import Network
+from .errors import ModelUseError
 
 __all__ = [
     'process_pool',
     'process_pool_lock',
+    'process_sweep',
+    'SweepResult',
 ]
 
 
@@ -90,3 +103,248 @@ def process_pool_lock(func, all_net_params, nb_process):
     pool.close()
     pool.join()
     return results
+
+
+# the network (and its initial state) built in each worker process
+_sweep_worker = {}
+
+# the settings of "brainpy.profile" which are passed to the worker
+# processes, because the spawned processes do not inherit them
+_PROFILE_KEYS = ['_jit', '_backend', '_device', '_dt', '_method', '_numba_setting',
+                 '_show_format_code', '_show_code_scope', '_substitute_equation',
+                 '_merge_integrators', '_merge_steps', '_num_thread_gpu', '_cache_dir',
+                 '_ensemble_threads', '_float_type', '_int_type']
+
+
+class SweepResult(object):
+    """The result of one job in ``process_sweep()``.
+
+    The monitors are the views of a shared memory block, which is written
+    by the worker process. Call ``close()`` (or use the result as a context
+    manager) to release the shared memory when the monitors are no longer
+    used (copy them if they are needed after that). The shared memory of
+    the result which is not closed is released when the result is deleted.
+
+    Parameters
+    ----------
+    index : int
+        The index of the job.
+    params : dict
+        The parameter deltas of the job.
+    mon : dict
+        The monitors of each object, with the format of ``{name: DictPlus}``.
+    shm : SharedMemory, None
+        The shared memory block.
+    """
+
+    def __init__(self, index, params, mon, shm=None):
+        self.index = index
+        self.params = params
+        self.mon = mon
+        self._shm = shm
+
+    def close(self):
+        """Release the shared memory of the monitors."""
+        if self._shm is not None:
+            shm, self._shm = self._shm, None
+            self.mon = {}
+            # (the block is unlinked first, so that it is released
+            # even if the views of the monitors are still referenced)
+            shm.unlink()
+            shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except BufferError:
+            pass
+
+    def __repr__(self):
+        return f'{type(self).__name__}(index={self.index}, params={self.params})'
+
+
+def _set_sweep_value(net, key, value):
+    # set the value of "name.ST.key" or "name.pars.key", and return
+    # whether the functions of the network should be rebuilt
+    splits = key.split('.')
+    if len(splits) != 3 or splits[1] not in ['ST', 'pars']:
+        raise ModelUseError(f'The parameter key must be "name.ST.key" or "name.pars.key", not "{key}".')
+    obj = getattr(net, splits[0])
+    if splits[1] == 'ST':
+        obj.ST[splits[2]] = value
+        return False
+    # the runtime parameter is updated in place,
+    # unless its size is changed
+    runtime = obj.pars.runtime.get(splits[2], None)
+    obj.pars.heters.pop(splits[2], None)
+    obj.pars[splits[2]] = value
+    return runtime is None or obj.pars.runtime[splits[2]] is not runtime
+
+
+def _sweep_init(settings, build_func, duration, inputs, loop):
+    # the error is raised in the jobs, because the
+    # pool restarts the worker which fails to initialize
+    try:
+        for key, value in settings.items():
+            setattr(profile, key, deepcopy(value))
+        _sweep_build(build_func, duration, inputs, loop)
+    except Exception as e:
+        _sweep_worker['error'] = e
+
+
+def _sweep_build(build_func, duration, inputs, loop):
+    # build the network, save its initial state,
+    # and compile the functions
+    net = build_func()
+    if not isinstance(net, Network):
+        raise ModelUseError(f'"build_func" must return an instance of Network, not {type(net)}.')
+    net.mode = 'repeat'
+    _sweep_worker['net'] = net
+    _sweep_worker['states'] = {obj.name: deepcopy(obj._get_checkpoint()) for obj in net._all_objects}
+    _sweep_worker['pars'] = {obj.name: dict(obj.pars.updates) for obj in net._all_objects}
+    _sweep_worker['run'] = (duration, inputs, loop)
+    net._warm_up(duration, inputs, loop)
+
+
+def _unlink_shared_memory(name):
+    # unlink the shared memory block, if it exists
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+def _sweep_job(job):
+    index, params, seed, shm_name = job
+    if 'error' in _sweep_worker:
+        raise _sweep_worker['error']
+    net = _sweep_worker['net']
+    duration, inputs, loop = _sweep_worker['run']
+
+    # restore the initial state, and the parameters
+    # changed by the last job
+    for obj in net._all_objects:
+        obj._set_checkpoint(*_sweep_worker['states'][obj.name])
+    rebuild = False
+    for key in _sweep_worker.pop('changed', []):
+        name, _, par = key.split('.')
+        value = _sweep_worker['pars'][name].get(par, getattr(net, name).pars.origins[par])
+        rebuild |= _set_sweep_value(net, key, value)
+
+    # apply the parameter deltas
+    for key, value in params.items():
+        rebuild |= _set_sweep_value(net, key, value)
+    _sweep_worker['changed'] = [key for key in params.keys() if key.split('.')[1] == 'pars']
+    if rebuild:
+        net._step_func = None
+    if seed is not None:
+        tools.set_rng_seed(seed)
+    net.run(duration, inputs=inputs, loop=loop)
+
+    # write the monitors into the shared memory
+    layout = []
+    nbytes = 0
+    for obj in net._all_objects:
+        for key, val in obj.mon.items():
+            if isinstance(val, np.ndarray):
+                layout.append((obj.name, key, nbytes, val.shape, val.dtype.str))
+                nbytes += int(np.ceil(val.nbytes / 8) * 8)
+    # (the block is unlinked by the main process, and it is registered in
+    # the resource tracker of the main process, which is shared by the
+    # workers, so the block is kept after the worker exits)
+    shm = shared_memory.SharedMemory(name=shm_name, create=True, size=max(nbytes, 1))
+    for name, key, offset, shape, dtype in layout:
+        val = getattr(net, name).mon[key]
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)[...] = val
+    shm.close()
+    return index, layout
+
+
+def process_sweep(build_func, all_params, nb_process, duration, inputs=(), loop='python', seed=None):
+    """Run the parameter sweep of a network in multi-processes.
+
+    Different from ``process_pool()``, the network is built by ``build_func``
+    only once in each worker process, and its functions are compiled ahead of
+    the jobs. Each job restores the initial state of the network, applies the
+    parameter deltas, and reuses the compiled functions in ``"repeat"`` mode
+    (the changed parameters in ``pars`` trigger a rebuild of the functions,
+    but not of the connectivity, unless they are the ``runtime_pars`` of the
+    object). The monitors are written into the shared
+    memory, rather than pickled back to the main process.
+
+    The worker processes are spawned (rather than forked), because forking
+    the process in which the threading layer of the parallel kernels has
+    started can hang the worker. The settings of ``brainpy.profile`` are
+    passed to the workers.
+
+    Parameters
+    ----------
+    build_func : callable
+        The function without arguments, which returns the ``Network``.
+        It is pickled to the spawned workers, so it must be picklable,
+        like a function defined at the top level of an importable module.
+    all_params : list, tuple
+        The parameter deltas of each job. Each item is a dict with the keys
+        of ``"name.ST.key"`` (the initial state) or ``"name.pars.key"``
+        (the parameter), where ``name`` is the object name in the network.
+    nb_process : int
+        The number of the processes.
+    duration : int, float, tuple, list
+        The amount of simulation time to run for.
+    inputs : list, tuple
+        The inputs of the network (see ``Network.run()``). The input
+        targets are given by the object names, because the objects
+        are built in the worker processes.
+    loop : str
+        The way to run the time loop, ``'python'`` or ``'compiled'``.
+    seed : int, None
+        The random seed. The job ``i`` is seeded by ``seed + i``.
+
+    Returns
+    -------
+    results : generator
+        The iterator of the ``SweepResult`` of the finished jobs,
+        in the order of completion. If the iteration is stopped early,
+        the remaining jobs are terminated, and their shared memory
+        blocks are released.
+    """
+    # the shared memory blocks are named by the main process,
+    # so that the blocks of the results which are not
+    # received by the main process can be unlinked
+    prefix = f'bp_{secrets.token_hex(4)}_'
+    jobs = []
+    for i, params in enumerate(all_params):
+        if not isinstance(params, dict):
+            raise ValueError('Unknown parameter type: ', type(params))
+        jobs.append((i, params, None if seed is None else seed + i, f'{prefix}{i}'))
+    # start the resource tracker before the workers, which share it
+    resource_tracker.ensure_running()
+    settings = {key: getattr(profile, key) for key in _PROFILE_KEYS}
+    pool = multiprocessing.get_context('spawn').Pool(processes=nb_process,
+                                                     initializer=_sweep_init,
+                                                     initargs=(settings, build_func, duration, inputs, loop))
+    received = set()
+    try:
+        for index, layout in pool.imap_unordered(_sweep_job, jobs):
+            shm = shared_memory.SharedMemory(name=jobs[index][3])
+            received.add(index)
+            mon = {}
+            for name, key, offset, shape, dtype in layout:
+                if name not in mon:
+                    mon[name] = tools.DictPlus()
+                mon[name][key] = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            yield SweepResult(index=index, params=jobs[index][1], mon=mon, shm=shm)
+    finally:
+        pool.terminate()
+        pool.join()
+        for job in jobs:
+            if job[0] not in received:
+                _unlink_shared_memory(job[3])
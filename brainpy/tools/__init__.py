@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 
 from .ast2code import *
+from .caches import *
+from .checkpoints import *
 from .codes import *
 from .dicts import *
 from .functions import *
 from .logger import *
+from .monitors import *
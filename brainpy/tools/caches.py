@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import inspect
+import os
+import sys
+import types
+
+import numba as nb
+import numpy as np
+from numba.core.dispatcher import Dispatcher
+
+from .. import profile
+
+__all__ = [
+    'exec_code',
+    'get_code_hash',
+    'is_cached_func',
+    'clear_cache',
+]
+
+_CACHE_MODULE_PREFIX = 'brainpy_code_cache_'
+
+
+def _hash_code_object(code, hasher):
+    hasher.update(code.co_code)
+    hasher.update(repr(code.co_names).encode())
+    hasher.update(repr(code.co_varnames).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _hash_code_object(const, hasher)
+        else:
+            hasher.update(repr(const).encode())
+
+
+def _get_global_names(code):
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names.update(_get_global_names(const))
+    return names
+
+
+def _hash_value(val, hasher, memo):
+    if id(val) in memo:
+        hasher.update(memo[id(val)].encode())
+        return
+    memo[id(val)] = f'<ref {len(memo)}>'
+
+    if val is None or isinstance(val, (bool, int, float, complex, str, bytes)):
+        hasher.update(f'{type(val).__name__}:{repr(val)}'.encode())
+    elif isinstance(val, np.ndarray):
+        hasher.update(f'ndarray:{val.dtype.str}:{val.shape}'.encode())
+        hasher.update(np.ascontiguousarray(val).tobytes())
+    elif isinstance(val, np.generic):
+        hasher.update(f'{val.dtype.str}:{repr(val)}'.encode())
+    elif isinstance(val, (tuple, list)):
+        hasher.update(f'{type(val).__name__}:{len(val)}'.encode())
+        for v in val:
+            _hash_value(v, hasher, memo)
+    elif isinstance(val, (dict, nb.typed.Dict)):
+        hasher.update(f'{type(val).__name__}:{len(val)}'.encode())
+        for k in sorted(val.keys(), key=str):
+            hasher.update(str(k).encode())
+            _hash_value(val[k], hasher, memo)
+    elif isinstance(val, nb.typed.List):
+        hasher.update(f'List:{len(val)}'.encode())
+        for v in val:
+            _hash_value(v, hasher, memo)
+    elif isinstance(val, types.ModuleType):
+        hasher.update(f'module:{val.__name__}'.encode())
+    elif isinstance(val, Dispatcher):
+        hasher.update(f'dispatcher:{sorted(val.targetoptions.items())}'.encode())
+        _hash_value(val.py_func, hasher, memo)
+    elif isinstance(val, types.FunctionType):
+        hasher.update(f'function:{val.__module__}.{val.__qualname__}'.encode())
+        _hash_code_object(val.__code__, hasher)
+        _hash_value(val.__defaults__, hasher, memo)
+        closure_vars = inspect.getclosurevars(val)
+        _hash_value(dict(closure_vars.nonlocals), hasher, memo)
+        _hash_value(dict(closure_vars.globals), hasher, memo)
+    elif callable(val) and hasattr(val, '__name__'):
+        # builtin functions, NumPy ufuncs, etc.
+        hasher.update(f'{type(val).__name__}:{getattr(val, "__module__", "")}.{val.__name__}'.encode())
+    else:
+        # the contents of an arbitrary object can not be hashed reliably,
+        # and hashing its type only would make different values collide
+        raise TypeError(f'Can not hash the value of type "{type(val).__module__}.'
+                        f'{type(val).__name__}".')
+
+
+def get_code_hash(code, code_scope):
+    """Get the hash of the generated code.
+
+    The hash is computed from the code string, the values of the scope
+    variables used in the code, the Numba compilation options, and the
+    versions of Python, NumPy and Numba.
+
+    Parameters
+    ----------
+    code : str
+        The code string.
+    code_scope : dict
+        The code scope.
+
+    Returns
+    -------
+    code_hash : str
+        The hex digest of the hash.
+
+    Raises
+    ------
+    TypeError
+        If a scope variable used in the code can not be hashed.
+    """
+    hasher = hashlib.sha1()
+    hasher.update(code.encode())
+    hasher.update(f'python {sys.version}, numpy {np.__version__}, numba {nb.__version__}'.encode())
+    hasher.update(repr(sorted(profile.get_numba_profile().items())).encode())
+    memo = {}
+    names = _get_global_names(compile(code, '', 'exec'))
+    for name in sorted(names):
+        if name in code_scope:
+            hasher.update(name.encode())
+            _hash_value(code_scope[name], hasher, memo)
+    return hasher.hexdigest()
+
+
+def exec_code(code, code_scope):
+    """Execute the generated code in the given code scope.
+
+    If the code cache is enabled by ``brainpy.profile.set(cache_dir=...)``,
+    the code is written into the cache directory with a file name keyed
+    by the code hash (see ``get_code_hash()``), and executed in a module
+    which is backed by this file. Therefore, the JIT functions defined
+    in the code can be cached by Numba in the disk, and be reloaded in
+    the subsequent runs.
+
+    Parameters
+    ----------
+    code : str
+        The code string.
+    code_scope : dict
+        The code scope. The variables defined in the code will be
+        added into this scope.
+    """
+    cache_dir = profile.get_cache_dir()
+    code_hash = None
+    if cache_dir is not None and profile.is_jit() and profile.run_on_cpu():
+        try:
+            code_hash = get_code_hash(code, code_scope)
+        except TypeError:
+            pass
+    if code_hash is None:
+        exec(compile(code, '', 'exec'), code_scope)
+        return
+
+    # write the code file
+    module_name = f'{_CACHE_MODULE_PREFIX}{code_hash}'
+    filename = os.path.join(cache_dir, f'{module_name}.py')
+    if not os.path.exists(filename):
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_filename = f'{filename}.{os.getpid()}.tmp'
+        with open(tmp_filename, 'w') as f:
+            f.write(code)
+        os.replace(tmp_filename, filename)
+
+    # execute the code as a module backed by the code file, so that Numba
+    # can locate and reload the cache. Numba imports the module by name
+    # when it loads a cached function, therefore an empty module is kept
+    # registered for each code file, while the code scope (and the data in
+    # it) only lives in the globals of the defined functions.
+    if module_name not in sys.modules:
+        module = types.ModuleType(module_name)
+        module.__file__ = filename
+        sys.modules[module_name] = module
+    module_scope = dict(code_scope)
+    module_scope.update(__name__=module_name, __file__=filename)
+    exec(compile(code, filename, 'exec'), module_scope)
+    for k, v in module_scope.items():
+        if not (k.startswith('__') and k.endswith('__')):
+            code_scope[k] = v
+
+
+def is_cached_func(func):
+    """Check whether the function is defined in the code cache.
+
+    Parameters
+    ----------
+    func : callable
+        The function.
+
+    Returns
+    -------
+    cached : bool
+        True or False.
+    """
+    if not isinstance(func, types.FunctionType):
+        return False
+    cache_dir = profile.get_cache_dir()
+    if cache_dir is None:
+        return False
+    return os.path.dirname(os.path.abspath(func.__code__.co_filename)) == os.path.abspath(cache_dir)
+
+
+def clear_cache(cache_dir=None):
+    """Clear the code files and the Numba cache files in the cache directory.
+
+    Parameters
+    ----------
+    cache_dir : str, None
+        The cache directory. Default is the directory set by
+        ``brainpy.profile.set(cache_dir=...)``.
+    """
+    cache_dir = profile.get_cache_dir() if cache_dir is None else cache_dir
+    if cache_dir is None or not os.path.isdir(cache_dir):
+        return
+    for path in [cache_dir, os.path.join(cache_dir, '__pycache__')]:
+        if not os.path.isdir(path):
+            continue
+        for filename in os.listdir(path):
+            if filename.startswith(_CACHE_MODULE_PREFIX):
+                os.remove(os.path.join(path, filename))
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+
+import numba as nb
+import numpy as np
+from numba import types
+from numba.core import cgutils
+from numba.cpython import randomimpl
+from numba.extending import intrinsic
+
+__all__ = [
+    'save_checkpoint_files',
+    'load_checkpoint_files',
+    'get_rng_state',
+    'set_rng_state',
+    'set_rng_seed',
+    'new_rng_states',
+    'load_rng_state',
+    'save_rng_state',
+]
+
+_META_FILENAME = 'checkpoint.json'
+
+
+def _write_rows(filename, array, start, end):
+    # write the rows "array[start: end]" into the raw data file,
+    # the rows before "start" are kept in the file
+    row_size = int(np.prod(array.shape[1:])) * array.dtype.itemsize
+    with open(filename, 'r+b' if start > 0 else 'wb') as f:
+        f.truncate(start * row_size)
+        f.seek(start * row_size)
+        f.write(np.ascontiguousarray(array[start: end]).tobytes())
+
+
+def _load_rows(filename, dtype, shape, offset=0, mmap_mode='r'):
+    if int(np.prod(shape)) == 0:
+        return np.zeros(shape, dtype=dtype)
+    data = np.memmap(filename, dtype=dtype, mode='r' if mmap_mode is None else mmap_mode,
+                     offset=offset, shape=tuple(shape))
+    return np.array(data) if mmap_mode is None else data
+
+
+def save_checkpoint_files(path, arrays, meta, rows=None):
+    """Save the checkpoint into the directory.
+
+    Each array is saved as a ``.npy`` file ``"{path}/state.{n}/{group}/{key}.npy"``,
+    so that it can be memory-mapped back by ``load_checkpoint_files()``.
+    The arrays growing along the first axis (like the monitors) are given
+    in ``rows``. Only their new rows since the last checkpoint are appended
+    into the raw data files ``"{path}/rows.{n}/{group}/{key}.dat"``, and the
+    memory-mapped arrays (like the monitors with ``mon_dir``) are flushed
+    and referenced by their files, rather than copied. The metadata (and
+    the file layout) is saved in ``"{path}/checkpoint.json"``, which is
+    replaced at last, so that an interrupted saving does not corrupt the
+    last checkpoint.
+
+    Parameters
+    ----------
+    path : str
+        The checkpoint directory.
+    arrays : dict
+        The arrays of each group, with the format of ``{group: {key: array}}``.
+    meta : dict
+        The JSON serializable metadata.
+    rows : dict, None
+        The growing arrays of each group, with the format of
+        ``{group: {key: (array, start, end)}}``. The rows ``array[:end]``
+        are saved, in which the rows before ``start`` have been saved in
+        the last checkpoint of the same directory.
+    """
+    path = os.path.abspath(path)
+    rows = dict() if rows is None else rows
+    meta_filename = os.path.join(path, _META_FILENAME)
+    last_files = {}
+    if os.path.exists(meta_filename):
+        with open(meta_filename) as f:
+            last_files = json.load(f).get('_files', {})
+    count = last_files.get('count', 0) + 1
+
+    # the arrays of the dynamical states
+    state_dir = f'state.{count}'
+    for group, group_arrays in arrays.items():
+        os.makedirs(os.path.join(path, state_dir, group), exist_ok=True)
+        for key, val in group_arrays.items():
+            np.save(os.path.join(path, state_dir, group, f'{key}.npy'), np.asarray(val))
+    os.makedirs(os.path.join(path, state_dir), exist_ok=True)
+
+    # the growing arrays, which are appended
+    # into the data files of the last checkpoint
+    append = 'rows' in last_files and any([start > 0 for group_rows in rows.values()
+                                           for _, start, _ in group_rows.values()])
+    rows_dir = last_files['rows'] if append else f'rows.{count}'
+    row_files = {}
+    for group, group_rows in rows.items():
+        os.makedirs(os.path.join(path, rows_dir, group), exist_ok=True)
+        row_files[group] = {}
+        for key, (val, start, end) in group_rows.items():
+            shape = [end] + list(val.shape[1:])
+            if isinstance(val, np.memmap):
+                val.flush()
+                row_files[group][key] = {'filename': os.path.abspath(val.filename), 'offset': val.offset,
+                                         'dtype': val.dtype.str, 'shape': shape, 'external': True}
+            else:
+                _write_rows(os.path.join(path, rows_dir, group, f'{key}.dat'),
+                            val, start if append else 0, end)
+                row_files[group][key] = {'filename': os.path.join(rows_dir, group, f'{key}.dat'),
+                                         'offset': 0, 'dtype': val.dtype.str, 'shape': shape,
+                                         'external': False}
+
+    # replace the last checkpoint
+    meta = dict(meta, _files={'count': count, 'state': state_dir, 'rows': rows_dir, 'row_files': row_files})
+    tmp_filename = f'{meta_filename}.{os.getpid()}.tmp'
+    with open(tmp_filename, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_filename, meta_filename)
+    for filename in os.listdir(path):
+        if filename.startswith(('state.', 'rows.')) and filename not in (state_dir, rows_dir):
+            shutil.rmtree(os.path.join(path, filename))
+
+
+def load_checkpoint_files(path, mmap_mode='r'):
+    """Load the checkpoint saved by ``save_checkpoint_files()``.
+
+    Parameters
+    ----------
+    path : str
+        The checkpoint directory.
+    mmap_mode : str, None
+        The memory-map mode of ``np.load()``. If None, the arrays are
+        loaded into the memory.
+
+    Returns
+    -------
+    arrays : dict
+        The arrays of each group (including the growing arrays),
+        with the format of ``{group: {key: array}}``. The referenced
+        memory-mapped arrays are loaded into the memory, because their
+        files may be overwritten by the resumed run.
+    meta : dict
+        The metadata. The file layout is given in ``meta['_files']``.
+    """
+    meta_filename = os.path.join(path, _META_FILENAME)
+    if not os.path.exists(meta_filename):
+        raise FileNotFoundError(f'Cannot find the checkpoint metadata file "{meta_filename}".')
+    with open(meta_filename) as f:
+        meta = json.load(f)
+    files = meta['_files']
+    arrays = {}
+    state_path = os.path.join(path, files['state'])
+    for group in os.listdir(state_path):
+        group_path = os.path.join(state_path, group)
+        if not os.path.isdir(group_path):
+            continue
+        arrays[group] = {}
+        for filename in os.listdir(group_path):
+            if filename.endswith('.npy'):
+                arrays[group][filename[:-4]] = np.load(os.path.join(group_path, filename),
+                                                       mmap_mode=mmap_mode)
+    for group, group_files in files['row_files'].items():
+        arrays.setdefault(group, {})
+        for key, info in group_files.items():
+            arrays[group][key] = _load_rows(os.path.join(path, info['filename']), np.dtype(info['dtype']),
+                                            info['shape'], info['offset'],
+                                            None if info['external'] else mmap_mode)
+    return arrays, meta
+
+
+def _numba_rng_state(state=None):
+    # Get (or set) the state of the random generator used in the Numba
+    # JIT functions. Numba does not provide the public API to access
+    # the state, so the private "_helperlib" module is used here.
+    try:
+        from numba import _helperlib
+        get_state, set_state = _helperlib.rnd_get_state, _helperlib.rnd_set_state
+        state_ptr = _helperlib.rnd_get_np_state_ptr()
+    except (ImportError, AttributeError) as e:
+        raise RuntimeError(f'Cannot access the random state of Numba {nb.__version__}, which '
+                           f'is required to save or restore the random state.') from e
+    if state is None:
+        index, keys = get_state(state_ptr)
+        return [int(index), list(keys)]
+    index, keys = state
+    set_state(state_ptr, (index, list(keys)))
+
+
+def get_rng_state():
+    """Get the states of the NumPy random generator, and the random
+    generator used in the Numba JIT functions.
+
+    Returns
+    -------
+    state : dict
+        The JSON serializable random states.
+    """
+    name, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+    return {'numpy': [name, keys.tolist(), int(pos), int(has_gauss), float(cached_gaussian)],
+            'numba': _numba_rng_state()}
+
+
+def set_rng_state(state):
+    """Set the random states given by ``get_rng_state()``.
+
+    Parameters
+    ----------
+    state : dict
+        The random states.
+    """
+    name, keys, pos, has_gauss, cached_gaussian = state['numpy']
+    np.random.set_state((name, np.asarray(keys, dtype=np.uint32), pos, has_gauss, cached_gaussian))
+    _numba_rng_state(state['numba'])
+
+
+@nb.njit
+def _numba_seed(seed):
+    np.random.seed(seed)
+
+
+def set_rng_seed(seed):
+    """Seed the NumPy random generator, and the random generator
+    used in the Numba JIT functions.
+
+    Parameters
+    ----------
+    seed : int
+        The random seed.
+    """
+    np.random.seed(seed)
+    _numba_seed(seed)
+
+
+@intrinsic
+def _rng_state_size(typingctx):
+    # the size of the random state of the NumPy API in Numba
+    def codegen(context, builder, sig, args):
+        return context.get_constant(types.intp, context.get_abi_sizeof(randomimpl.rnd_state_t))
+
+    return types.intp(), codegen
+
+
+@intrinsic
+def _copy_rng_state(typingctx, state, to_thread):
+    # copy the uint8 array "state" into the random state of the
+    # current thread, or copy the random state into the array
+    def codegen(context, builder, sig, args):
+        data = context.make_array(sig.args[0])(context, builder, args[0]).data
+        data = builder.bitcast(data, cgutils.voidptr_t)
+        ptr = builder.bitcast(randomimpl.get_np_state_ptr(context, builder), cgutils.voidptr_t)
+        size = context.get_constant(types.intp, context.get_abi_sizeof(randomimpl.rnd_state_t))
+        with builder.if_else(args[1]) as (then, otherwise):
+            with then:
+                cgutils.raw_memcpy(builder, ptr, data, size, 1)
+            with otherwise:
+                cgutils.raw_memcpy(builder, data, ptr, size, 1)
+        return context.get_dummy_value()
+
+    return types.none(state, types.boolean), codegen
+
+
+@nb.njit
+def load_rng_state(state):
+    """Load the random state into the random generator of the current
+    thread, which is used by ``np.random`` in the Numba JIT functions.
+
+    Each thread has its own random generator in the parallel loops, so
+    the task of a ``numba.prange`` iteration can run with its own random
+    stream by loading its state at the start, and saving it back by
+    ``save_rng_state()`` at the end.
+
+    Parameters
+    ----------
+    state : np.ndarray
+        The contiguous uint8 array of the random state, given by
+        ``new_rng_states()`` or ``save_rng_state()``.
+    """
+    _copy_rng_state(state, True)
+
+
+@nb.njit
+def save_rng_state(state):
+    """Save the random state of the random generator of the current
+    thread into the array. See ``load_rng_state()``.
+
+    Parameters
+    ----------
+    state : np.ndarray
+        The contiguous uint8 array of the random state.
+    """
+    _copy_rng_state(state, False)
+
+
+@nb.njit
+def _seed_rng_states(seeds, states):
+    # seed each random state, and keep the random state of this thread
+    saved = np.empty(states.shape[1], dtype=np.uint8)
+    save_rng_state(saved)
+    for i in range(seeds.shape[0]):
+        np.random.seed(seeds[i])
+        save_rng_state(states[i])
+    load_rng_state(saved)
+
+
+@nb.njit
+def _get_rng_state_size():
+    return _rng_state_size()
+
+
+def new_rng_states(seeds):
+    """Create the random states seeded by the given seeds.
+
+    The random stream of each state is the same as the stream of
+    ``np.random`` in the Numba JIT functions after ``set_rng_seed()``.
+
+    Parameters
+    ----------
+    seeds : list, tuple, np.ndarray
+        The random seeds.
+
+    Returns
+    -------
+    states : np.ndarray
+        The uint8 array with the shape of ``(len(seeds), state_size)``.
+        See ``load_rng_state()``.
+    """
+    seeds = np.asarray(seeds, dtype=np.int64)
+    states = np.zeros((len(seeds), _get_rng_state_size()), dtype=np.uint8)
+    _seed_rng_states(seeds, states)
+    return states
@@ -2,7 +2,9 @@
 
 import ast
 import inspect
+import io
 import re
+import tokenize
 from types import LambdaType
 
 from .ast2code import ast2code
@@ -36,6 +38,7 @@ __all__ = [
     'indent',
     'deindent',
     'word_replace',
+    'cast_float_literals',
 
     # others
     'is_lambda_function',
@@ -718,6 +721,68 @@ def word_replace(expr, substitutions):
     return expr
 
 
+def cast_float_literals(code, float_type='float32'):
+    """Wrap the float literals in the code with the float type constructor.
+
+    Numba types the float literals as ``float64``, which promotes the
+    ``float32`` computation into ``float64``. After the wrapping, the
+    literals are typed as ``float_type`` (and folded as constants).
+    The integer literals which are the operands of the true division
+    (like ``1 / tau``) are also wrapped, because the division always
+    gives a float. Other integer literals are kept, as they may be
+    used as indices (for example, ``j = i + 1``), so the integer
+    arithmetic mixed with the float computation (like ``2 * V``) is
+    still promoted to ``float64``. The code is required to be
+    tokenizable; otherwise, it is returned unchanged.
+
+    Examples
+    --------
+
+    >>> print(cast_float_literals('V = V + (-V + 1.5) / tau * 0.1 + ST[2] / 2'))
+    V = V + (-V + numpy.float32(1.5)) / tau * numpy.float32(0.1) + ST[2] / numpy.float32(2)
+
+    Parameters
+    ----------
+    code : str
+        The code string.
+    float_type : str
+        The name of the NumPy float type.
+
+    Returns
+    -------
+    code : str
+        The new code string.
+    """
+    lines = code.split('\n')
+    positions = []
+    try:
+        tokens = [tok for tok in tokenize.generate_tokens(io.StringIO(code).readline)
+                  if tok.type not in (tokenize.NL, tokenize.COMMENT)]
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return code
+    for i, tok in enumerate(tokens):
+        if tok.type != tokenize.NUMBER or tok.start[0] != tok.end[0]:
+            continue
+        literal = tok.string.lower()
+        if literal.startswith(('0x', '0o', '0b')) or literal.endswith('j'):
+            continue
+        if '.' not in literal and 'e' not in literal:
+            # an integer literal: only cast it when it is divided or is the divisor
+            j = i - 1
+            while j > 0 and tokens[j].string in ('+', '-') and \
+                    (tokens[j - 1].type == tokenize.OP and tokens[j - 1].string not in (')', ']')):
+                j -= 1  # skip the unary signs
+            left = tokens[j].string if j >= 0 and j < i else ''
+            right = tokens[i + 1].string if i + 1 < len(tokens) else ''
+            if left not in ('/', '/=') and right != '/':
+                continue
+        positions.append((tok.start[0] - 1, tok.start[1], tok.end[1]))
+    for row, start, end in reversed(positions):
+        line = lines[row]
+        lines[row] = f'{line[:start]}numpy.{float_type}({line[start:end]}){line[end:]}'
+    return '\n'.join(lines)
+
+
 def func_call(args):
     if isinstance(args, set):
         args = sorted(list(args))
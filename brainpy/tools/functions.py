@@ -9,6 +9,7 @@ import numba as nb
 from numba import cuda
 from numba.core.dispatcher import Dispatcher
 
+from .caches import is_cached_func
 from .codes import deindent
 from .codes import get_func_source
 from .. import backend
@@ -60,7 +61,9 @@ def jit(func=None):
     if not isinstance(func, Dispatcher):
         if not callable(func):
             raise ValueError(f'"func" must be a callable function, but got "{type(func)}".')
-        op = profile.get_numba_profile()
+        op = dict(profile.get_numba_profile())
+        if is_cached_func(func):
+            op['cache'] = True
         func = nb.jit(func, **op)
     return func
 
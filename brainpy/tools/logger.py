@@ -8,6 +8,7 @@ from ..integration.sympy_tools import CONSTANT_MAPPING
 __all__ = [
     'show_code_scope',
     'show_code_str',
+    'show_step_profile',
 ]
 
 
@@ -30,3 +31,14 @@ def show_code_scope(code_scope, ignores=()):
     print()
 
 
+
+
+def show_step_profile(rows):
+    total = sum([row['total'] for row in rows])
+    print(f'{"ensemble":<20} {"step":<20} {"calls":>10} {"total (s)":>12} '
+          f'{"mean (us)":>12} {"percent":>8}')
+    for row in rows:
+        percent = row['total'] / total * 100 if total > 0 else 0.
+        print(f'{row["ensemble"]:<20} {row["step"]:<20} {row["calls"]:>10d} {row["total"]:>12.6f} '
+              f'{row["mean"] * 1e6:>12.3f} {percent:>7.2f}%')
+    print()
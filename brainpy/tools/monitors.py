@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+
+import numba as nb
+import numpy as np
+from numba.typed import List
+
+from .dicts import DictPlus
+
+__all__ = [
+    'memmap_monitor',
+    'resize_memmap_monitor',
+    'save_monitor_meta',
+    'load_monitors',
+
+    'SpikeEvents',
+    'new_event_buffer',
+    'record_spike_events',
+    'record_spike_ids',
+
+    'welford_update',
+    'accumulate_sum',
+    'accumulate_count',
+    'accumulate_hist',
+    'population_hist',
+]
+
+
+def _get_data_filename(mon_dir, name, key):
+    return os.path.join(mon_dir, f'{name}.{key}.dat')
+
+
+def _get_meta_filename(mon_dir, name):
+    return os.path.join(mon_dir, f'{name}.json')
+
+
+def memmap_monitor(mon_dir, name, key, shape, dtype=np.float_):
+    """Create the monitor array which is backed by a memory-mapped file.
+
+    The data is stored in the file ``"{mon_dir}/{name}.{key}.dat"``.
+    If the array is empty, an in-memory array is returned, because
+    an empty file cannot be mapped.
+
+    Parameters
+    ----------
+    mon_dir : str
+        The directory to store the monitor files.
+    name : str
+        The name of the ensemble.
+    key : str
+        The monitor key.
+    shape : tuple
+        The shape of the monitor array.
+    dtype : np.dtype
+        The data type of the monitor array.
+
+    Returns
+    -------
+    mon : np.memmap, np.ndarray
+        The monitor array.
+    """
+    if int(np.prod(shape)) == 0:
+        return np.zeros(shape, dtype=dtype)
+    os.makedirs(mon_dir, exist_ok=True)
+    return np.memmap(_get_data_filename(mon_dir, name, key), dtype=dtype, mode='w+', shape=shape)
+
+
+def resize_memmap_monitor(mon, shape):
+    """Resize the memory-mapped monitor along the first axis.
+
+    The backed file is extended (or truncated), and the data in the file
+    are kept in place, rather than copied into a new file.
+
+    Parameters
+    ----------
+    mon : np.memmap
+        The memory-mapped monitor.
+    shape : tuple
+        The new shape, which only differs from the monitor
+        shape in the first axis.
+
+    Returns
+    -------
+    mon : np.memmap
+        The resized monitor.
+    """
+    if tuple(shape[1:]) != tuple(mon.shape[1:]):
+        raise ValueError(f'Only support to resize the first axis, but got {shape} for {mon.shape}.')
+    mon.flush()
+    with open(mon.filename, 'r+b') as f:
+        f.truncate(int(np.prod(shape)) * mon.dtype.itemsize)
+    return np.memmap(mon.filename, dtype=mon.dtype, mode='r+', shape=tuple(shape))
+
+
+def save_monitor_meta(mon_dir, name, mon):
+    """Flush the memory-mapped monitors, and save their metadata
+    (data type and shape) into the sidecar file ``"{mon_dir}/{name}.json"``.
+
+    Parameters
+    ----------
+    mon_dir : str
+        The directory to store the monitor files.
+    name : str
+        The name of the ensemble.
+    mon : dict
+        The monitors.
+    """
+    meta = {'name': name, 'monitors': {}}
+    for key, val in mon.items():
+        if isinstance(val, np.memmap):
+            val.flush()
+            meta['monitors'][key] = {'filename': os.path.basename(_get_data_filename(mon_dir, name, key)),
+                                     'dtype': val.dtype.str,
+                                     'shape': list(val.shape)}
+    os.makedirs(mon_dir, exist_ok=True)
+    with open(_get_meta_filename(mon_dir, name), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+
+def load_monitors(mon_dir, name, mode='r'):
+    """Reopen the memory-mapped monitors of an ensemble.
+
+    The data are loaded lazily by the operating system when they are
+    accessed, rather than loaded into the memory at once.
+
+    Parameters
+    ----------
+    mon_dir : str
+        The directory of the monitor files.
+    name : str
+        The name of the ensemble.
+    mode : str
+        The file mode of ``np.memmap``.
+
+    Returns
+    -------
+    mon : DictPlus
+        The monitors.
+    """
+    meta_filename = _get_meta_filename(mon_dir, name)
+    if not os.path.exists(meta_filename):
+        raise FileNotFoundError(f'Cannot find the monitor metadata file "{meta_filename}".')
+    with open(meta_filename) as f:
+        meta = json.load(f)
+    mon = DictPlus()
+    for key, val in meta['monitors'].items():
+        mon[key] = np.memmap(os.path.join(mon_dir, val['filename']),
+                             dtype=np.dtype(val['dtype']),
+                             mode=mode,
+                             shape=tuple(val['shape']))
+    return mon
+
+
+class SpikeEvents(object):
+    """The sparse spike events recorded by the event-based monitor.
+
+    Parameters
+    ----------
+    i : np.ndarray
+        The neuron index of each spike.
+    steps : np.ndarray
+        The time step index of each spike.
+    ts : np.ndarray
+        The time points of the run.
+    num : int
+        The number of the monitored neurons.
+    """
+
+    def __init__(self, i, steps, ts, num):
+        self.i = np.asarray(i, dtype=np.int_)
+        self.steps = np.asarray(steps, dtype=np.int_)
+        self.ts = ts
+        self.num = num
+
+    @property
+    def t(self):
+        """The time of each spike."""
+        return self.ts[self.steps]
+
+    @property
+    def shape(self):
+        """The shape of the equivalent dense spike matrix."""
+        return len(self.ts), self.num
+
+    def to_dense(self):
+        """Get the dense spike matrix with the shape of ``(run_length, num)``.
+
+        Returns
+        -------
+        sp_matrix : np.ndarray
+            The spike matrix.
+        """
+        sp_matrix = np.zeros(self.shape, dtype=np.float_)
+        sp_matrix[self.steps, self.i] = 1.
+        return sp_matrix
+
+    def __len__(self):
+        return len(self.i)
+
+    def __repr__(self):
+        return f'{type(self).__name__}(num_spike={len(self)}, shape={self.shape})'
+
+
+def new_event_buffer(capacity):
+    """Create the growable buffer of the ``(step_index, neuron_index)`` events.
+
+    Parameters
+    ----------
+    capacity : int
+        The initial capacity of the buffer.
+
+    Returns
+    -------
+    buffer : numba.typed.List
+        The buffer, which is a list with one int array of the
+        shape ``(capacity, 2)``.
+    counter : np.ndarray
+        The number of the recorded events.
+    """
+    buffer = List()
+    buffer.append(np.zeros((max(int(capacity), 1), 2), dtype=np.int64))
+    counter = np.zeros(1, dtype=np.int64)
+    return buffer, counter
+
+
+@nb.njit
+def record_spike_events(buffer, counter, step, spike):
+    """Record the spikes at the time step into the event buffer.
+
+    The capacity of the buffer is doubled when it is full.
+
+    Parameters
+    ----------
+    buffer : numba.typed.List
+        The event buffer.
+    counter : np.ndarray
+        The number of the recorded events.
+    step : int
+        The time step index.
+    spike : np.ndarray
+        The spike state of each neuron. The neuron is spiking
+        when its value is larger than zero.
+    """
+    data = buffer[0]
+    num = counter[0]
+    for i in range(spike.shape[0]):
+        if spike[i] > 0.:
+            if num >= data.shape[0]:
+                new_data = np.zeros((data.shape[0] * 2, 2), dtype=np.int64)
+                new_data[:num] = data[:num]
+                buffer[0] = new_data
+                data = new_data
+            data[num, 0] = step
+            data[num, 1] = i
+            num += 1
+    counter[0] = num
+
+
+@nb.njit
+def record_spike_ids(spike, spike_ids, spike_num):
+    """Record the indices of the spiking neurons at the time step.
+
+    Parameters
+    ----------
+    spike : np.ndarray
+        The spike state of each neuron. The neuron is spiking
+        when its value is larger than zero.
+    spike_ids : np.ndarray
+        The int array with the length of the neuron number. The indices
+        of the spiking neurons are compacted into its head.
+    spike_num : np.ndarray
+        The number of the spiking neurons.
+    """
+    spike = spike.ravel()
+    num = 0
+    for i in range(spike.shape[0]):
+        if spike[i] > 0.:
+            spike_ids[num] = i
+            num += 1
+    spike_num[0] = num
+
+
+@nb.njit
+def welford_update(counter, mean, m2, x):
+    """Update the running mean and the sum of squared deviations
+    of each element with the Welford's algorithm.
+
+    Parameters
+    ----------
+    counter : np.ndarray
+        The number of the accumulated samples.
+    mean : np.ndarray
+        The running mean.
+    m2 : np.ndarray
+        The running sum of squared deviations. The variance
+        is ``m2 / counter[0]``.
+    x : np.ndarray
+        The new sample.
+    """
+    counter[0] += 1
+    for i in range(x.shape[0]):
+        delta = x[i] - mean[i]
+        mean[i] += delta / counter[0]
+        m2[i] += delta * (x[i] - mean[i])
+
+
+@nb.njit
+def accumulate_sum(acc, x):
+    """Accumulate the sum of each element."""
+    for i in range(x.shape[0]):
+        acc[i] += x[i]
+
+
+@nb.njit
+def accumulate_count(acc, x):
+    """Accumulate the number of times when each element is larger than zero."""
+    for i in range(x.shape[0]):
+        if x[i] > 0.:
+            acc[i] += 1.
+
+
+@nb.njit
+def _get_bin(val, bins):
+    # the last bin is closed, like "np.histogram()"
+    if val < bins[0] or val > bins[-1]:
+        return -1
+    if val == bins[-1]:
+        return bins.shape[0] - 2
+    return np.searchsorted(bins, val, side='right') - 1
+
+
+@nb.njit
+def accumulate_hist(hist, x, bins):
+    """Accumulate the histogram of each element.
+
+    Parameters
+    ----------
+    hist : np.ndarray
+        The histogram with the shape of ``(len(x), len(bins) - 1)``.
+    x : np.ndarray
+        The new sample.
+    bins : np.ndarray
+        The bin edges.
+    """
+    for i in range(x.shape[0]):
+        b = _get_bin(x[i], bins)
+        if b >= 0:
+            hist[i, b] += 1.
+
+
+@nb.njit
+def population_hist(x, bins):
+    """Get the histogram of the elements.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        The sample.
+    bins : np.ndarray
+        The bin edges.
+
+    Returns
+    -------
+    hist : np.ndarray
+        The histogram with the length of ``len(bins) - 1``.
+    """
+    hist = np.zeros(bins.shape[0] - 1)
+    for i in range(x.shape[0]):
+        b = _get_bin(x[i], bins)
+        if b >= 0:
+            hist[b] += 1.
+    return hist
@@ -7,6 +7,7 @@ from matplotlib.gridspec import GridSpec
 
 from .. import profile
 from ..errors import ModelUseError
+from ..tools.monitors import SpikeEvents
 
 __all__ = [
     'line_plot',
@@ -126,10 +127,12 @@ def raster_plot(ts,
     ----------
     ts : np.ndarray
         The run times.
-    sp_matrix : np.ndarray
+    sp_matrix : np.ndarray, SpikeEvents
         The spike matrix which records the spike information.
         It can be easily accessed by specifying the ``monitors``
-        of NeuGroup by: ``neu = NeuGroup(..., monitors=['spike'])``
+        of NeuGroup by: ``neu = NeuGroup(..., monitors=['spike'])``.
+        It can also be the sparse spike events recorded by
+        ``neu = NeuGroup(..., monitors=[('spike', {'event': True})])``.
     ax : Axes
         The figure.
     markersize : int
@@ -148,9 +151,13 @@ def raster_plot(ts,
         Show the figure.
     """
     # get index and time
-    elements = np.where(sp_matrix > 0.)
-    index = elements[1]
-    time = ts[elements[0]]
+    if isinstance(sp_matrix, SpikeEvents):
+        index = sp_matrix.i
+        time = sp_matrix.t
+    else:
+        elements = np.where(sp_matrix > 0.)
+        index = elements[1]
+        time = ts[elements[0]]
 
     # plot rater
     if ax is None:
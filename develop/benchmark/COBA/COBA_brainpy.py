@@ -70,12 +70,11 @@ neuron = bp.NeuType(name='COBA',
                     mode='scalar')
 
 
-def update1(pre, post, pre2post):
-    for pre_id in range(len(pre2post)):
-        if pre['spike'][pre_id] > 0.:
-            post_ids = pre2post[pre_id]
-            for i in post_ids:
-                post['ge'][i] += we
+def update1(post, pre2post, pre_spikes):
+    for pre_id in pre_spikes:
+        post_ids = pre2post[pre_id]
+        for i in post_ids:
+            post['ge'][i] += we
 
 
 exc_syn = bp.SynType('exc_syn',
@@ -84,12 +83,11 @@ exc_syn = bp.SynType('exc_syn',
                      mode='vector')
 
 
-def update2(pre, post, pre2post):
-    for pre_id in range(len(pre2post)):
-        if pre['spike'][pre_id] > 0.:
-            post_ids = pre2post[pre_id]
-            for i in post_ids:
-                post['gi'][i] += wi
+def update2(post, pre2post, pre_spikes):
+    for pre_id in pre_spikes:
+        post_ids = pre2post[pre_id]
+        for i in post_ids:
+            post['gi'][i] += wi
 
 
 inh_syn = bp.SynType('inh_syn',
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare the sequential and the concurrent calls of the independent
+ensembles in each time step (see ``brainpy.profile.set_ensemble_threads()``).
+"""
+
+import time
+
+import numpy as np
+
+import brainpy as bp
+
+
+def define_lif(tau=10., Vr=0., Vth=10., Iext=12.):
+    ST = bp.types.NeuState({'V': 0, 'spike': 0.})
+
+    @bp.integrate
+    def int_f(V, t, Isyn):
+        return (-V + Vr + Isyn) / tau
+
+    def update(ST, _t):
+        V = int_f(ST['V'], _t, Iext)
+        if V >= Vth:
+            V = Vr
+            ST['spike'] = 1.
+        else:
+            ST['spike'] = 0.
+        ST['V'] = V
+
+    return bp.NeuType(name='LIF', ST=ST, steps=update, mode='scalar')
+
+
+bp.profile.set(jit=True, device='cpu', dt=0.1)
+
+
+def run(num_group, num, threads, duration=1000.):
+    bp.profile.set_ensemble_threads(threads)
+    lif = define_lif()
+    groups = [bp.NeuGroup(lif, geometry=num, name=f'g{i}') for i in range(num_group)]
+    for group in groups:
+        group.ST['V'] = np.random.random(num) * 10.
+    net = bp.Network(*groups)
+    # compile the step functions ahead of the timing
+    net.run(1.)
+    net = bp.Network(*groups)
+    t0 = time.time()
+    net.run(duration)
+    return time.time() - t0
+
+
+def compare_sequential_and_concurrent(num_group=4, threads=4):
+    for num in [100, 1000, 10000, 100000]:
+        t_seq = run(num_group, num, False)
+        t_con = run(num_group, num, threads)
+        print(f'{num_group} groups of {num} neurons: sequential {t_seq:.3f} s, '
+              f'{threads} threads {t_con:.3f} s, speed up {t_seq / t_con:.2f}')
+
+
+if __name__ == '__main__':
+    compare_sequential_and_concurrent()
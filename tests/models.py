@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+"""
+The models shared by the tests.
+"""
+
+import numpy as np
+
+import brainpy as bp
+
+
+def define_lif():
+    tau = 10.
+    Vr = 0.
+    Vth = 10.
+
+    ST = bp.types.NeuState({'V': 0, 'sp_t': -1e7, 'spike': 0., 'input': 0.})
+
+    @bp.integrate
+    def int_f(V, t, Isyn):
+        return (-V + Vr + Isyn) / tau
+
+    def update(ST, _t):
+        V = int_f(ST['V'], _t, ST['input'])
+        if V >= Vth:
+            V = Vr
+            ST['sp_t'] = _t
+            ST['spike'] = 1.
+        else:
+            ST['spike'] = 0.
+        ST['V'] = V
+        ST['input'] = 0.
+
+    return bp.NeuType(name='LIF', ST=ST, steps=update, mode='scalar')
+
+
+def define_exp_syn():
+    tau = 2.
+
+    ST = bp.types.SynState(['s', 'g'])
+
+    @bp.integrate
+    def int_s(s, t):
+        return - s / tau
+
+    def update(ST, pre):
+        s = int_s(ST['s'], 0.)
+        s += pre['spike']
+        ST['s'] = s
+        ST['g'] = s
+
+    @bp.delayed
+    def output(ST, post):
+        post['input'] += ST['g'] * 5.
+
+    return bp.SynType(name='exp_syn', ST=ST, steps=(update, output), mode='scalar')
+
+
+def run_net(loop, report=False, profile_build=False, profile_steps=False):
+    np.random.seed(1234)
+    lif = define_lif()
+    syn = define_exp_syn()
+    group = bp.NeuGroup(lif, geometry=50, monitors=['V', 'spike'], name='group')
+    group.ST['V'] = np.random.random(50) * 10.
+    conn = bp.SynConn(syn, pre_group=group, post_group=group,
+                      conn=bp.connect.FixedProb(0.2), delay=1., monitors=['g'], name='syn')
+    net = bp.Network(group, conn)
+    build_report = net.run(50., inputs=(group, 'ST.input', 12.), report=report,
+                           loop=loop, profile_build=profile_build,
+                           profile_steps=profile_steps)
+    if profile_build:
+        return build_report
+    if profile_steps:
+        return net.get_step_profile()
+    return group.mon.V, group.mon.spike, conn.mon.g
+
+
+def define_event_syn(mode):
+    tau = 2.
+
+    ST = bp.types.SynState(['s', 'g'])
+
+    @bp.integrate
+    def int_s(s, t):
+        return - s / tau
+
+    if mode == 'scalar':
+        def update(ST):
+            s = int_s(ST['s'], 0.)
+            ST['s'] = s
+            ST['g'] = s
+
+        def receive(ST, pre_spikes):
+            ST['s'] += 1.
+            ST['g'] = ST['s']
+
+    elif mode == 'csr':
+        requires = {'pre2syn_csr': bp.types.CSRConn()}
+
+        def update(ST):
+            ST['s'] = int_s(ST['s'], 0.)
+            ST['g'] = ST['s']
+
+        def receive(ST, pre_spikes, pre2syn_csr):
+            indptr, indices = pre2syn_csr
+            for pre_id in pre_spikes:
+                for k in range(indptr[pre_id], indptr[pre_id + 1]):
+                    ST['s'][indices[k]] += 1.
+                    ST['g'][indices[k]] = ST['s'][indices[k]]
+
+    else:
+        requires = {'pre2syn': bp.types.ListConn()}
+
+        def update(ST):
+            ST['s'] = int_s(ST['s'], 0.)
+            ST['g'] = ST['s']
+
+        def receive(ST, pre_spikes, pre2syn):
+            for pre_id in pre_spikes:
+                syn_ids = pre2syn[pre_id]
+                ST['s'][syn_ids] += 1.
+                ST['g'][syn_ids] = ST['s'][syn_ids]
+
+    @bp.delayed
+    def output(ST, post):
+        post['input'] += ST['g'] * 5.
+
+    if mode == 'scalar':
+        return bp.SynType(name='event_syn', ST=ST, steps=(update, receive, output), mode='scalar')
+    else:
+        def vector_output(ST, post, post_ids):
+            for i in range(len(post_ids)):
+                post['input'][post_ids[i]] += ST['g'][i] * 5.
+
+        return bp.SynType(name='event_syn', ST=ST, requires=requires, mode='vector',
+                          steps=(update, receive, bp.delayed(vector_output)))
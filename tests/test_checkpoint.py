@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import numpy as np
+import pytest
+
+import brainpy as bp
+from models import define_exp_syn
+from models import define_lif
+
+
+def test_checkpoint(tmp_path):
+    bp.profile.set(jit=True, dt=0.1)
+
+    def make_net(mon_dir=None):
+        np.random.seed(1234)
+        group = bp.NeuGroup(define_lif(), geometry=50, name='group', mon_dir=mon_dir,
+                            monitors=['V', ('spike', {'event': True}), ('sp_t', {'every': 3})])
+        group.ST['V'] = np.random.random(50) * 10.
+        conn = bp.SynConn(define_exp_syn(), pre_group=group, post_group=group,
+                          conn=bp.connect.FixedProb(0.2), delay=1., monitors=['g'], name='syn')
+        sti = bp.inputs.SpikeTimeInput(4, times=[5., 10., 30., 40.], indices=[0, 1, 2, 3],
+                                       monitors=['spike'], name='sti')
+        return bp.Network(group, conn, sti), group, conn, sti
+
+    class Preempted(Exception):
+        pass
+
+    for loop in ['python', 'compiled']:
+        net1, group1, conn1, sti1 = make_net()
+        net1.run(50., inputs=(group1, 'ST.input', 12.), loop=loop)
+
+        # the run is stopped after the third checkpoint
+        for mon_dir in [None, str(tmp_path / f'{loop}_mon')]:
+            path = str(tmp_path / f'{loop}_{mon_dir is None}')
+            net2, group2, conn2, sti2 = make_net(mon_dir)
+            save_checkpoint = net2.save_checkpoint
+            num_saved = []
+
+            def save_and_stop(p):
+                save_checkpoint(p)
+                num_saved.append(1)
+                if len(num_saved) == 3:
+                    raise Preempted
+
+            net2.save_checkpoint = save_and_stop
+            try:
+                net2.run(50., inputs=(group2, 'ST.input', 12.), loop=loop,
+                         checkpoint_path=path, checkpoint_every=70)
+            except Preempted:
+                pass
+            # only the new monitor rows are appended into the checkpoint
+            rows_dirs = [f for f in os.listdir(path) if f.startswith('rows.')]
+            assert rows_dirs == ['rows.1']
+
+            # resume the run in a new network, which
+            # appends into the same checkpoint
+            net3, group3, conn3, sti3 = make_net(mon_dir)
+            net3.load_checkpoint(path)
+            net3.run(50., inputs=(group3, 'ST.input', 12.), loop=loop,
+                     checkpoint_path=path, checkpoint_every=70)
+            assert np.allclose(group1.mon.V, group3.mon.V)
+            assert np.allclose(group1.mon.sp_t, group3.mon.sp_t)
+            assert np.allclose(conn1.mon.g, conn3.mon.g)
+            assert np.array_equal(group1.mon.spike_i, group3.mon.spike_i)
+            assert sti1.mon.spike.sum() == 4
+            assert np.allclose(sti1.mon.spike, sti3.mon.spike)
+
+            # the final checkpoint has all the monitor rows
+            arrays, meta = bp.tools.load_checkpoint_files(path)
+            assert np.allclose(arrays['group']['mon.V'], group1.mon.V)
+            assert np.allclose(arrays['syn']['mon.g'], conn1.mon.g)
+
+
+def test_continuation_runs(tmp_path):
+    bp.profile.set(jit=True, dt=0.1)
+
+    def make_net(mode, mon_dir=None):
+        np.random.seed(1234)
+        group = bp.NeuGroup(define_lif(), geometry=50, name='group', mon_dir=mon_dir,
+                            monitors=['V', ('spike', {'event': True}), ('sp_t', {'every': 3}),
+                                      ('input', {'reduce': 'mean', 'axis': 'time'})])
+        group.ST['V'] = np.random.random(50) * 10.
+        conn = bp.SynConn(define_exp_syn(), pre_group=group, post_group=group,
+                          conn=bp.connect.FixedProb(0.2), delay=1., monitors=['g'], name='syn')
+        return bp.Network(group, conn, mode=mode), group, conn
+
+    for loop in ['python', 'compiled']:
+        net1, group1, conn1 = make_net('once')
+        Iext = np.ones(800) * 12.
+        Iext[300:] = 15.
+        net1.run(80., inputs=(group1, 'ST.input', Iext), loop=loop)
+
+        mon_dir = str(tmp_path / loop) if loop == 'compiled' else None
+        net2, group2, conn2 = make_net('continue', mon_dir=mon_dir)
+        net2.run(30., inputs=(group2, 'ST.input', Iext[:300]), loop=loop)
+        step_func = net2._step_func
+        net2.run(30., inputs=(group2, 'ST.input', Iext[300:600]), loop=loop)
+        net2.run((60., 80.), inputs=(group2, 'ST.input', Iext[600:]), loop=loop)
+        assert net2._step_func is step_func
+        assert net2.t_end == 80.
+        assert np.allclose(net2.ts, net1.ts)
+        assert np.allclose(group1.mon.V, group2.mon.V)
+        assert np.allclose(conn1.mon.g, conn2.mon.g)
+        assert np.array_equal(group1.mon.spike_i, group2.mon.spike_i)
+        assert np.allclose(group1.mon.spike_t, group2.mon.spike_t)
+        assert np.allclose(group1.mon.input, group2.mon.input)
+        # the "every" sampling keeps its phase across the continuation runs
+        assert group2.mon.sp_t.shape == group1.mon.sp_t.shape == (267, 50)
+        assert np.allclose(group1.mon.sp_t, group2.mon.sp_t)
+        assert np.allclose(group2.mon.sp_t_ts[99:102], [29.7, 30., 30.3])
+        if mon_dir is not None:
+            mon = bp.tools.load_monitors(mon_dir, 'group')
+            assert np.allclose(mon.V, group1.mon.V)
+
+    # the "window" monitor is rejected at the first run
+    group = bp.NeuGroup(define_lif(), geometry=5, monitors=[('V', {'window': (0., 10.)})])
+    with pytest.raises(bp.errors.ModelUseError):
+        bp.Network(group, mode='continue').run(30.)
+
+    # the continuation run with another loop is rejected,
+    # and the last runs are kept
+    net, group, conn = make_net('continue')
+    net.run(10., inputs=(group, 'ST.input', 12.))
+    with pytest.raises(bp.errors.ModelUseError):
+        net.run(10., inputs=(group, 'ST.input', 12.), loop='compiled')
+    with pytest.raises(bp.errors.ModelUseError):
+        net.run(10., inputs=(group, 'ST.input', 12.), profile_steps=True)
+    net.run(10., inputs=(group, 'ST.input', 12.))
+    assert net.t_end == 20. and group.mon.V.shape == (200, 50)
+    assert np.allclose(net.ts[[0, -1]], [0., 19.9])
+
+
+def test_continuation_checkpoint(tmp_path):
+    bp.profile.set(jit=True, dt=0.1)
+
+    def make_net(mode):
+        np.random.seed(1234)
+        group = bp.NeuGroup(define_lif(), geometry=50, name='group', monitors=['V'])
+        group.ST['V'] = np.random.random(50) * 10.
+        conn = bp.SynConn(define_exp_syn(), pre_group=group, post_group=group,
+                          conn=bp.connect.FixedProb(0.2), delay=1., name='syn')
+        return bp.Network(group, conn, mode=mode), group
+
+    # the checkpoint during the run is rejected in the "continue" mode
+    net, group = make_net('continue')
+    with pytest.raises(bp.errors.ModelUseError):
+        net.run(10., inputs=(group, 'ST.input', 12.), checkpoint_path=str(tmp_path / 'a'))
+
+    # the checkpoint saved between the continuation runs
+    # is continued by another network
+    net1, group1 = make_net('continue')
+    net1.run(10., inputs=(group1, 'ST.input', 12.))
+    net1.save_checkpoint(str(tmp_path / 'b'))
+    net1.run(10., inputs=(group1, 'ST.input', 12.))
+    net2, group2 = make_net('continue')
+    net2.load_checkpoint(str(tmp_path / 'b'))
+    assert net2._resume is None
+    net2.run((10., 20.), inputs=(group2, 'ST.input', 12.))
+    assert np.allclose(net2.ts, net1.ts[100:])
+    assert np.allclose(group2.mon.V, group1.mon.V[100:])
+
+    # the checkpoint saved in the middle of a run
+    # can not be resumed in the "continue" mode
+    class Preempted(Exception):
+        pass
+
+    def save_and_stop(p):
+        save_checkpoint(p)
+        raise Preempted
+
+    net3, group3 = make_net('once')
+    save_checkpoint = net3.save_checkpoint
+    net3.save_checkpoint = save_and_stop
+    with pytest.raises(Preempted):
+        net3.run(20., inputs=(group3, 'ST.input', 12.), checkpoint_path=str(tmp_path / 'c'),
+                 checkpoint_every=100)
+    net4, _ = make_net('continue')
+    with pytest.raises(bp.errors.ModelUseError):
+        net4.load_checkpoint(str(tmp_path / 'c'))
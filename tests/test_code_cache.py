@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+import brainpy as bp
+from models import run_net
+
+
+def test_code_cache(tmp_path):
+    bp.profile.set(jit=True, dt=0.1, cache_dir=str(tmp_path))
+    try:
+        V1, sp1, g1 = run_net('python')
+        V2, sp2, g2 = run_net('compiled')
+        files = [f for f in tmp_path.iterdir() if f.suffix == '.py']
+        assert len(files) > 0
+        assert len(list((tmp_path / '__pycache__').iterdir())) > 0
+        V3, sp3, g3 = run_net('compiled')
+        assert len([f for f in tmp_path.iterdir() if f.suffix == '.py']) == len(files)
+        assert np.allclose(V1, V2) and np.allclose(V1, V3)
+        assert np.allclose(g1, g2) and np.allclose(g1, g3)
+    finally:
+        bp.profile.set(cache_dir=False)
+
+
+def test_code_hash():
+    from numba.typed import List
+    code = 'def f():\n    return a\n'
+    l1, l2 = List([1., 2.]), List([1., 3.])
+    assert bp.tools.get_code_hash(code, {'a': l1}) != bp.tools.get_code_hash(code, {'a': l2})
+    with pytest.raises(TypeError):
+        bp.tools.get_code_hash(code, {'a': object()})
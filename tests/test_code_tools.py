@@ -3,6 +3,7 @@
 import ast
 from pprint import pprint
 from brainpy.tools.codes import CodeLineFormatter
+from brainpy.tools.codes import cast_float_literals
 from brainpy.tools.codes import find_atomic_op
 
 code ='''
@@ -109,6 +110,16 @@ def test_find_atomic_op_by_augassign():
     assert getter.right == "ST['g']"
 
 
+def test_cast_float_literals():
+    code = "V = V + (-V + 1.5) / tau * 1e-1 + ST[2]\nif V > 10:\n  ST[0] = .5  # 2.5"
+    new_code = cast_float_literals(code)
+    assert new_code == ("V = V + (-V + numpy.float32(1.5)) / tau * numpy.float32(1e-1) + ST[2]\n"
+                        "if V > 10:\n  ST[0] = numpy.float32(.5)  # 2.5")
+    assert cast_float_literals('a = 1.', 'float64') == 'a = numpy.float64(1.)'
+    assert cast_float_literals('a = -1 / tau + b / 2\nj = i + 1') == \
+           'a = -numpy.float32(1) / tau + b / numpy.float32(2)\nj = i + 1'
+
+
 
 
 # test_find_atomic_op_by_assign()
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+
+import numba
+import numpy as np
+
+import brainpy as bp
+from models import define_event_syn
+from models import define_lif
+
+
+def test_csr_conn():
+    bp.profile.set(jit=True)
+    np.random.seed(1234)
+    i, j = np.where(np.random.random((20, 30)) < 0.2)
+    perm = np.random.permutation(len(i))
+    i, j = i[perm], j[perm]
+    pre2post = bp.connect.pre2post(i, j, 20)
+    post2pre = bp.connect.post2pre(i, j, 30)
+    pre2syn = bp.connect.pre2syn(i, 20)
+    post2syn = bp.connect.post2syn(j, 30)
+    for csr, lists in [(bp.connect.pre2post_csr(i, j, 20), pre2post),
+                       (bp.connect.post2pre_csr(i, j, 30), post2pre),
+                       (bp.connect.pre2syn_csr(i, 20), pre2syn),
+                       (bp.connect.post2syn_csr(j, 30), post2syn)]:
+        assert csr.indices.flags['C_CONTIGUOUS']
+        assert len(csr.indptr) == len(lists) + 1
+        for k in range(len(lists)):
+            assert np.array_equal(csr.indices[csr.indptr[k]: csr.indptr[k + 1]], lists[k])
+
+
+def test_conn_structures():
+    np.random.seed(1234)
+    i = np.random.randint(0, 20, 200)
+    j = np.random.randint(0, 30, 200)
+    for jit in [True, False]:
+        bp.profile.set(jit=jit)
+        pre2post = bp.connect.pre2post(i, j, 20)
+        pre2syn = bp.connect.pre2syn(i, 20)
+        for k in range(20):
+            assert np.array_equal(pre2post[k], j[i == k])
+            assert np.array_equal(pre2syn[k], np.where(i == k)[0])
+        pre_ids, post_ids, slicing = bp.connect.pre_slice_syn(i, j, 20)
+        for k in range(20):
+            assert np.all(pre_ids[slicing[k, 0]: slicing[k, 1]] == k)
+            assert np.array_equal(post_ids[slicing[k, 0]: slicing[k, 1]], j[i == k])
+    bp.profile.set(jit=True)
+
+
+def test_fixed_prob():
+    conns = []
+    for parallel in [False, True]:
+        conn = bp.connect.FixedProb(0.1, include_self=False, seed=42, parallel=parallel)
+        conn(np.arange(600), np.arange(400))
+        conns.append(conn)
+    assert np.array_equal(conns[0].pre_ids, conns[1].pre_ids)
+    assert np.array_equal(conns[0].post_ids, conns[1].post_ids)
+    conn = conns[0]
+    assert np.all(conn.pre_ids != conn.post_ids)
+    assert abs(len(conn.pre_ids) / (600 * 400 - 400) - 0.1) < 0.01
+    assert conn.conn_mat is None
+    conn.set_size(num_pre=600, num_post=400)
+    conn.set_requires(['conn_mat'])
+    assert conn.conn_mat.sum() == len(conn.pre_ids)
+
+    # the connectors keep the random stream of the JIT functions
+    @numba.njit
+    def draw():
+        return np.random.random()
+
+    bp.tools.set_rng_seed(3)
+    expected = draw()
+    bp.tools.set_rng_seed(3)
+    for parallel in [False, True]:
+        bp.connect.FixedProb(0.1, seed=42, parallel=parallel)(np.arange(600), np.arange(400))
+        bp.connect.FixedPostNum(7, seed=42, parallel=parallel)(np.arange(300), np.arange(200))
+    bp.connect.ScaleFree(m=3, seed=1)(np.arange(50), np.arange(50))
+    assert draw() == expected
+
+
+def test_fixed_num():
+    for cls, axis in [(bp.connect.FixedPostNum, 1), (bp.connect.FixedPreNum, 0)]:
+        conns = []
+        for parallel in [False, True]:
+            conn = cls(7, include_self=False, seed=42, parallel=parallel)
+            conn(np.arange(300), np.arange(200))
+            conns.append(conn)
+        assert np.array_equal(conns[0].pre_ids, conns[1].pre_ids)
+        assert np.array_equal(conns[0].post_ids, conns[1].post_ids)
+        conn_mat = np.zeros((300, 200))
+        np.add.at(conn_mat, (conns[0].pre_ids, conns[0].post_ids), 1.)
+        assert conn_mat.max() == 1.
+        assert np.all(conn_mat.sum(axis=axis) == 7)
+        assert np.all(conns[0].pre_ids != conns[0].post_ids)
+
+
+def test_gaussian_cutoff():
+    pre_indices = np.arange(20 * 30).reshape((20, 30))
+    post_indices = np.arange(15 * 25).reshape((15, 25))
+    conn = bp.connect.GaussianWeight(sigma=0.1, w_max=2., w_min=0.1, include_self=False)
+    conn(pre_indices, post_indices)
+    # the brute-force weights
+    pre_y, pre_x = np.divmod(np.arange(600), 30)
+    post_y, post_x = np.divmod(np.arange(375), 25)
+    distance = (pre_y[:, None] / 19 - post_y[None] / 14) ** 2 + \
+               (pre_x[:, None] / 29 - post_x[None] / 24) ** 2
+    weights = 2. * np.exp(-distance / (2. * 0.1 ** 2))
+    weights[np.arange(375), np.arange(375)] = 0.
+    pre_ids, post_ids = np.where(weights > 0.1)
+    assert np.array_equal(conn.pre_ids, pre_ids)
+    assert np.array_equal(conn.post_ids, post_ids)
+    assert np.allclose(conn.weights, weights[pre_ids, post_ids])
+
+    # the DOG with the same and the opposite signs
+    for sigmas, ws_max, w_min in [((0.1, 0.2), (2., 1.), 0.1), ((0.2, 0.3), (1., -1.), 0.9)]:
+        conn = bp.connect.DOG(sigmas=sigmas, ws_max=ws_max, w_min=w_min)
+        conn(pre_indices, post_indices)
+        weights = ws_max[0] * np.exp(-distance / (2. * sigmas[0] ** 2)) - \
+                  ws_max[1] * np.exp(-distance / (2. * sigmas[1] ** 2))
+        pre_ids, post_ids = np.where(np.abs(weights) > w_min)
+        assert np.array_equal(conn.pre_ids, pre_ids)
+        assert np.array_equal(conn.post_ids, post_ids)
+        assert np.allclose(conn.weights, weights[pre_ids, post_ids])
+
+
+def test_position_conn():
+    rng = np.random.RandomState(123)
+    pre_pos = rng.rand(200, 3) * [1., 2., 1.]
+    post_pos = rng.rand(300, 3) * [1., 2., 1.]
+    for periodic in [None, (1., 2., 1.), (1., None, np.inf)]:
+        conn = bp.connect.PositionWeight(pre_pos, post_pos, radius=0.3,
+                                         weight=lambda d: np.exp(-d), periodic=periodic)
+        conn(np.arange(200), np.arange(300))
+        # the brute-force distances
+        diff = np.abs(pre_pos[:, None] - post_pos[None])
+        if periodic is not None:
+            box = np.array([np.inf if b is None else b for b in periodic])
+            diff = np.where(np.isfinite(box), np.minimum(diff, box - diff), diff)
+        distance = np.sqrt((diff ** 2).sum(axis=-1))
+        pre_ids, post_ids = np.where(distance <= 0.3)
+        assert np.array_equal(conn.pre_ids, pre_ids)
+        assert np.array_equal(conn.post_ids, post_ids)
+        assert np.allclose(conn.weights, np.exp(-distance[pre_ids, post_ids]))
+
+        # the serial and the parallel generation are the same
+        conn1 = bp.connect.PositionProb(pre_pos, post_pos, radius=0.3, prob=0.5,
+                                        periodic=periodic, seed=42)
+        conn1(np.arange(200), np.arange(300))
+        conn2 = bp.connect.PositionProb(pre_pos, post_pos, radius=0.3, prob=0.5,
+                                        periodic=periodic, seed=42, parallel=True)
+        conn2(np.arange(200), np.arange(300))
+        assert np.array_equal(conn1.pre_ids, conn2.pre_ids)
+        assert np.array_equal(conn1.post_ids, conn2.post_ids)
+        assert np.all(distance[conn1.pre_ids, conn1.post_ids] <= 0.3)
+
+    # the scalar box of "np.inf" means no periodic boundary
+    conn = bp.connect.PositionWeight(pre_pos, post_pos, radius=0.3, periodic=np.inf)
+    conn(np.arange(200), np.arange(300))
+    conn1 = bp.connect.PositionWeight(pre_pos, post_pos, radius=0.3)
+    conn1(np.arange(200), np.arange(300))
+    assert np.array_equal(conn.post_ids, conn1.post_ids)
+
+    # the sparse positions in a large extent (about 1e12 cells of the
+    # radius), where only the occupied cells are indexed
+    centers = rng.rand(100, 3) * 1e4
+    pos = (centers[:, None] + rng.rand(100, 20, 3) * 2.).reshape((-1, 3))
+    conn = bp.connect.PositionWeight(pos, pos, radius=1.)
+    conn(np.arange(2000), np.arange(2000))
+    distance = np.sqrt(((pos[:, None] - pos[None]) ** 2).sum(axis=-1))
+    pre_ids, post_ids = np.where(distance <= 1.)
+    assert np.array_equal(conn.pre_ids, pre_ids)
+    assert np.array_equal(conn.post_ids, post_ids)
+
+
+def test_graph_conn():
+    num = 500
+    conn = bp.connect.ScaleFree(m=3, seed=1)
+    conn(np.arange(num), np.arange(num))
+    assert len(conn.pre_ids) == 2 * (num - 3) * 3
+    assert not np.any(conn.pre_ids == conn.post_ids)
+    mat = np.zeros((num, num), dtype=np.int_)
+    mat[conn.pre_ids, conn.post_ids] += 1
+    assert mat.max() == 1
+    assert np.array_equal(mat, mat.T)
+
+    for prob in [0., 0.2, 1.]:
+        conn = bp.connect.SmallWorld(num_neighbor=4, prob=prob, seed=2)
+        conn(np.arange(num), np.arange(num))
+        assert len(conn.pre_ids) == 4 * num
+        assert not np.any(conn.pre_ids == conn.post_ids)
+        mat = np.zeros((num, num), dtype=np.int_)
+        mat[conn.pre_ids, conn.post_ids] += 1
+        assert mat.max() == 1
+        assert np.array_equal(mat, mat.T)
+        if prob == 0.:
+            assert np.all(np.isin((conn.post_ids - conn.pre_ids) % num, [1, 2, num - 2, num - 1]))
+
+    # the dense rewiring keeps the exact number of the edges
+    for num_neighbor in [6, 8]:
+        for directed in [True, False]:
+            conn = bp.connect.SmallWorld(num_neighbor=num_neighbor, prob=1., directed=directed, seed=3)
+            conn(np.arange(10), np.arange(10))
+            num_edge = 10 * (num_neighbor // 2)
+            assert len(conn.pre_ids) == (num_edge if directed else 2 * num_edge)
+            assert not np.any(conn.pre_ids == conn.post_ids)
+            keys = np.minimum(conn.pre_ids, conn.post_ids) * 10 + np.maximum(conn.pre_ids, conn.post_ids)
+            assert len(np.unique(keys)) == num_edge
+
+
+def test_conn_cache(tmp_path):
+    bp.profile.set(jit=True, dt=0.1)
+    for mode in ['scalar', 'vector', 'csr']:
+        results = []
+        for conn_cache in [None, str(tmp_path), str(tmp_path)]:
+            np.random.seed(1234)
+            group = bp.NeuGroup(define_lif(), geometry=50, monitors=['V'], name='group')
+            group.ST['V'] = np.random.random(50) * 10.
+            syn = bp.SynConn(define_event_syn(mode), pre_group=group, post_group=group,
+                             conn=bp.connect.FixedProb(0.2, seed=123), delay=1.,
+                             monitors=['g'], name='syn', conn_cache=conn_cache)
+            net = bp.Network(group, syn)
+            net.run(50., inputs=(group, 'ST.input', 12.))
+            results.append((group.mon.V, syn.mon.g))
+        # the last run loads the connections from the cache
+        assert isinstance(syn.pre_ids, np.memmap)
+        for V, g in results[1:]:
+            assert np.allclose(results[0][0], V)
+            assert np.allclose(results[0][1], g)
+    assert len(list(tmp_path.iterdir())) == 3
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+import brainpy as bp
+from models import define_event_syn
+from models import define_lif
+from models import run_net
+
+
+def test_spike_ids():
+    bp.profile.set(jit=True, dt=0.1)
+    V1, sp1, g1 = run_net('python')
+    for mode in ['scalar', 'vector', 'csr']:
+        for loop in ['python', 'compiled']:
+            np.random.seed(1234)
+            group = bp.NeuGroup(define_lif(), geometry=50, monitors=['V', 'spike'], name='group')
+            group.ST['V'] = np.random.random(50) * 10.
+            conn = bp.SynConn(define_event_syn(mode), pre_group=group, post_group=group,
+                              conn=bp.connect.FixedProb(0.2), delay=1., monitors=['g'], name='syn')
+            net = bp.Network(group, conn)
+            net.run(50., inputs=(group, 'ST.input', 12.), loop=loop)
+            assert np.allclose(V1, group.mon.V)
+            assert np.allclose(g1, conn.mon.g)
+            spike = group.ST['spike']
+            assert group.runner.spike_num[0] == spike.sum()
+            assert np.array_equal(group.runner.spike_ids[:int(spike.sum())], np.where(spike > 0)[0])
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+import brainpy as bp
+from models import define_lif
+
+
+def test_memmap_monitors(tmp_path):
+    bp.profile.set(jit=True, dt=0.1)
+    lif = define_lif()
+    group1 = bp.NeuGroup(lif, geometry=10, monitors=['V', 'spike'])
+    group1.run(20., inputs=('ST.input', 12.))
+    for loop in ['python', 'compiled']:
+        group2 = bp.NeuGroup(lif, geometry=10, monitors=['V', 'spike'],
+                             mon_dir=str(tmp_path), name=f'memmap_{loop}')
+        group2.run(20., inputs=('ST.input', 12.), loop=loop)
+        assert isinstance(group2.mon.V, np.memmap)
+        assert np.allclose(group1.mon.V, group2.mon.V)
+
+        mon = bp.tools.load_monitors(str(tmp_path), group2.name)
+        assert set(mon.keys()) == {'V', 'spike', 'ts'}
+        assert isinstance(mon.V, np.memmap)
+        assert np.allclose(mon.V, group1.mon.V)
+        assert np.allclose(mon.spike, group1.mon.spike)
+        assert np.allclose(mon.ts, group1.mon.ts)
+
+
+def test_monitor_sampling():
+    bp.profile.set(jit=True, dt=0.1)
+    lif = define_lif()
+    group1 = bp.NeuGroup(lif, geometry=10, monitors=['V', 'spike'])
+    group1.run(20., inputs=('ST.input', 12.))
+    for loop in ['python', 'compiled']:
+        group2 = bp.NeuGroup(lif, geometry=10, monitors=[('V', {'every': 10}),
+                                                          ('spike', [1, 2], {'window': (5., 15.)})])
+        group2.run(20., inputs=('ST.input', 12.), loop=loop)
+        assert group2.mon.V.shape == (20, 10)
+        assert np.allclose(group2.mon.V, group1.mon.V[::10])
+        assert np.allclose(group2.mon.V_ts, group1.mon.ts[::10])
+        assert group2.mon.spike.shape == (100, 2)
+        assert np.allclose(group2.mon.spike, group1.mon.spike[50:150, 1:3])
+        assert np.allclose(group2.mon.spike_ts, group1.mon.ts[50:150])
+        assert np.allclose(group2.mon.ts, group1.mon.ts)
+
+        group3 = bp.NeuGroup(lif, geometry=10, monitors={'V': {'every': 5, 'window': (10., 20.)},
+                                                         'spike': {'every': 5, 'window': (10., 20.)}})
+        group3.run(20., inputs=('ST.input', 12.), loop=loop)
+        assert np.allclose(group3.mon.V, group1.mon.V[100::5])
+        assert np.allclose(group3.mon.ts, group1.mon.ts[100::5])
+
+
+def test_spike_event_monitor(tmp_path):
+    bp.profile.set(jit=True, dt=0.1)
+    lif = define_lif()
+    Iext = np.linspace(10., 30., 20)
+    group1 = bp.NeuGroup(lif, geometry=20, monitors=['spike'])
+    group1.ST['input'] = 0.
+    group1.run(50., inputs=('ST.input', Iext))
+    sp_matrix = group1.mon.spike
+    assert sp_matrix.sum() > 0
+    for loop in ['python', 'compiled']:
+        group2 = bp.NeuGroup(lif, geometry=20, monitors=[('spike', {'event': True})])
+        group2.run(50., inputs=('ST.input', Iext), loop=loop)
+        events = group2.mon.spike
+        assert isinstance(events, bp.tools.SpikeEvents)
+        assert len(events) == sp_matrix.sum()
+        assert np.allclose(events.to_dense(), sp_matrix)
+        index, time = bp.measure.raster_plot(sp_matrix, group1.mon.ts)
+        order = np.lexsort((group2.mon.spike_i, group2.mon.spike_t))
+        assert np.allclose(group2.mon.spike_i[order], index)
+        assert np.allclose(group2.mon.spike_t[order], time)
+        assert np.allclose(bp.measure.firing_rate(events, 5.),
+                           bp.measure.firing_rate(sp_matrix, 5.))
+        assert np.isclose(bp.measure.cross_correlation(events, 10),
+                          bp.measure.cross_correlation(sp_matrix, 10))
+
+    # events with indices
+    group3 = bp.NeuGroup(lif, geometry=20, monitors=[('spike', [15, 18], {'event': True})])
+    group3.run(50., inputs=('ST.input', Iext))
+    assert set(group3.mon.spike_i) == {15, 18}
+    assert np.allclose(group3.mon.spike.to_dense()[:, [15, 18]], sp_matrix[:, [15, 18]])
+
+    # growth of the event buffer
+    buffer, counter = bp.tools.new_event_buffer(1)
+    for step in range(5):
+        bp.tools.record_spike_events(buffer, counter, step, np.array([1., 0., 1.]))
+    assert counter[0] == 10
+    assert buffer[0][:10].tolist() == [[s, i] for s in range(5) for i in [0, 2]]
+
+
+def test_reducer_monitors():
+    bp.profile.set(jit=True, dt=0.1)
+    lif = define_lif()
+    Iext = np.linspace(10., 30., 20)
+    bins = np.linspace(0., 10., 6)
+    group1 = bp.NeuGroup(lif, geometry=20, monitors=['V', 'spike'])
+    group1.run(50., inputs=('ST.input', Iext))
+    V, spike = group1.mon.V, group1.mon.spike
+    for loop in ['python', 'compiled']:
+        group2 = bp.NeuGroup(lif, geometry=20, monitors={
+            'V': {'reduce': 'mean'},
+            'spike': {'reduce': 'count'},
+            'ST.V': {'reduce': 'var', 'every': 10},
+            'ST.spike': {'reduce': 'hist', 'bins': [-0.5, 0.5, 1.5]},
+        })
+        group2.run(50., inputs=('ST.input', Iext), loop=loop)
+        assert np.allclose(group2.mon.V, V.mean(axis=1))
+        assert np.allclose(group2.mon.spike, spike.sum(axis=1))
+        assert np.allclose(group2.mon.ST_V, V[::10].var(axis=1))
+        assert np.allclose(group2.mon.ST_V_ts, group1.mon.ts[::10])
+        assert np.allclose(group2.mon.ST_spike[:, 1], spike.sum(axis=1))
+
+        group3 = bp.NeuGroup(lif, geometry=20, monitors={
+            'V': {'reduce': 'mean', 'axis': 'time'},
+            'spike': {'reduce': 'count', 'axis': 'time'},
+            'ST.V': {'reduce': 'var', 'axis': 'time', 'window': (10., 50.)},
+            'ST.spike': {'reduce': 'sum', 'axis': 'time', 'indices': [3, 5]},
+            'ST.input': {'reduce': 'hist', 'axis': 'time', 'bins': bins},
+        })
+        group3.run(50., inputs=('ST.input', Iext), loop=loop)
+        assert np.allclose(group3.mon.V, V.mean(axis=0))
+        assert np.allclose(group3.mon.spike, spike.sum(axis=0))
+        assert np.allclose(group3.mon.ST_V, V[100:].var(axis=0))
+        assert np.allclose(group3.mon.ST_spike, spike[:, [3, 5]].sum(axis=0))
+        assert group3.mon.ST_input.shape == (20, 5)
+        assert np.allclose(group3.mon.ST_input[:, 0], 500.)  # "input" is reset to 0. after update
+        assert np.allclose(group3.mon.ST_input[:, 1:], 0.)
+        assert np.allclose(group3.mon.ts, group1.mon.ts)
+
+        # the options of the user are not modified
+        options = {'reduce': 'hist', 'bins': [-0.5, 0.5, 1.5]}
+        group4 = bp.NeuGroup(lif, geometry=20, monitors=[('spike', options)])
+        group4.run(50., inputs=('ST.input', Iext), loop=loop)
+        assert options == {'reduce': 'hist', 'bins': [-0.5, 0.5, 1.5]}
+        assert np.allclose(group4.mon.spike[:, 1], spike.sum(axis=1))
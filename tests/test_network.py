@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+import brainpy as bp
+from models import define_lif
+from models import run_net
+
+
+def test_compiled_loop():
+    bp.profile.set(jit=True, dt=0.1)
+    V1, sp1, g1 = run_net('python')
+    V2, sp2, g2 = run_net('compiled')
+    V3, sp3, g3 = run_net('compiled', report=True)
+    assert sp1.sum() > 0
+    assert np.allclose(V1, V2) and np.allclose(V1, V3)
+    assert np.allclose(sp1, sp2) and np.allclose(sp1, sp3)
+    assert np.allclose(g1, g2) and np.allclose(g1, g3)
+
+
+def test_compiled_loop_of_ensemble():
+    bp.profile.set(jit=True, dt=0.1)
+    lif = define_lif()
+    Iext, duration = bp.inputs.constant_current([(0., 10.), (15., 40.)])
+    group1 = bp.NeuGroup(lif, geometry=10, monitors=['V'])
+    group1.run(duration, inputs=('ST.input', Iext))
+    group2 = bp.NeuGroup(lif, geometry=10, monitors=['V'])
+    group2.run(duration, inputs=('ST.input', Iext), loop='compiled')
+    assert np.allclose(group1.mon.V, group2.mon.V)
+
+
+def test_float32_mode():
+    bp.profile.set(jit=True, dt=0.1)
+    V1, sp1, g1 = run_net('python')
+    bp.profile.set(float_type='float32')
+    try:
+        for loop in ['python', 'compiled']:
+            V2, sp2, g2 = run_net(loop)
+            assert V2.dtype == sp2.dtype == g2.dtype == np.float32
+            assert np.allclose(V1, V2, atol=1e-4)
+            assert np.allclose(sp1, sp2)
+            assert np.allclose(g1, g2, atol=1e-4)
+
+        lif = define_lif()
+        group = bp.NeuGroup(lif, geometry=5, monitors=['V'])
+        group.pars['Vth'] = np.ones(5) * 10.
+        group.run(5., inputs=('ST.input', np.ones(5) * 12.))
+        assert group.ST['_data'].dtype == np.float32
+        assert group.pars['Vth'].dtype == np.float32
+        assert str(group.runner.update.signatures[0][0].dtype) == "float32"
+
+        # the GPU noise follows the float type
+        code = 'V += _normal_like_(V)'
+        noise_code = bp.core.runner.NoiseHandler.normal_pattern.sub(
+            bp.core.runner.NoiseHandler.cuda_replace_f, code)
+        assert 'xoroshiro128p_normal_float32(' in noise_code
+    finally:
+        bp.profile.set(float_type='float64')
+
+
+def test_build_report(capsys):
+    bp.profile.set(jit=True, dt=0.1)
+    for loop in ['python', 'compiled']:
+        report = run_net(loop, profile_build=True)
+        assert set(report['ensembles'].keys()) == {'group', 'syn'}
+        for name, build_profile in report['ensembles'].items():
+            assert build_profile['numba_compile'] > 0.
+            assert build_profile['exec'] > 0.
+            assert len(build_profile['code_size']) > 0
+        assert 'update' in report['ensembles']['group']['code_size']
+        assert report['total'] >= sum(report['phases'].values()) * 0.99
+
+    lif = define_lif()
+    group = bp.NeuGroup(lif, geometry=10, monitors=['V'])
+    capsys.readouterr()
+    for loop in ['python', 'compiled']:
+        report = group.run(10., inputs=('ST.input', 12.), profile_build=True, loop=loop)
+        assert report['ensembles'][group.name]['numba_compile'] > 0.
+    # the progress is not reported without "report=True"
+    assert capsys.readouterr().out == ''
+
+
+def test_step_profile():
+    bp.profile.set(jit=True, dt=0.1)
+    for profile_steps, num_call in [(True, 500), (10, 50)]:
+        rows = run_net('python', profile_steps=profile_steps)
+        steps = {(row['ensemble'], row['step']) for row in rows}
+        assert steps == {('group', 'input'), ('group', 'update'), ('group', 'monitor'),
+                         ('syn', 'update'), ('syn', 'output'), ('syn', 'monitor')}
+        for row in rows:
+            assert row['calls'] == num_call
+            assert row['total'] > 0.
+            assert np.isclose(row['mean'], row['total'] / row['calls'])
+
+
+def test_runtime_pars():
+    bp.profile.set(jit=True, dt=0.1)
+
+    def define_vector_neuron():
+        tau = 10.
+        ST = bp.types.NeuState({'V': 0., 'input': 0.})
+
+        @bp.integrate
+        def int_v(V, t, Isyn):
+            return (-V + Isyn) / tau
+
+        def update(ST, _t):
+            ST['V'] = int_v(ST['V'], _t, ST['input'])
+            ST['input'] = 0.
+
+        return bp.NeuType(name='neuron', ST=ST, steps=update, mode='vector')
+
+    for define in [define_lif, define_vector_neuron]:
+        for loop in ['python', 'compiled']:
+            group = bp.NeuGroup(define(), geometry=10, monitors=['V'], runtime_pars=['tau'])
+            net = bp.Network(group, mode='repeat')
+            net.run(20., inputs=(group, 'ST.input', 12.), loop=loop)
+            step_func = net._step_func
+
+            # update the parameter in place, without recompilation
+            for tau in [5., np.linspace(5., 15., 10)]:
+                group.pars['tau'] = tau
+                group.ST['V'] = 0.
+                net.run(20., inputs=(group, 'ST.input', 12.), loop=loop)
+                if np.size(tau) == 1:
+                    assert net._step_func is step_func
+                group2 = bp.NeuGroup(define(), geometry=10, monitors=['V'], pars_update={'tau': tau})
+                group2.run(20., inputs=('ST.input', 12.), loop=loop)
+                assert np.allclose(group.mon.V, group2.mon.V)
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+
+import ast
+
+import numpy as np
+import pytest
+
+import brainpy as bp
+from brainpy.core.runner import get_concurrent_stages
+from models import define_exp_syn
+from models import define_lif
+from models import run_net
+
+
+def test_batched_network():
+    bp.profile.set(jit=True, dt=0.1)
+    taus = np.array([[8.], [10.], [12.]])
+    np.random.seed(1234)
+    V0 = np.random.random((3, 50)) * 10.
+    conn_ij = bp.connect.FixedProb(0.2)
+    conn_ij(np.arange(50), np.arange(50))
+    conn_ij = (conn_ij.pre_ids, conn_ij.post_ids)
+
+    def make_net(tau, V, batch=None):
+        group = bp.NeuGroup(define_lif(), geometry=50, name='group', batch=batch,
+                            pars_update={'tau': tau},
+                            monitors=['V', ('spike', {'event': True}),
+                                      ('input', {'reduce': 'mean', 'axis': 'time'})])
+        group.ST['V'] = V
+        conn = bp.SynConn(define_exp_syn(), pre_group=group, post_group=group,
+                          conn={'i': conn_ij[0], 'j': conn_ij[1]}, delay=1.,
+                          monitors=['g'], name='syn')
+        return bp.Network(group, conn, mode='repeat'), group, conn
+
+    for loop in ['python', 'compiled']:
+        net, group, conn = make_net(taus, V0, batch=3)
+        assert net.batch == 3 and conn.batch == 3
+        assert group.ST['V'].shape == (3, 50)
+        for _ in range(2):
+            net.run(50., inputs=(group, 'ST.input', 12.), loop=loop)
+        assert group.mon.V.shape == (3, 500, 50)
+        assert conn.mon.g.shape == (3, 500, len(conn_ij[0]))
+        assert group.mon.ts.shape == (500,)
+        assert len(group.mon.spike) == 3
+
+        for b in range(3):
+            net1, group1, conn1 = make_net(taus[b, 0], V0[b])
+            for _ in range(2):
+                net1.run(50., inputs=(group1, 'ST.input', 12.), loop=loop)
+            assert np.allclose(group.mon.V[b], group1.mon.V)
+            assert np.allclose(conn.mon.g[b], conn1.mon.g)
+            assert np.allclose(group.mon.input[b], group1.mon.input)
+            assert np.array_equal(group.mon.spike_i[b], group1.mon.spike_i)
+            assert np.allclose(group.ST['V'][b], group1.ST['V'])
+            assert np.allclose(conn.ST['s'][b], conn1.ST['s'])
+    assert isinstance(net._step_func, bp.core.runner.BatchFunc)
+
+    # the random stream of each batch member is the same as the one
+    # of the member run alone with the same seed
+    def define_noisy_neuron():
+        ST = bp.types.NeuState({'V': 0.})
+
+        def update(ST):
+            ST['V'] += np.random.normal(0., 1.)
+
+        return bp.NeuType(name='noisy', ST=ST, steps=update, mode='scalar')
+
+    for loop in ['python', 'compiled']:
+        group = bp.NeuGroup(define_noisy_neuron(), geometry=10, batch=3, monitors=['V'])
+        group.run(20., loop=loop, seed=5)
+        for b in range(3):
+            group1 = bp.NeuGroup(define_noisy_neuron(), geometry=10, monitors=['V'])
+            group1.run(20., loop=loop, seed=5 + b)
+            assert np.allclose(group.mon.V[b], group1.mon.V)
+
+
+def test_concurrent_ensembles():
+    def define_neuron():
+        ST = bp.types.NeuState({'V': 0., 'spike': 0., 'ge': 0., 'gi': 0.})
+
+        def update(ST, _t):
+            V = ST['V'] + (-ST['V'] + 12. + ST['ge'] - ST['gi']) / 10. * 0.1
+            ST['spike'] = 0.
+            if V >= 10.:
+                V = 0.
+                ST['spike'] = 1.
+            ST['V'] = V
+            ST['ge'] = 0.
+            ST['gi'] = 0.
+
+        return bp.NeuType(name='neuron', ST=ST, steps=update, mode='scalar')
+
+    def define_syn(target):
+        ST = bp.types.SynState(['g'])
+
+        def update(ST, pre):
+            ST['g'] = ST['g'] * 0.9 + pre['spike']
+
+        if target == 'ge':
+            def output(ST, post):
+                post['ge'] += ST['g']
+        else:
+            def output(ST, post):
+                post['gi'] += ST['g']
+
+        return bp.SynType(name=f'syn_{target}', ST=ST, steps=(update, output), mode='scalar')
+
+    def run(threads):
+        bp.profile.set(jit=True, dt=0.1, ensemble_threads=threads)
+        np.random.seed(1234)
+        exc = bp.NeuGroup(define_neuron(), geometry=40, monitors=['V'], name='exc')
+        inh = bp.NeuGroup(define_neuron(), geometry=10, monitors=['V'], name='inh')
+        exc.ST['V'] = np.random.random(40) * 10.
+        inh.ST['V'] = np.random.random(10) * 10.
+        objs = [exc, inh]
+        for pre, target in [(exc, 'ge'), (inh, 'gi')]:
+            for post in [exc, inh]:
+                objs.append(bp.SynConn(define_syn(target), pre_group=pre, post_group=post,
+                                       conn=bp.connect.FixedProb(0.3), name=f'{pre.name}2{post.name}'))
+        # conflict with "exc2exc"
+        objs.append(bp.SynConn(define_syn('ge'), pre_group=exc, post_group=exc,
+                               conn=bp.connect.FixedProb(0.1), name='exc2exc_b'))
+        net = bp.Network(*objs)
+        net.run(50.)
+        return net
+
+    net1 = run(False)
+    net2 = run(4)
+    net3 = run(2)
+    bp.profile.set(ensemble_threads=False)
+    stages = [[obj.name for obj in stage] for stage in get_concurrent_stages(net2._all_objects)]
+    assert stages == [['exc', 'inh'], ['exc2exc', 'exc2inh', 'inh2exc', 'inh2inh'], ['exc2exc_b']]
+    # one task for each thread in a stage
+    assert len(net2._step_func.__globals__['_stage1']) == 4
+    assert len(net3._step_func.__globals__['_stage1']) == 2
+    for net in [net2, net3]:
+        assert np.allclose(net1.exc.mon.V, net.exc.mon.V)
+        assert np.allclose(net1.inh.mon.V, net.inh.mon.V)
+
+    # the pool is shut down when the network is rebuilt without the
+    # threads, and the threads ignored by the compiled loop are warned
+    pool = net2._thread_pool
+    net2.run(5.)
+    assert pool._shutdown and net2._thread_pool is None
+    bp.profile.set(ensemble_threads=2)
+    try:
+        with pytest.warns(UserWarning, match='compiled'):
+            net3.run(5., loop='compiled')
+    finally:
+        bp.profile.set(ensemble_threads=False)
+    assert net3._thread_pool is None
+
+
+def test_code_accesses():
+    from brainpy.core.runner import _get_code_accesses
+
+    def get_accesses(code):
+        formatter = bp.tools.CodeLineFormatter()
+        formatter.visit(ast.parse(code))
+        data = {'ST': (1, {0: 'V', 1: 'g'}), 'post': (2, {0: 'V', 1: 'ge'}), 'mon': (3, None)}
+        return _get_code_accesses(ast.parse(code), formatter, data)
+
+    reads, writes = get_accesses('ST[1, i] = ST[0, i]\nmon[i] = ST[0]')
+    assert reads == {(1, 'V')}
+    assert writes == {(1, 'g'), (3, '*')}
+    reads, writes = get_accesses('post[1, i] += ST["g"][i]')
+    assert reads == {(1, 'g'), (2, 'ge')}
+    assert writes == {(2, 'ge')}
+    # the data bound to another name, and the computed row
+    reads, writes = get_accesses('p = post\nif v > 0:\n  p[1, i] += ST[k, i]')
+    assert reads == {(1, '*'), (2, '*')}
+    assert writes == {(2, '*')}
+    # the data passed to a function
+    reads, writes = get_accesses('func(mon, ST[1])')
+    assert reads == {(1, 'g'), (3, '*')}
+    assert writes == {(3, '*')}
+
+
+def test_multi_cpu_accumulation():
+    bp.profile.set_device(True, 'cpu')
+    V1, sp1, g1 = run_net('python')
+    bp.profile.set_device(True, 'multi-cpu')
+    try:
+        V2, sp2, g2 = run_net('python')
+        V3, sp3, g3 = run_net('python')
+    finally:
+        bp.profile.set_device(True, 'cpu')
+    assert sp1.sum() > 0
+    assert np.array_equal(V1, V2) and np.array_equal(V2, V3)
+    assert np.array_equal(g1, g2)
+
+    # the vector-based synapses, which accumulate into the
+    # post-synaptic neurons by the parallel partial buffers
+    def define_vector_syn():
+        ST = bp.types.SynState(['g'])
+
+        def update(ST, pre, pre_ids):
+            for i in range(ST['g'].shape[0]):
+                ST['g'][i] = ST['g'][i] * 0.9 + pre['spike'][pre_ids[i]]
+
+        def output(ST, post, post_ids):
+            for i in range(ST['g'].shape[0]):
+                post['input'][post_ids[i]] += ST['g'][i] * 0.5
+
+        return bp.SynType(name='vector_syn', ST=ST, steps=(update, output), mode='vector')
+
+    def run(device):
+        bp.profile.set_device(True, device)
+        np.random.seed(1234)
+        group = bp.NeuGroup(define_lif(), geometry=50, monitors=['V'], name='group')
+        group.ST['V'] = np.random.random(50) * 10.
+        conn = bp.SynConn(define_vector_syn(), pre_group=group, post_group=group,
+                          conn=bp.connect.FixedProb(0.2), name='syn')
+        bp.Network(group, conn).run(50., inputs=(group, 'ST.input', 12.))
+        return group.mon.V, conn.runner
+
+    V1, _ = run('cpu')
+    try:
+        V2, runner = run('multi-cpu')
+        V3, _ = run('multi-cpu')
+    finally:
+        bp.profile.set_device(True, 'cpu')
+    assert any(['numba.prange' in line for line in runner._code_results['output']['codes']])
+    assert np.allclose(V1, V2) and np.array_equal(V2, V3)
+    # the partial buffers are created once, and cleared after each step
+    assert len(runner._partials) == 1
+    partial, marks, touched, num = list(runner._partials.values())[0]
+    assert partial.shape == (16, 50)
+    assert not partial.any() and not marks.any() and not num.any()
+
+    # the loop which reads the accumulated row, writes the name bound to the
+    # state, or writes the other array at the computed index runs serially
+    from brainpy.core.runner import _get_parallel_loops
+
+    def is_parallel(code):
+        return 'prange' in _get_parallel_loops(code)[0]
+
+    assert is_parallel('for i in range(n):\n  post[3][j[i]] += post[2][i]')
+    assert is_parallel('for i in range(n):\n  ST[1][i] = post[2][i]')
+    assert not is_parallel('for i in range(n):\n  post[3][j[i]] += post[3][i]')
+    assert not is_parallel('for i in range(n):\n  post[3][j[i]] = 1.')
+    assert not is_parallel('p = post[3]\nfor i in range(n):\n  p[j[i]] += 1.')
+    assert not is_parallel('for i in range(n):\n  ST[1][j[i]] += 1.')
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import numpy as np
+
+import brainpy as bp
+from models import define_exp_syn
+from models import define_lif
+
+
+def build_net():
+    bp.profile.set(jit=True, dt=0.1)
+    np.random.seed(1234)
+    group = bp.NeuGroup(define_lif(), geometry=20, name='group', runtime_pars=['tau'],
+                        monitors=['V', ('spike', {'event': True})])
+    conn = bp.SynConn(define_exp_syn(), pre_group=group, post_group=group,
+                      conn=bp.connect.FixedProb(0.3), delay=1., monitors=['g'], name='syn')
+    return bp.Network(group, conn)
+
+
+def test_process_sweep():
+    # the parallel kernel starts the threading layer before the
+    # sweep, in which the workers are spawned rather than forked
+    bp.profile.set_device(True, 'multi-cpu')
+    try:
+        build_net().run(10.)
+    finally:
+        bp.profile.set_device(True, 'cpu')
+
+    all_params = [{'group.ST.V': np.full(20, 5.)},
+                  {'group.pars.tau': 5.},
+                  {'group.ST.V': np.full(20, 9.)},
+                  {'syn.pars.tau': 4.}]
+    inputs = [('group', 'ST.input', 12.)]
+    results = list(bp.running.process_sweep(build_net, all_params, nb_process=2,
+                                            duration=30., inputs=inputs, loop='compiled'))
+    assert sorted([r.index for r in results]) == [0, 1, 2, 3]
+    for r in results:
+        net = build_net()
+        for key, val in r.params.items():
+            bp.running._set_sweep_value(net, key, val)
+        net.run(30., inputs=inputs, loop='compiled')
+        assert np.allclose(r.mon['group'].V, net.group.mon.V)
+        assert np.allclose(r.mon['group'].spike_t, net.group.mon.spike_t)
+        assert np.allclose(r.mon['syn'].g, net.syn.mon.g)
+        r.close()
+
+    # stop the iteration early: the shared memory
+    # of all the jobs is released
+    results = bp.running.process_sweep(build_net, all_params, nb_process=2,
+                                       duration=30., inputs=inputs)
+    with next(results) as r:
+        name = r._shm.name
+        assert r.mon['group'].V.shape == (300, 20)
+    assert r.mon == {}
+    results.close()
+    if os.path.isdir('/dev/shm'):
+        prefix = name[:name.rindex('_') + 1]
+        assert not [f for f in os.listdir('/dev/shm') if f.startswith(prefix)]